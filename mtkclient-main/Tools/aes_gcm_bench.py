@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mtkclient.Library.cryptutils import CryptUtils  # noqa: E402
+
+AesGcm = CryptUtils.Aes.AesGcm
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    res = func(*args)
+    return time.perf_counter() - start, res
+
+
+def bitserial_tables(auth_key):
+    # Reference: previous table setup, one bit serial multiplication per entry
+    return tuple(tuple(CryptUtils.Aes.gf_2_128_mul(auth_key, j << (8 * i)) for j in range(256)) for i in range(16))
+
+
+def tables(rounds):
+    auth_key = random.getrandbits(128)
+    elapsed, _ = timed(bitserial_tables, auth_key)
+    print(f"GHASH table setup, bit serial: {elapsed * 1000:9.1f} ms")
+    total = 0
+    for _ in range(rounds):
+        AesGcm.table_cache.clear()
+        elapsed, _ = timed(AesGcm.ghash_tables, auth_key)
+        total += elapsed
+    print(f"GHASH table setup, linear:     {total / rounds * 1000:9.1f} ms")
+    elapsed, _ = timed(AesGcm.ghash_tables, auth_key)
+    print(f"GHASH table setup, cached:     {elapsed * 1000:9.3f} ms")
+
+
+def decrypt(size, pysize):
+    key = random.getrandbits(128)
+    iv = random.getrandbits(96)
+    aad = os.urandom(32)
+    plaintext = os.urandom(size)
+    ciphertext, tag = AesGcm(key).encrypt(iv, plaintext, aad)
+    elapsed, res = timed(AesGcm(key, native=True).decrypt, iv, ciphertext, tag, aad)
+    assert res == plaintext
+    print(f"Decrypt {size / 0x100000:.1f} MiB, native:      {elapsed * 1000:9.1f} ms " +
+          f"({size / elapsed / 0x100000:.0f} MiB/s)")
+    pysize = min(size, pysize)
+    ciphertext, tag = AesGcm(key).encrypt(iv + 1, plaintext[:pysize], aad)
+    elapsed, res = timed(AesGcm(key, native=False).decrypt, iv + 1, ciphertext, tag, aad)
+    assert res == plaintext[:pysize]
+    print(f"Decrypt {pysize / 0x100000:.1f} MiB, pure python: {elapsed * 1000:9.1f} ms " +
+          f"({pysize / elapsed / 0x100000:.2f} MiB/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure AES-GCM setup and decryption speed")
+    parser.add_argument("--size", type=int, default=16 * 0x100000, help="Image size for the native path")
+    parser.add_argument("--pysize", type=int, default=0x100000, help="Image size for the pure python path")
+    parser.add_argument("--rounds", type=int, default=10, help="Number of table setups to average")
+    args = parser.parse_args()
+    tables(args.rounds)
+    decrypt(args.size, args.pysize)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import os
+import sys
+import timeit
+from struct import unpack
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mtkclient.Library import checksum  # noqa: E402
+
+
+def ref_sum16(data):
+    return sum(data) & 0xFFFF
+
+
+def ref_xor16(data):
+    chksum = 0
+    for x in range(0, len(data) & ~1, 2):
+        chksum ^= unpack("<H", data[x:x + 2])[0]
+    return chksum
+
+
+def ref_sum32(data):
+    chksum = 0
+    for i in range(0, len(data) // 4):
+        chksum += unpack("<I", data[i * 4:(i * 4) + 4])[0]
+    return chksum & 0xFFFFFFFF
+
+
+def check():
+    for length in [0, 1, 2, 3, 4, 255, 256, 257, 1023, 1024, 1025, 0x10000 + 3, 0x100000]:
+        for data in [os.urandom(length), b"\xFF" * length, bytes(length)]:
+            assert checksum.sum16(data) == ref_sum16(data), f"sum16 mismatch at length {length}"
+            assert checksum.sum16(bytearray(data), 0x1234) == (ref_sum16(data) + 0x1234) & 0xFFFF
+            assert checksum.xor16(data) == ref_xor16(data), f"xor16 mismatch at length {length}"
+            assert checksum.sum32(data) == ref_sum32(data), f"sum32 mismatch at length {length}"
+            assert checksum.sum16(memoryview(data)[1:]) == ref_sum16(data[1:])
+    print("All checksums match the reference implementations.")
+
+
+def bench(size=0x100000, rounds=5):
+    data = os.urandom(size)
+    print(f"Backend: {'numpy' if checksum.np is not None else 'stdlib'}, buffer: {hex(size)} bytes")
+    for name, ref, new in [("sum16", ref_sum16, checksum.sum16),
+                           ("xor16", ref_xor16, checksum.xor16),
+                           ("sum32", ref_sum32, checksum.sum32)]:
+        told = timeit.timeit(lambda: ref(data), number=rounds) / rounds
+        tnew = timeit.timeit(lambda: new(data), number=rounds) / rounds
+        print(f"{name}: reference {told * 1000:8.2f} ms, vectorized {tnew * 1000:8.2f} ms, " +
+              f"speedup {told / tnew:6.1f}x, {size / tnew / 1024 / 1024:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    check()
+    bench()
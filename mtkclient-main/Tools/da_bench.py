@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+from argparse import Namespace
+from contextlib import redirect_stdout, redirect_stderr
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mtkclient.config.mtk_config import MtkConfig  # noqa: E402
+from mtkclient.Library.mtk_class import Mtk  # noqa: E402
+from mtkclient.Library.DA.mtk_da_handler import DaHandler  # noqa: E402
+from mtkclient.Library.gpt import GptSettings  # noqa: E402
+from mtkclient.Library.Connection.sessionlib import RecordMixin, SessionPlayer  # noqa: E402
+from mtkclient.Library.Connection.wiretrace import WireTrace  # noqa: E402
+from mtkclient.Library.Simulator.sim_storage import FlashStorage  # noqa: E402
+from mtkclient.Library.Simulator.sim_xflash import SimXFlash  # noqa: E402
+from mtkclient.Library.Simulator.sim_xml import SimXml  # noqa: E402
+from mtkclient.Library.Simulator.sim_legacy import SimLegacy  # noqa: E402
+
+backends = {"xflash": SimXFlash, "xml": SimXml, "legacy": SimLegacy}
+commands = ["rf", "rl", "w", "wl", "e", "fs", "rpmb", "replay"]
+MB = 0x100000
+
+
+def peak_rss():
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def random_file(filename, size):
+    with open(filename, "wb") as wf:
+        for pos in range(0, size, MB):
+            wf.write(os.urandom(min(MB, size - pos)))
+
+
+def same(filename, view):
+    with open(filename, "rb") as rf:
+        for pos in range(0, len(view), MB):
+            # bytes, comparing against a memoryview goes element by element
+            if rf.read(MB) != bytes(view[pos:pos + MB]):
+                return False
+        return rf.read(1) == b""
+
+
+class Bench:
+    def __init__(self, args, backend, workdir, record=None):
+        self.args = args
+        self.workdir = workdir
+        self.record = record
+        fill = os.urandom if args.image is None else None
+        self.storage = FlashStorage(args.flashtype, user_size=args.size, filename=args.image, fill=fill)
+        if not self.storage.has_gpt():
+            self.storage.format_gpt()
+        devclass = backends[backend]
+        if record is not None:
+            # records the session like --record does on a real device
+            devclass = type(f"Recorded{devclass.__name__}", (RecordMixin, devclass), {})
+        self.device = devclass(self.storage, latency=args.latency, bandwidth=args.bandwidth)
+        if record is not None:
+            self.device.setup_recording(record)
+        self.device.write_state(workdir)
+        self.da_handler, self.mtk = self.attach(simulator=self.device)
+        pagesize = self.mtk.config.pagesize
+        _, guid_gpt = self.mtk.daloader.get_gpt()
+        # name, offset, size; the last partition (userdata) only takes part in rf and rl
+        self.partitions = [(part.name, part.sector * pagesize, part.sectors * pagesize)
+                           for part in guid_gpt.partentries]
+
+    def attach(self, **settings):
+        """
+        Sets up the host side for the already running DA, settings are set on the config (simulator, replay).
+        """
+        config = MtkConfig(loglevel=logging.ERROR, gui=None, guiprogress=None)
+        config.hwparam_path = self.workdir
+        config.gpt_settings = GptSettings(0, 0, 0)
+        for key, value in settings.items():
+            setattr(config, key, value)
+        mtk = Mtk(config=config, loglevel=logging.ERROR, serialportname=None)
+        da_handler = DaHandler(mtk, logging.ERROR)
+        return da_handler, da_handler.configure_da(mtk, None)
+
+    def user(self, offset, size):
+        return self.storage.read("user", offset, size)
+
+    def largest(self):
+        return max(self.partitions[:-1], key=lambda part: part[2])
+
+    def prepare(self, cmd):
+        """
+        Creates the input of cmd, returns the number of bytes it processes, a function running it and
+        a function verifying the flash or file contents afterwards.
+        """
+        workdir = self.workdir
+        handle = self.da_handler.handle_da_cmds
+        partitions = self.partitions[:-1]
+        if cmd == "rf":
+            filename = os.path.join(workdir, "flash.bin")
+            length = self.storage.size("user")
+
+            def run():
+                handle(self.mtk, "rf", Namespace(filename=filename, parttype=None))
+
+            def check():
+                return same(filename, self.user(0, length))
+        elif cmd == "rl":
+            directory = os.path.join(workdir, "rl")
+            length = sum(size for _, _, size in self.partitions)
+
+            def run():
+                handle(self.mtk, "rl", Namespace(directory=directory, parttype=None, skip=None))
+
+            def check():
+                return all(same(os.path.join(directory, name + ".bin"), self.user(offset, size))
+                           for name, offset, size in self.partitions)
+        elif cmd == "w":
+            name, offset, length = self.largest()
+            filename = os.path.join(workdir, name + ".bin")
+            random_file(filename, length)
+
+            def run():
+                handle(self.mtk, "w", Namespace(partitionname=name, filename=filename, parttype=None))
+
+            def check():
+                return same(filename, self.user(offset, length))
+        elif cmd == "wl":
+            directory = os.path.join(workdir, "wl")
+            os.makedirs(directory)
+            for name, offset, size in partitions:
+                random_file(os.path.join(directory, name + ".bin"), size)
+            length = sum(size for _, _, size in partitions)
+
+            def run():
+                handle(self.mtk, "wl", Namespace(directory=directory, parttype=None))
+
+            def check():
+                return all(same(os.path.join(directory, name + ".bin"), self.user(offset, size))
+                           for name, offset, size in partitions)
+        elif cmd == "e":
+            if self.mtk.daloader.xmlft is not None:
+                # DAXML.formatflash reads one more response after ERASE-FLASH, which the simulator doesn't model
+                raise NotImplementedError("e isn't modelled for the xml DA")
+            names = ",".join(name for name, _, _ in partitions)
+            length = sum(size for _, _, size in partitions)
+
+            def run():
+                handle(self.mtk, "e", Namespace(partitionname=names, parttype=None))
+
+            def check():
+                return all(bytes(self.user(offset, size)).count(0) == size for _, offset, size in partitions)
+        elif cmd == "fs":
+            # Operations of the fuse mount without mounting it, so no fuse kernel module is needed
+            try:
+                from mtkclient.Library.Filesystem.mtkdafs import MtkDaFS
+            except (ImportError, OSError) as err:
+                raise NotImplementedError(f"fs needs fusepy: {str(err)}")
+            fs = MtkDaFS(self.da_handler, rw=False, cachesize=64)
+            name, offset, length = self.largest()
+            path = f"/partitions/{name}"
+            received = []
+
+            def run():
+                fs.readdir("/partitions", None)
+                # fuse reads in max_read chunks of 128k
+                for pos in range(0, length, 0x20000):
+                    received.append(len(fs.read(path, 0x20000, pos, None)))
+
+            def check():
+                last = (length - 1) & ~0x1FFFF
+                return sum(received) == length and all(
+                    fs.read(path, 0x20000, pos, None) == bytes(self.user(offset + pos, min(0x20000, length - pos)))
+                    for pos in [0, last])
+        elif cmd == "rpmb":
+            if self.mtk.daloader.xft is None and self.mtk.daloader.xmlft is None:
+                raise NotImplementedError("rpmb isn't supported by this DA")
+            sectors = min(self.args.rpmb_sectors, self.storage.size("rpmb") // 0x100)
+            wfilename = os.path.join(workdir, "rpmb_w.bin")
+            rfilename = os.path.join(workdir, "rpmb_r.bin")
+            random_file(wfilename, sectors * 0x100)
+            length = 2 * sectors * 0x100
+
+            def run():
+                # write the frames, then read them back
+                for subcmd, filename in [("w", wfilename), ("r", rfilename)]:
+                    handle(self.mtk, "da", Namespace(subcmd="rpmb", rpmb_subcmd=subcmd, filename=filename,
+                                                     sector="0", sectors=str(sectors)))
+
+            def check():
+                frames = self.storage.read("rpmb", 0, sectors * 0x100)
+                return same(wfilename, frames) and same(rfilename, frames)
+        elif cmd == "replay":
+            # rf on the recorded device, timed is the replay of that session without a device
+            if self.record is None:
+                raise ValueError("replay needs a recorded device")
+            recorded = os.path.join(workdir, "recorded.bin")
+            replayed = os.path.join(workdir, "replayed.bin")
+            length = self.storage.size("user")
+            handle(self.mtk, "rf", Namespace(filename=recorded, parttype=None))
+            self.mtk.port.close()
+            self.device.session.trace.close()
+            da_handler, mtk = self.attach(replay=self.record)
+            # the recording starts with the gpt read of __init__
+            mtk.daloader.get_gpt()
+            player = SessionPlayer.get(self.record)
+
+            def run():
+                da_handler.handle_da_cmds(mtk, "rf", Namespace(filename=replayed, parttype=None))
+
+            def check():
+                view = self.user(0, length)
+                return (same(recorded, view) and same(replayed, view) and player.mismatches == 0 and
+                        not player.remaining()[WireTrace.RX])
+        else:
+            raise ValueError(f"Unknown command {cmd}")
+        return length, run, check
+
+
+def worker(args):
+    """
+    Runs one backend and command in this process, prints the result as json.
+    """
+    backend, cmd = args.worker.split(":")
+    workdir = tempfile.mkdtemp(prefix="da_bench_")
+    result = dict(backend=backend, cmd=cmd)
+    try:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+            record = os.path.join(workdir, "session.rec") if cmd == "replay" else None
+            bench = Bench(args, backend, workdir, record)
+            length, run, check = bench.prepare(cmd)
+            setup_rss = peak_rss()
+            device = bench.device
+            start, cpu, simcpu = time.perf_counter(), time.process_time(), device.cpu
+            try:
+                run()
+            except SystemExit:
+                pass
+            elapsed = time.perf_counter() - start
+            simcpu = device.cpu - simcpu
+            cpu = time.process_time() - cpu - simcpu
+            ok = check()
+            bench.storage.close()
+        result.update(bytes=length, ok=ok, elapsed=elapsed, cpu=cpu, simcpu=simcpu, setup_rss=setup_rss,
+                      peak_rss=peak_rss())
+    except NotImplementedError as err:
+        result.update(skipped=str(err))
+    except Exception as err:
+        result.update(error=f"{type(err).__name__}: {str(err)}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(result))
+
+
+def report(result):
+    name = f"{result['backend']:7s} {result['cmd']:6s}"
+    if "skipped" in result or "error" in result:
+        print(f"{name} {result.get('skipped') or result.get('error')}")
+        return
+    mbytes = max(result["bytes"], 1) / MB
+    print(f"{name} {mbytes:8.1f} {mbytes / max(result['elapsed'], 1e-9):9.1f} " +
+          f"{result['cpu'] / mbytes * 1000:10.2f} {result['simcpu'] / mbytes * 1000:10.2f} " +
+          f"{result['peak_rss'] / MB:9.1f} {(result['peak_rss'] - result['setup_rss']) / MB:8.1f}" +
+          ("" if result["ok"] else "  DATA MISMATCH"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure DA flash commands against the simulated device " +
+                                                 "(mtkclient/Library/Simulator)")
+    parser.add_argument("--backends", default=",".join(backends), help="Comma separated DA backends")
+    parser.add_argument("--commands", default=",".join(commands),
+                        help="Comma separated commands, fs reads a partition through the fuse operations, " +
+                             "rpmb writes and reads back --rpmb-sectors frames, replay replays a recorded rf " +
+                             "session without the device")
+    parser.add_argument("--flashtype", default="emmc", choices=["emmc", "ufs"], help="Simulated storage")
+    parser.add_argument("--size", type=lambda x: int(x, 0), default=0x4000000, help="User area size")
+    parser.add_argument("--image", default=None, help="Back the user area by this image file instead of memory")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated latency per usb transfer in s")
+    parser.add_argument("--bandwidth", type=lambda x: int(x, 0), default=0,
+                        help="Simulated link bandwidth in bytes/s, 0 is unlimited")
+    parser.add_argument("--rpmb-sectors", type=lambda x: int(x, 0), default=0x400, help="Rpmb frames to transfer")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker is not None:
+        worker(args)
+        return
+
+    print("Backend Cmd         MB     MB/s  CPU ms/MB  Sim ms/MB  Peak RSS  +RSS MB")
+    for backend in args.backends.split(","):
+        for cmd in args.commands.split(","):
+            # A fresh process per run, so the peak rss belongs to this command
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", f"{backend}:{cmd}"] +
+                                  sys.argv[1:], capture_output=True, text=True)
+            lines = proc.stdout.strip().splitlines()
+            try:
+                result = json.loads(lines[-1])
+            except (IndexError, ValueError):
+                result = dict(backend=backend, cmd=cmd, error=(proc.stderr.strip().splitlines() or ["failed"])[-1])
+            report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+rootdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def run(args):
+    start = time.perf_counter()
+    res = subprocess.run([sys.executable] + args, cwd=rootdir, capture_output=True, text=True)
+    return time.perf_counter() - start, res
+
+
+def startup(rounds):
+    times = []
+    for _ in range(rounds):
+        elapsed, res = run(["mtk.py", "--help"])
+        if res.returncode != 0:
+            print(res.stderr)
+            sys.exit(1)
+        times.append(elapsed)
+    print(f"mtk.py --help: median {statistics.median(times) * 1000:.1f} ms, min {min(times) * 1000:.1f} ms " +
+          f"over {rounds} runs")
+
+
+def top_imports(module, count):
+    _, res = run(["-X", "importtime", "-c", f"import {module}"])
+    entries = []
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            entries.append((int(fields[1]), int(fields[0]), fields[2].rstrip()))
+        except ValueError:
+            continue
+    entries.sort(reverse=True)
+    print(f"Slowest imports of {module} (cumulative / self in ms):")
+    for cumulative, selftime, name in entries[:count]:
+        print(f"  {cumulative / 1000:8.1f} {selftime / 1000:8.1f} {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure mtkclient cli startup and import time")
+    parser.add_argument("--rounds", type=int, default=10, help="Number of mtk.py starts to measure")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest imports to list")
+    parser.add_argument("--module", default="mtkclient.Library.mtk_main", help="Module to profile")
+    args = parser.parse_args()
+    # First run writes the bytecode cache, so it doesn't count
+    run(["mtk.py", "--help"])
+    startup(args.rounds)
+    top_imports(args.module, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import os
+import sys
+import time
+import logging
+from struct import pack, unpack
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mtkclient.Library.Port import Port  # noqa: E402
+from mtkclient.Library.mtk_preloader import Preloader  # noqa: E402
+
+
+class SimulatedPreloader:
+    """
+    Minimal bootrom/preloader WRITE32 handler. Every received byte is echoed like on the device,
+    each usb transfer costs latency seconds to model the usb round trip.
+    """
+
+    def __init__(self, latency=0.0001):
+        self.latency = latency
+        self.memory = {}
+        self.rx = bytearray()
+        self.tx = bytearray()
+        self.transfers = 0
+        self.state = self.state_cmd()
+        # number of bytes the device waits for before it echoes them and advances
+        self.need = next(self.state)
+
+    def state_cmd(self):
+        while True:
+            cmd = yield 1
+            if cmd != Preloader.Cmd.WRITE32.value:
+                raise ValueError(f"Unsupported command {cmd.hex()}")
+            addr = unpack(">I", (yield 4))[0]
+            count = unpack(">I", (yield 4))[0]
+            self.tx.extend(pack(">H", 0))
+            for i in range(count):
+                self.memory[addr + i * 4] = unpack(">I", (yield 4))[0]
+            self.tx.extend(pack(">H", 0))
+
+    def transfer(self):
+        self.transfers += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def usbwrite(self, data):
+        self.transfer()
+        self.rx.extend(data)
+        need = self.need
+        while len(self.rx) >= need:
+            value = bytes(self.rx[:need])
+            del self.rx[:need]
+            self.tx.extend(value)
+            need = self.state.send(value)
+        self.need = need
+        return True
+
+    def usbread(self, resplen=None, maxtimeout=0):
+        self.transfer()
+        data = bytes(self.tx[:resplen])
+        del self.tx[:resplen]
+        return data
+
+    def rword(self, count=1, little=False):
+        return unpack(("<" if little else ">") + "H", self.usbread(2))[0]
+
+    def rdword(self, count=1, little=False):
+        return unpack(("<" if little else ">") + "I", self.usbread(4))[0]
+
+    def rbyte(self, count=1):
+        return self.usbread(count)
+
+    def mtk_cmd(self, value, bytestoread=0, nocmd=False):
+        raise NotImplementedError()
+
+    def echo(self, data):
+        return Port.echo(self, data)
+
+    def echo_bulk(self, data, window=0x100):
+        return Port.echo_bulk(self, data, window)
+
+
+def legacy_writemem(preloader, addr, data):
+    # Reference: one WRITE32 command and one echo round trip per dword
+    for i in range(0, len(data), 4):
+        value = unpack("<I", data[i:i + 4].ljust(4, b"\x00"))[0]
+        if preloader.echo(preloader.Cmd.WRITE32.value):
+            if preloader.echo(pack(">I", addr + i)):
+                preloader.echo(pack(">I", 1))
+                preloader.rword()
+                preloader.echo(pack(">I", value))
+                preloader.rword()
+
+
+def run(size, latency):
+    data = os.urandom(size)
+    results = []
+    for name, func in [("per-dword", legacy_writemem), ("bulk", Preloader.writemem)]:
+        port = SimulatedPreloader(latency)
+        mtk = SimpleNamespace(port=port, config=SimpleNamespace(gui=False))
+        preloader = Preloader(mtk, loglevel=logging.ERROR)
+        start = time.perf_counter()
+        func(preloader, 0x100000, data)
+        elapsed = time.perf_counter() - start
+        written = b"".join(pack("<I", port.memory.get(0x100000 + i, 0)) for i in range(0, size, 4))
+        assert written == data, f"{name}: memory content mismatch"
+        results.append((name, port.transfers, elapsed))
+    print(f"Payload {hex(size)} bytes, simulated usb latency {latency * 1e6:.0f} us per transfer")
+    for name, transfers, elapsed in results:
+        print(f"  {name:10s}: {transfers:7d} usb transfers, {elapsed * 1000:9.1f} ms")
+    print(f"  speedup {results[0][2] / results[1][2]:.1f}x")
+
+
+if __name__ == "__main__":
+    for size in [0x400, 0x4000]:
+        run(size, 0.0001)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import os
+import sys
+import argparse
+from struct import unpack
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from mtkclient.Library.Connection.wiretrace import WireTrace  # noqa: E402
+from mtkclient.Library.DA.xflash.xflash_param import Cmd as XFlashCmd  # noqa: E402
+from mtkclient.Library.DA.xflash.extension.xflash import XCmd  # noqa: E402
+from mtkclient.Library.DA.legacy.dalegacy_param import Cmd as LegacyCmd  # noqa: E402
+
+
+def command_names(*classes):
+    names = {}
+    for cls in classes:
+        for name, value in vars(cls).items():
+            if name.startswith("_") or name == "MAGIC":
+                continue
+            if hasattr(value, "value"):
+                value = value.value
+            if isinstance(value, (int, bytes)):
+                names.setdefault(value, name)
+    return names
+
+
+def preloader_names():
+    from mtkclient.Library.mtk_preloader import Preloader
+    return {cmd.value: cmd.name for cmd in Preloader.Cmd}
+
+
+def hexdump(data, limit):
+    text = data[:limit].hex()
+    if len(data) > limit:
+        text += "..."
+    return text
+
+
+def decode_xml(data):
+    text = bytes(data).rstrip(b"\x00").decode('utf-8', errors='replace')
+    return " ".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def detect(records):
+    for _, direction, _, data in records:
+        if direction in (WireTrace.TX, WireTrace.RX) and len(data) >= 4 and unpack("<I", data[:4])[0] == XFlashCmd.MAGIC:
+            for _, _, _, payload in records:
+                if payload[:5] == b"<?xml":
+                    return "xml"
+            return "xflash"
+    return "legacy"
+
+
+def describe(proto, direction, length, data, names, limit):
+    if direction == WireTrace.CONNECT:
+        vid, pid = unpack("<HH", data[:4])
+        return f"connect vid={hex(vid)} pid={hex(pid)}"
+    if direction == WireTrace.CTRL:
+        bm_request_type, b_request, w_value, w_index, isdata = unpack("<BBHHB", data[:7])
+        result = hexdump(data[7:], limit) if isdata else hex(unpack("<i", data[7:11])[0])
+        return (f"control type={hex(bm_request_type)} request={hex(b_request)} value={hex(w_value)} " +
+                f"index={hex(w_index)} -> {result}")
+    truncated = "" if len(data) == length else " (truncated)"
+    if len(data) == 12 and unpack("<I", data[:4])[0] == XFlashCmd.MAGIC:
+        _, datatype, plen = unpack("<III", data)
+        return f"frame type={datatype} length={hex(plen)}"
+    if proto == "xml" and (data[:5] == b"<?xml" or data[:4] in (b"OK\x00", b"OK@0")):
+        return decode_xml(data) + truncated
+    if proto == "xml" and len(data) < 0x40 and data.rstrip(b"\x00").isascii() and data[:1].isalpha():
+        return repr(bytes(data).rstrip(b"\x00").decode('ascii'))
+    if proto == "xflash" and length == 4:
+        value = unpack("<I", data)[0]
+        if direction == WireTrace.TX and value in names:
+            return f"{names[value]} ({hex(value)})"
+        return f"dword {hex(value)}"
+    if proto in ("legacy", "preloader") and direction == WireTrace.TX and length == 1 and bytes(data) in names:
+        return f"{names[bytes(data)]} ({data.hex()})"
+    return hexdump(data, limit) + truncated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print usb wire traces written by mtkclient (logs/wiretrace.bin)")
+    parser.add_argument("filename", help="Trace file")
+    parser.add_argument("--proto", default="auto", choices=["auto", "xml", "xflash", "legacy", "preloader"],
+                        help="Protocol used to decode the frames")
+    parser.add_argument("--hexlen", type=int, default=32, help="Number of payload bytes to print as hex")
+    parser.add_argument("--last", type=int, default=0, help="Only print the last N records")
+    args = parser.parse_args()
+
+    start, snaplen, records = WireTrace.load(args.filename)
+    proto = detect(records) if args.proto == "auto" else args.proto
+    if proto == "xflash":
+        names = command_names(XFlashCmd, XCmd)
+    elif proto == "preloader":
+        names = preloader_names()
+    else:
+        names = command_names(LegacyCmd)
+    if args.last:
+        records = records[-args.last:]
+    capture = "full payloads" if snaplen == 0 else f"first {snaplen} bytes per transfer"
+    print(f"{args.filename}: {len(records)} records, {capture}, protocol {proto}")
+    for ts, direction, length, data in records:
+        pre = {WireTrace.TX: "TX", WireTrace.RX: "RX", WireTrace.CTRL: "CT", WireTrace.CONNECT: "CO"}[direction]
+        print(f"{ts / 1e9:12.6f} {pre} {length:8d}  {describe(proto, direction, length, data, names, args.hexlen)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -271,6 +271,8 @@ def main():
     parser_r.add_argument('--da_addr', help='Set a specific da payload addr')
     parser_r.add_argument('--brom_addr', help='Set a specific brom payload addr')
     parser_r.add_argument('--gpt_file', help='Use a gpt file instead of trying to read gpt from flash')
+    parser_r.add_argument('--verifyread', action='store_true', default=False,
+                          help='Verify the checksum of each read packet (legacy DA only)')
     parser_r.add_argument('--ptype',
                           help='Set the payload type ( "amonet","kamakiri","kamakiri2","carbonara" kamakiri2/da ' +
                                'used by default)')
@@ -301,6 +303,8 @@ def main():
     parser_rl.add_argument('--da_addr', help='Set a specific da payload addr')
     parser_rl.add_argument('--brom_addr', help='Set a specific brom payload addr')
     parser_rl.add_argument('--gpt_file', help='Use a gpt file instead of trying to read gpt from flash')
+    parser_rl.add_argument('--verifyread', action='store_true', default=False,
+                           help='Verify the checksum of each read packet (legacy DA only)')
     parser_rl.add_argument('--ptype',
                            help='Set the payload type ( "amonet","kamakiri","kamakiri2","carbonara" kamakiri2/da ' +
                                 'used by default)')
@@ -326,6 +330,8 @@ def main():
     parser_rf.add_argument('--skip', help='Skip reading partition with names "partname1,partname2,etc."')
     parser_rf.add_argument('--skipwdt', help='Skip wdt init')
     parser_rf.add_argument('--gpt_file', help='Use a gpt file instead of trying to read gpt from flash')
+    parser_rf.add_argument('--verifyread', action='store_true', default=False,
+                           help='Verify the checksum of each read packet (legacy DA only)')
     parser_rf.add_argument('--wdt', help='Set a specific watchdog addr')
     parser_rf.add_argument('--mode', help='Set a crash mode (0=dasend1,1=dasend2,2=daread)')
     parser_rf.add_argument('--var1', help='Set kamakiri specific var1 value')
@@ -362,6 +368,8 @@ def main():
     parser_rs.add_argument('--gpt-part-entry-start-lba', default='0',
                            help='Set GPT entry start lba sector')
     parser_rs.add_argument('--gpt_file', help='Use a gpt file instead of trying to read gpt from flash')
+    parser_rs.add_argument('--verifyread', action='store_true', default=False,
+                           help='Verify the checksum of each read packet (legacy DA only)')
     parser_rs.add_argument('--skip', help='Skip reading partition with names "partname1,partname2,etc."')
     parser_rs.add_argument('--skipwdt', help='Skip wdt init')
     parser_rs.add_argument('--wdt', help='Set a specific watchdog addr')
@@ -421,6 +429,7 @@ def main():
     parser_fs.add_argument('mountpoint', help='Directory to mount the FUSE filesystem in')
     parser_fs.add_argument('--rw', help='Mount the filesystem as writeable', default=False,
                            action='store_true')
+    parser_fs.add_argument('--cachesize', help='Size of the read cache in MiB', default=64, type=int)
 
     parser_w.add_argument('partitionname',
                           help='Partition to write (separate by comma for multiple partitions)')
@@ -437,6 +446,8 @@ def main():
     parser_w.add_argument('--skip', help='Skip reading partition with names "partname1,partname2,etc."')
     parser_w.add_argument('--skipwdt', help='Skip wdt init')
     parser_w.add_argument('--gpt_file', help='Use a gpt file instead of trying to read gpt from flash')
+    parser_w.add_argument('--skipzero', action='store_true', default=False,
+                          help='Erase all-zero areas instead of writing them')
     parser_w.add_argument('--wdt', help='Set a specific watchdog addr')
     parser_w.add_argument('--mode', help='Set a crash mode (0=dasend1,1=dasend2,2=daread)')
     parser_w.add_argument('--var1', help='Set kamakiri specific var1 value')
@@ -469,6 +480,8 @@ def main():
     parser_wf.add_argument('--gpt-part-entry-start-lba', default='0', help='Set GPT entry start lba sector')
     parser_wf.add_argument('--skip', help='Skip reading partition with names "partname1,partname2,etc."')
     parser_wf.add_argument('--gpt_file', help='Use a gpt file instead of trying to read gpt from flash')
+    parser_wf.add_argument('--skipzero', action='store_true', default=False,
+                           help='Erase all-zero areas instead of writing them')
     parser_wf.add_argument('--skipwdt', help='Skip wdt init')
     parser_wf.add_argument('--wdt', help='Set a specific watchdog addr')
     parser_wf.add_argument('--mode', help='Set a crash mode (0=dasend1,1=dasend2,2=daread)')
@@ -499,6 +512,8 @@ def main():
     parser_wl.add_argument('--gpt-part-entry-size', default='0', help='Set GPT entry size')
     parser_wl.add_argument('--gpt-part-entry-start-lba', default='0', help='Set GPT entry start lba sector')
     parser_wl.add_argument('--gpt_file', help='Use a gpt file instead of trying to read gpt from flash')
+    parser_wl.add_argument('--skipzero', action='store_true', default=False,
+                           help='Erase all-zero areas instead of writing them')
     parser_wl.add_argument('--skip', help='Skip reading partition with names "partname1,partname2,etc."')
     parser_wl.add_argument('--skipwdt', help='Skip wdt init')
     parser_wl.add_argument('--wdt', help='Set a specific watchdog addr')
@@ -934,6 +949,67 @@ def main():
     parser_script.add_argument('--serialport', help='Use serial port', default=None, const='DETECT',
                                action='store', type=str, nargs='?')
 
+    parser_printgpt.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                                 type=str)
+    parser_footer.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                               type=str)
+    parser_e.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                          type=str)
+    parser_es.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                           type=str)
+    parser_wl.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                           type=str)
+    parser_wf.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                           type=str)
+    parser_w.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                          type=str)
+    parser_rs.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                           type=str)
+    parser_rf.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                           type=str)
+    parser_rl.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                           type=str)
+    parser_gpt.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                            type=str)
+    parser_r.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                          type=str)
+    parser_reset.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                              type=str)
+    parser_payload.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                                type=str)
+    parser_script.add_argument('--record', help='Record the usb session to a file for replay', default=None,
+                               type=str)
+    parser_printgpt.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                                 type=str)
+    parser_footer.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                               type=str)
+    parser_e.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                          type=str)
+    parser_es.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                           type=str)
+    parser_wl.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                           type=str)
+    parser_wf.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                           type=str)
+    parser_w.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                          type=str)
+    parser_rs.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                           type=str)
+    parser_rf.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                           type=str)
+    parser_rl.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                           type=str)
+    parser_gpt.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                            type=str)
+    parser_r.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                          type=str)
+    parser_reset.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                              type=str)
+    parser_payload.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                                type=str)
+    parser_script.add_argument('--replay', help='Replay a recorded session instead of using a device', default=None,
+                               type=str)
+
     parser_script.add_argument('--noreconnect', action="store_true", help='Disable reconnect')
     parser_printgpt.add_argument('--noreconnect', action="store_true", help='Disable reconnect')
     parser_footer.add_argument('--noreconnect', action="store_true", help='Disable reconnect')
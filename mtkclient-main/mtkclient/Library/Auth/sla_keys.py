@@ -17,19 +17,26 @@ class SlaKey:
         self.d = d
         self.n = n
         self.e = e
-        if isinstance(d,int):
-            d_da = d
-        else:
-            d_da = bytes_to_long(bytes.fromhex(self.d))
-        if isinstance(n, int):
-            n_da = n
-        else:
-            n_da = bytes_to_long(bytes.fromhex(self.n))
-        if isinstance(e, int):
-            e_da = e
-        else:
-            e_da = bytes_to_long(bytes.fromhex(self.e))
-        self.key = RSA.construct((n_da,d_da,e_da))
+        self._key = None
+
+    @property
+    def key(self):
+        # RSA.construct checks the key consistency, which is slow, so only do it for keys actually used
+        if self._key is None:
+            if isinstance(self.d, int):
+                d_da = self.d
+            else:
+                d_da = bytes_to_long(bytes.fromhex(self.d))
+            if isinstance(self.n, int):
+                n_da = self.n
+            else:
+                n_da = bytes_to_long(bytes.fromhex(self.n))
+            if isinstance(self.e, int):
+                e_da = self.e
+            else:
+                e_da = bytes_to_long(bytes.fromhex(self.e))
+            self._key = RSA.construct((n_da, d_da, e_da))
+        return self._key
 
 
 da_sla_keys = [
@@ -1,12 +1,10 @@
 #!/usr/bin/python3
 # -*- coding: utf-8 -*-
 # (c) B.Kerler 2018-2024
-import inspect
-import traceback
 import logging
 import os
-from binascii import hexlify
 from mtkclient.Library.utils import LogBase, unpack
+from mtkclient.Library.Connection.wiretrace import WireTrace
 
 
 class DeviceClass(metaclass=LogBase):
@@ -34,10 +32,13 @@ class DeviceClass(metaclass=LogBase):
         self.warning = self.__logger.warning
         self.debug = self.__logger.debug
         self.__logger.setLevel(loglevel)
+        # The last transfers are always kept in memory, debug mode also captures all payloads
+        self.trace = WireTrace()
         if loglevel == logging.DEBUG:
             logfilename = os.path.join("logs", "log.txt")
             fh = logging.FileHandler(logfilename, encoding='utf-8')
             self.__logger.addHandler(fh)
+            self.trace.open(os.path.join("logs", "wiretrace.bin"))
 
     def get_read_packetsize(self):
         raise NotImplementedError()
@@ -84,6 +85,12 @@ class DeviceClass(metaclass=LogBase):
     def usbread(self, resplen=None, timeout=0, w_max_packet_size=None):
         raise NotImplementedError()
 
+    def usbreadinto(self, buffer, maxtimeout=100, w_max_packet_size=None):
+        view = memoryview(buffer).cast('B')
+        data = self.usbread(len(view), maxtimeout=maxtimeout, w_max_packet_size=w_max_packet_size)
+        view[:len(data)] = data
+        return len(data)
+
     def usbxmlread(self, maxtimeout=100):
         raise NotImplementedError()
 
@@ -124,33 +131,10 @@ class DeviceClass(metaclass=LogBase):
         return self.usbread(count)
 
     def verify_data(self, data, pre="RX:"):
-        if self.__logger.level == logging.DEBUG:
-            frame = inspect.currentframe()
-            stack_trace = traceback.format_stack(frame)
-            td = []
-            for trace in stack_trace:
-                if "verify_data" not in trace and "Port" not in trace:
-                    td.append(trace)
-            self.debug(td[:-1])
-
-        if isinstance(data, bytes) or isinstance(data, bytearray):
-            if data[:5] == b"<?xml":
-                try:
-                    rdata = b""
-                    for line in data.split(b"\n"):
-                        try:
-                            self.debug(pre + line.decode('utf-8'))
-                            rdata += line + b"\n"
-                        except Exception:
-                            v = hexlify(line)
-                            self.debug(pre + v.decode('utf-8'))
-                    return rdata
-                except Exception as err:
-                    self.debug(str(err))
-                    pass
-            if logging.DEBUG >= self.__logger.level:
-                self.debug(pre + hexlify(data).decode('utf-8'))
-        else:
-            if logging.DEBUG >= self.__logger.level:
-                self.debug(pre + hexlify(data).decode('utf-8'))
+        self.trace.record(WireTrace.TX if pre == "TX:" else WireTrace.RX, data)
         return data
+
+    def dump_trace(self, filename=os.path.join("logs", "wiretrace_ring.bin")):
+        # Saves the last transfers, to be looked at with Tools/wiretrace_decode.py
+        self.trace.dump(filename)
+        self.info(f"Wrote the last {len(self.trace.ring)} transfers to {filename}")
@@ -90,6 +90,7 @@ class SerialClass(DeviceClass):
         self.read(1)
 
     def close(self, reset=False):
+        self.trace.flush()
         if self.connected:
             self.device.close()
             del self.device
@@ -158,7 +159,7 @@ class SerialClass(DeviceClass):
                     if i == 3:
                         return False
                     pass
-        self.verify_data(bytearray(command), "TX:")
+        self.verify_data(command, "TX:")
         self.device.flushOutput()
         # timeout = 0
         time.sleep(0.005)
@@ -252,9 +253,60 @@ class SerialClass(DeviceClass):
 
         if loglevel == logging.DEBUG:
             self.debug(inspect.currentframe().f_back.f_code.co_name + ":" + hex(resplen))
-            if self.loglevel == logging.DEBUG:
-                self.verify_data(res[:resplen], "RX:")
-        return res[:resplen]
+        res = res[:resplen]
+        self.verify_data(res, "RX:")
+        return res
+
+    def usbreadinto(self, buffer, maxtimeout=0, w_max_packet_size=None):
+        view = memoryview(buffer).cast('B')
+        resplen = len(view)
+        if resplen <= 0:
+            self.info("Warning !")
+        if self.device is None:
+            return 0
+        timeout = maxtimeout / 1000
+        if timeout < 0.02:
+            timeout = 0.02
+        self.device.timeout = timeout
+        pos = 0
+        q = self.queue
+        while pos < resplen and not q.empty():
+            data = q.get()
+            sz = min(len(data), resplen - pos)
+            view[pos:pos + sz] = data[:sz]
+            pos += sz
+            if sz < len(data):
+                rest = [data[sz:]]
+                while not q.empty():
+                    rest.append(q.get())
+                for item in rest:
+                    q.put(item)
+        readinto = self.device.readinto
+        while pos < resplen:
+            try:
+                rlen = readinto(view[pos:])
+                if not rlen:
+                    break
+                pos += rlen
+            except Exception as e:
+                error = str(e)
+                if "timed out" in error:
+                    self.debug("Timed out")
+                    if timeout == 10:
+                        return pos
+                    timeout += 1
+                    pass
+                elif "Overflow" in error:
+                    self.error("USB Overflow")
+                    return pos
+                else:
+                    self.info(repr(e))
+                    return pos
+
+        if self.loglevel == logging.DEBUG:
+            self.debug(inspect.currentframe().f_back.f_code.co_name + ":" + hex(resplen))
+        self.verify_data(view[:pos], "RX:")
+        return pos
 
     def usbxmlread(self, timeout=0):
         resplen = self.device.in_waiting
@@ -291,9 +343,9 @@ class SerialClass(DeviceClass):
 
         if loglevel == logging.DEBUG:
             self.debug(inspect.currentframe().f_back.f_code.co_name + ":" + hex(resplen))
-            if self.loglevel == logging.DEBUG:
-                self.verify_data(res[:resplen], "RX:")
-        return res[:resplen]
+        res = res[:resplen]
+        self.verify_data(res, "RX:")
+        return res
 
     def usbwrite(self, data, pktsize=None):
         if pktsize is None:
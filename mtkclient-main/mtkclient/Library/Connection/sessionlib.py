@@ -0,0 +1,385 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024
+"""
+Session record and replay. A recording is a wire trace with full payloads (see wiretrace.py), containing
+every transfer and control request of a real session in order. The replay transport serves the received
+data back without a device, so the host side of dumps and flashes can be profiled and regression tested.
+"""
+import array
+import logging
+import threading
+from struct import pack, unpack
+from mtkclient.Library.Connection.devicehandler import DeviceClass
+from mtkclient.Library.Connection.usblib import UsbClass
+from mtkclient.Library.Connection.seriallib import SerialClass
+from mtkclient.Library.Connection.wiretrace import WireTrace
+
+
+def pack_ctrl(bm_request_type, b_request, w_value, w_index, result):
+    if isinstance(result, int):
+        return pack("<BBHHBi", bm_request_type, b_request, w_value, w_index, 0, result)
+    return pack("<BBHHB", bm_request_type, b_request, w_value, w_index, 1) + bytes(result)
+
+
+def unpack_ctrl(data):
+    bm_request_type, b_request, w_value, w_index, isdata = unpack("<BBHHB", data[:7])
+    if isdata:
+        return (bm_request_type, b_request, w_value, w_index), array.array('B', data[7:])
+    return (bm_request_type, b_request, w_value, w_index), unpack("<i", data[7:11])[0]
+
+
+def ctrl_args(args, kwargs):
+    names = [("bmRequestType", "bm_request_type"), ("bRequest", "b_request"), ("wValue", "w_value"),
+             ("wIndex", "w_index")]
+    values = list(args[:4])
+    for pos in range(len(values), 4):
+        values.append(kwargs.get(names[pos][0], kwargs.get(names[pos][1], 0)))
+    return values
+
+
+class SessionRecorder:
+    # Recorders are shared per file, reconnects within one run append to the same recording
+    sessions = {}
+
+    def __init__(self, filename):
+        self.trace = WireTrace(size=1, snaplen=0, filename=filename)
+        # acks may be sent from a helper thread (AsyncSender) while the main thread reads,
+        # so the nesting depth is per thread, WireTrace serializes the records
+        self.local = threading.local()
+
+    @classmethod
+    def get(cls, filename):
+        if filename not in cls.sessions:
+            cls.sessions[filename] = SessionRecorder(filename)
+        return cls.sessions[filename]
+
+    @property
+    def depth(self):
+        return getattr(self.local, "depth", 0)
+
+    @depth.setter
+    def depth(self, value):
+        self.local.depth = value
+
+    def record(self, direction, data):
+        self.trace.record(direction, data)
+
+    def flush(self):
+        self.trace.flush()
+
+    def call(self, direction, func, *args, **kwargs):
+        """
+        Runs func and records its transfer, nested transport calls (usbwrite -> write -> EP_OUT.write)
+        are only recorded once at the outermost level.
+        """
+        self.depth += 1
+        try:
+            res = func(*args, **kwargs)
+        finally:
+            self.depth -= 1
+        if self.depth == 0:
+            if direction == WireTrace.TX:
+                self.record(WireTrace.TX, args[0] if res else b"")
+            elif direction == WireTrace.CTRL:
+                self.record(WireTrace.CTRL, pack_ctrl(*ctrl_args(args, kwargs), res))
+            else:
+                self.record(WireTrace.RX, res)
+        return res
+
+
+class RecordedEndpoint:
+    def __init__(self, endpoint, session):
+        self.endpoint = endpoint
+        self.session = session
+        self.wMaxPacketSize = endpoint.wMaxPacketSize
+
+    def write(self, data, timeout=None):
+        res = self.session.call(WireTrace.TX, self.endpoint.write, data, timeout)
+        return res
+
+    def read(self, size_or_buffer, timeout=None):
+        if isinstance(size_or_buffer, int):
+            return self.session.call(WireTrace.RX, self.endpoint.read, size_or_buffer, timeout)
+        # reads into a buffer return the length, record the filled part instead
+        self.session.depth += 1
+        try:
+            res = self.endpoint.read(size_or_buffer, timeout)
+        finally:
+            self.session.depth -= 1
+        if self.session.depth == 0:
+            self.session.record(WireTrace.RX, memoryview(size_or_buffer)[:res])
+        return res
+
+    def __getattr__(self, item):
+        return getattr(self.endpoint, item)
+
+
+class RecordedDevice:
+    def __init__(self, device, session):
+        self.device = device
+        self.session = session
+
+    def ctrl_transfer(self, *args, **kwargs):
+        return self.session.call(WireTrace.CTRL, self.device.ctrl_transfer, *args, **kwargs)
+
+    def __getattr__(self, item):
+        return getattr(self.device, item)
+
+
+class RecordMixin:
+    """
+    Records all transfers of the real transport it is mixed into (UsbClass, SerialClass).
+    """
+
+    def setup_recording(self, filename):
+        self.session = SessionRecorder.get(filename)
+
+    def connect(self, ep_in=-1, ep_out=-1):
+        res = super().connect(ep_in, ep_out)
+        self.session.record(WireTrace.CONNECT, pack("<HH", self.vid or 0, self.pid or 0))
+        if getattr(self, "EP_OUT", None) is not None and not isinstance(self.EP_OUT, RecordedEndpoint):
+            self.EP_OUT = RecordedEndpoint(self.EP_OUT, self.session)
+        if getattr(self, "EP_IN", None) is not None and not isinstance(self.EP_IN, RecordedEndpoint):
+            self.EP_IN = RecordedEndpoint(self.EP_IN, self.session)
+        if isinstance(self, UsbClass) and self.device is not None and not isinstance(self.device, RecordedDevice):
+            self.device = RecordedDevice(self.device, self.session)
+        return res
+
+    def close(self, reset=False):
+        if isinstance(getattr(self, "device", None), RecordedDevice):
+            self.device = self.device.device
+        self.session.flush()
+        return super().close(reset)
+
+    def write(self, command, pktsize=None):
+        if isinstance(command, str):
+            command = bytes(command, 'utf-8')
+        return self.session.call(WireTrace.TX, super().write, command, pktsize)
+
+    def usbread(self, resplen=None, *args, **kwargs):
+        return self.session.call(WireTrace.RX, super().usbread, resplen, *args, **kwargs)
+
+    def usbreadinto(self, buffer, *args, **kwargs):
+        self.session.depth += 1
+        try:
+            res = super().usbreadinto(buffer, *args, **kwargs)
+        finally:
+            self.session.depth -= 1
+        if self.session.depth == 0:
+            self.session.record(WireTrace.RX, memoryview(buffer).cast('B')[:res])
+        return res
+
+    def usbxmlread(self, *args, **kwargs):
+        return self.session.call(WireTrace.RX, super().usbxmlread, *args, **kwargs)
+
+    def ctrl_transfer(self, *args, **kwargs):
+        return self.session.call(WireTrace.CTRL, super().ctrl_transfer, *args, **kwargs)
+
+
+class UsbRecordClass(RecordMixin, UsbClass):
+    def __init__(self, filename, loglevel=logging.INFO, portconfig=None, devclass=-1):
+        super().__init__(loglevel, portconfig, devclass)
+        self.setup_recording(filename)
+
+
+class SerialRecordClass(RecordMixin, SerialClass):
+    def __init__(self, filename, loglevel=logging.INFO, portconfig=None, devclass=-1):
+        super().__init__(loglevel, portconfig, devclass)
+        self.setup_recording(filename)
+
+
+class SessionPlayer:
+    # Players are shared per file, so reconnects continue where the previous connection stopped
+    sessions = {}
+
+    def __init__(self, filename):
+        _, snaplen, records = WireTrace.load(filename)
+        if snaplen != 0:
+            raise ValueError(f"{filename} only contains truncated payloads and can't be replayed")
+        self.streams = {WireTrace.TX: [], WireTrace.RX: [], WireTrace.CTRL: [], WireTrace.CONNECT: []}
+        for _, direction, _, data in records:
+            self.streams[direction].append(data)
+        self.index = {direction: 0 for direction in self.streams}
+        self.offset = {WireTrace.TX: 0, WireTrace.RX: 0}
+        self.mismatches = 0
+
+    @classmethod
+    def get(cls, filename):
+        if filename not in cls.sessions:
+            cls.sessions[filename] = SessionPlayer(filename)
+        return cls.sessions[filename]
+
+    def next(self, direction):
+        idx = self.index[direction]
+        if idx >= len(self.streams[direction]):
+            return None
+        self.index[direction] += 1
+        return self.streams[direction][idx]
+
+    def take(self, direction, length=None, exact=True):
+        """
+        Returns length bytes of the stream, crossing record boundaries if exact is set,
+        otherwise up to length bytes of the current record. length None returns the rest of the record.
+        """
+        records = self.streams[direction]
+        res = bytearray()
+        while self.index[direction] < len(records):
+            record = records[self.index[direction]]
+            offset = self.offset[direction]
+            count = len(record) - offset
+            if length is not None:
+                count = min(count, length - len(res))
+            res.extend(record[offset:offset + count])
+            offset += count
+            if offset >= len(record):
+                self.index[direction] += 1
+                offset = 0
+            self.offset[direction] = offset
+            if length is None or len(res) == length or not exact:
+                break
+        return res
+
+    def remaining(self):
+        return {direction: len(records) - self.index[direction] for direction, records in self.streams.items()}
+
+
+class ReplayEndpoint:
+    def __init__(self, replay, wMaxPacketSize=512):
+        self.replay = replay
+        self.wMaxPacketSize = wMaxPacketSize
+
+    def write(self, data, timeout=None):
+        self.replay.usbwrite(data)
+        return len(data)
+
+    def read(self, size_or_buffer, timeout=None):
+        if isinstance(size_or_buffer, int):
+            return array.array('B', self.replay.session.take(WireTrace.RX, size_or_buffer, exact=False))
+        view = memoryview(size_or_buffer).cast('B')
+        data = self.replay.session.take(WireTrace.RX, len(view), exact=False)
+        view[:len(data)] = data
+        return len(data)
+
+
+class ReplayDevice:
+    def __init__(self, replay):
+        self.replay = replay
+
+    def ctrl_transfer(self, *args, **kwargs):
+        return self.replay.ctrl_transfer(*args, **kwargs)
+
+    def reset(self):
+        return
+
+    def __getattr__(self, item):
+        raise AttributeError(f"Replay device doesn't support {item}")
+
+
+class ReplayClass(DeviceClass):
+    """
+    Serves a recorded session back as fast as the host asks for it. Writes are compared against the
+    recording, strict=True raises on the first difference instead of counting it.
+    """
+
+    def __init__(self, filename, loglevel=logging.INFO, portconfig=None, devclass=-1, strict=False):
+        super().__init__(loglevel, portconfig, devclass)
+        self.session = SessionPlayer.get(filename)
+        self.strict = strict
+        self.EP_IN = ReplayEndpoint(self)
+        self.EP_OUT = ReplayEndpoint(self)
+        self.device = ReplayDevice(self)
+        self.vid = None
+        self.pid = None
+        if portconfig:
+            self.vid, self.pid = portconfig[0][0], portconfig[0][1]
+
+    def connect(self, ep_in=-1, ep_out=-1):
+        data = self.session.next(WireTrace.CONNECT)
+        if data is not None:
+            self.vid, self.pid = unpack("<HH", data)
+        self.connected = True
+        return True
+
+    def close(self, reset=False):
+        self.connected = False
+        remaining = self.session.remaining()
+        if self.session.mismatches or remaining[WireTrace.RX]:
+            self.debug(f"Replay closed with {self.session.mismatches} mismatching writes, {remaining} records left")
+
+    def setportname(self, portname: str):
+        self.portname = portname
+
+    def set_fast_mode(self, enabled: bool):
+        return
+
+    def flush(self):
+        return
+
+    def detectdevices(self):
+        return [UsbClass.DeviceClass(self.vid, self.pid)]
+
+    def get_interface_count(self):
+        return 1
+
+    def set_line_coding(self, baudrate=None, parity=0, databits=8, stopbits=1):
+        return
+
+    def setbreak(self):
+        return
+
+    def setcontrollinestate(self, rts=None, dtr=None, is_ftdi=False):
+        return
+
+    def get_read_packetsize(self):
+        return self.EP_IN.wMaxPacketSize
+
+    def get_write_packetsize(self):
+        return self.EP_OUT.wMaxPacketSize
+
+    def write(self, command, pktsize=None):
+        if isinstance(command, str):
+            command = bytes(command, 'utf-8')
+        expected = self.session.take(WireTrace.TX, len(command))
+        if expected != command:
+            self.session.mismatches += 1
+            if self.strict:
+                raise ValueError(f"Replay: write {bytes(command[:16]).hex()} differs from the recording " +
+                                 f"{bytes(expected[:16]).hex()}")
+        self.verify_data(command, "TX:")
+        return True
+
+    def usbwrite(self, data, pktsize=None):
+        return self.write(data, pktsize)
+
+    def usbread(self, resplen=None, maxtimeout=0, w_max_packet_size=None, **kwargs):
+        res = self.session.take(WireTrace.RX, resplen)
+        self.verify_data(res, "RX:")
+        return res
+
+    def usbreadinto(self, buffer, maxtimeout=0, w_max_packet_size=None):
+        view = memoryview(buffer).cast('B')
+        data = self.session.take(WireTrace.RX, len(view))
+        view[:len(data)] = data
+        self.verify_data(data, "RX:")
+        return len(data)
+
+    def usbxmlread(self, maxtimeout=0):
+        res = self.session.take(WireTrace.RX)
+        self.verify_data(res, "RX:")
+        return res
+
+    def usbreadwrite(self, data, resplen):
+        self.usbwrite(data)
+        return self.usbread(resplen)
+
+    def ctrl_transfer(self, *args, **kwargs):
+        data = self.session.next(WireTrace.CTRL)
+        if data is None:
+            return array.array('B') if ctrl_args(args, kwargs)[0] & 0x80 else 0
+        request, result = unpack_ctrl(data)
+        if request != tuple(ctrl_args(args, kwargs)):
+            self.session.mismatches += 1
+            if self.strict:
+                raise ValueError(f"Replay: control request {request} differs from the recording")
+        return result
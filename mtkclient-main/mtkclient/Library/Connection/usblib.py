@@ -16,7 +16,7 @@ import usb.backend.libusb1
 from struct import pack, calcsize
 from enum import Enum
 from binascii import hexlify
-from ctypes import c_void_p, c_int
+from ctypes import c_void_p, c_int, c_ubyte, POINTER, byref, cast
 
 from mtkclient.Library.DA.xml.xml_param import max_xml_data_length
 from mtkclient.Library.utils import write_object
@@ -146,38 +146,6 @@ class UsbClass(DeviceClass):
     def set_fast_mode(self, enabled):
         self.fast = bool(enabled)
 
-    def verify_data(self, data, pre="RX:"):
-        if self.__logger.level == logging.DEBUG:
-            frame = inspect.currentframe()
-            stack_trace = traceback.format_stack(frame)
-            td = []
-            for trace in stack_trace:
-                if "verify_data" not in trace and "Port" not in trace:
-                    td.append(trace)
-            self.debug(td[:-1])
-
-        if isinstance(data, bytes) or isinstance(data, bytearray):
-            if data[:5] == b"<?xml":
-                try:
-                    rdata = b""
-                    for line in data.split(b"\n"):
-                        try:
-                            self.debug(pre + line.decode('utf-8'))
-                            rdata += line + b"\n"
-                        except Exception:
-                            v = hexlify(line)
-                            self.debug(pre + v.decode('utf-8'))
-                    return rdata
-                except Exception as err:
-                    self.debug(str(err))
-                    pass
-            if logging.DEBUG >= self.__logger.level:
-                self.debug(pre + hexlify(data).decode('utf-8'))
-        else:
-            if logging.DEBUG >= self.__logger.level:
-                self.debug(pre + hexlify(data).decode('utf-8'))
-        return data
-
     def get_interface_count(self):
         if self.vid is not None:
             self.device = usb.core.find(idVendor=self.vid, idProduct=self.pid, backend=self.backend)
@@ -387,6 +355,7 @@ class UsbClass(DeviceClass):
         return False
 
     def close(self, reset=False):
+        self.trace.flush()
         if self.connected:
             try:
                 if reset:
@@ -449,7 +418,7 @@ class UsbClass(DeviceClass):
                         self.debug(str(err))
                         return False
                 return True
-        self.verify_data(bytearray(command), "TX:")
+        self.verify_data(command, "TX:")
         return True
 
     def get_read_packetsize(self):
@@ -512,6 +481,7 @@ class UsbClass(DeviceClass):
                     return b""
                 elif "No such device" in error:
                     self.error("Device disconnected")
+                    self.dump_trace()
                     sys.exit(1)
                 else:
                     self.info(repr(e))
@@ -519,9 +489,79 @@ class UsbClass(DeviceClass):
 
         if loglevel == logging.DEBUG:
             self.debug(inspect.currentframe().f_back.f_code.co_name + ":" + hex(resplen))
-            if self.loglevel == logging.DEBUG:
-                self.verify_data(res[:resplen], "RX:")
-        return res[:resplen]
+        res = res[:resplen]
+        self.verify_data(res, "RX:")
+        return res
+
+    def _bulk_readinto(self, view, timeout):
+        try:
+            ctx = self.device._ctx
+            bulk_transfer = ctx.backend.lib.libusb_bulk_transfer
+            handle = ctx.managed_open()
+        except AttributeError:
+            # libusb0 fallback backend, bounce through pyusb
+            data = self.EP_IN.read(len(view), timeout)
+            view[:len(data)] = data
+            return len(data)
+        cbuf = (c_ubyte * len(view)).from_buffer(view)
+        transferred = c_int()
+        retval = bulk_transfer(handle.handle, self.EP_IN.bEndpointAddress, cast(cbuf, POINTER(c_ubyte)),
+                               len(view), byref(transferred), timeout)
+        del cbuf
+        # do not assume a timeout means no data arrived
+        if not (transferred.value and retval == usb.backend.libusb1.LIBUSB_ERROR_TIMEOUT):
+            usb.backend.libusb1._check(retval)
+        return transferred.value
+
+    def usbreadinto(self, buffer, maxtimeout=100, w_max_packet_size=None):
+        view = memoryview(buffer).cast('B')
+        resplen = len(view)
+        if resplen <= 0:
+            self.info("Warning !")
+        if w_max_packet_size is None:
+            w_max_packet_size = self.EP_IN.wMaxPacketSize
+        pos = 0
+        q = self.queue
+        while pos < resplen and not q.empty():
+            data = q.get()
+            sz = min(len(data), resplen - pos)
+            view[pos:pos + sz] = data[:sz]
+            pos += sz
+            if sz < len(data):
+                rest = [data[sz:]]
+                while not q.empty():
+                    rest.append(q.get())
+                for item in rest:
+                    q.put(item)
+        timeout = 0
+        readinto = self._bulk_readinto
+        while pos < resplen:
+            sz = min(w_max_packet_size, resplen - pos)
+            try:
+                pos += readinto(view[pos:pos + sz], self.timeout)
+            except usb.core.USBError as e:
+                error = str(e.strerror)
+                if "timed out" in error:
+                    self.debug("Timed out")
+                    if timeout == maxtimeout:
+                        return pos
+                    timeout += 1
+                    pass
+                elif "Overflow" in error:
+                    self.error("USB Overflow")
+                    return pos
+                elif "No such device" in error:
+                    self.error("Device disconnected")
+                    self.dump_trace()
+                    sys.exit(1)
+                else:
+                    self.info(repr(e))
+                    return pos
+
+        if self.loglevel == logging.DEBUG:
+            self.debug(inspect.currentframe().f_back.f_code.co_name + ":" + hex(resplen))
+        self.verify_data(view[:pos], "RX:")
+        return pos
 
     def usbxmlread(self, maxtimeout=100):
         res = bytearray()
@@ -559,8 +599,7 @@ class UsbClass(DeviceClass):
 
         if loglevel == logging.DEBUG:
             self.debug(inspect.currentframe().f_back.f_code.co_name + ":" + hex(len(res)))
-            if self.loglevel == logging.DEBUG:
-                self.verify_data(res, "RX:")
+        self.verify_data(res, "RX:")
         return res
 
     def ctrl_transfer(self, bm_request_type, b_request, w_value, w_index, data_or_w_length):
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from struct import Struct
+
+
+class WireTrace:
+    """
+    Records usb/serial transfers with little overhead. The last size transfers are kept in memory
+    as (timestamp_ns, direction, length, first snaplen bytes), optionally every transfer is written
+    with its full payload to a binary capture file. Tools/wiretrace_decode.py prints both formats.
+
+    File format: header (magic, version, snaplen or 0 for full payloads, start time as unix time),
+    followed by records (timestamp in ns since start, direction, length, captured length, data).
+    Records may come from several threads (the xflash readflash acks are sent by an AsyncSender),
+    so recording is serialized.
+    """
+    TX = 0
+    RX = 1
+    # used by session recordings (sessionlib.py): control transfers and (re)connects
+    CTRL = 2
+    CONNECT = 3
+    magic = b"MTKTRACE"
+    version = 1
+    header = Struct("<8sBId")
+    record_header = Struct("<QBII")
+
+    def __init__(self, size=1024, snaplen=64, filename=None):
+        self.ring = deque(maxlen=size)
+        self.snaplen = snaplen
+        self.start = time.time()
+        self.start_ns = time.perf_counter_ns()
+        self.file = None
+        self.lock = threading.Lock()
+        if filename is not None:
+            self.open(filename)
+
+    def open(self, filename):
+        dirname = os.path.dirname(filename)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        self.file = open(filename, "wb", buffering=0x100000)
+        self.file.write(self.header.pack(self.magic, self.version, 0, self.start))
+        atexit.register(self.close)
+
+    def record(self, direction, data):
+        with self.lock:
+            ts = time.perf_counter_ns() - self.start_ns
+            length = len(data)
+            self.ring.append((ts, direction, length, bytes(data[:self.snaplen])))
+            if self.file is not None:
+                self.file.write(self.record_header.pack(ts, direction, length, length))
+                self.file.write(data)
+
+    def records(self):
+        with self.lock:
+            return list(self.ring)
+
+    def dump(self, filename):
+        """
+        Writes the in-memory ring to filename, payloads are truncated to snaplen bytes.
+        """
+        dirname = os.path.dirname(filename)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(filename, "wb") as wf:
+            wf.write(self.header.pack(self.magic, self.version, self.snaplen, self.start))
+            for ts, direction, length, data in self.records():
+                wf.write(self.record_header.pack(ts, direction, length, len(data)))
+                wf.write(data)
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Reads a capture, returns (start time, snaplen, list of (timestamp_ns, direction, length, data)).
+        """
+        with open(filename, "rb") as rf:
+            magic, version, snaplen, start = cls.header.unpack(rf.read(cls.header.size))
+            if magic != cls.magic or version != cls.version:
+                raise ValueError(f"{filename} is not a wire trace")
+            records = []
+            while True:
+                hdr = rf.read(cls.record_header.size)
+                if len(hdr) < cls.record_header.size:
+                    break
+                ts, direction, length, captured = cls.record_header.unpack(hdr)
+                records.append((ts, direction, length, rf.read(captured)))
+        return start, snaplen, records
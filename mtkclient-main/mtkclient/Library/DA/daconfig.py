@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 # -*- coding: utf-8 -*-
 # (c) B.Kerler 2018-2024 GPLv3 License
+import json
 import logging
 import os
 from struct import unpack
@@ -123,7 +124,35 @@ class DA:
         return info
 
 
+class DAIndexEntry:
+    """ DA entry as stored in the loader index, the full DA header is only read by load() """
+
+    def __init__(self, loader: str, offset: int, hw_code: int, hw_sub_code: int, hw_version: int, sw_version: int,
+                 v6: bool):
+        self.loader = loader
+        self.offset = offset
+        self.hw_code = hw_code
+        self.hw_sub_code = hw_sub_code
+        self.hw_version = hw_version
+        self.sw_version = sw_version
+        self.v6 = v6
+
+    def load(self) -> DA:
+        with open(self.loader, "rb") as bootldr:
+            bootldr.seek(self.offset)
+            da = DA(bootldr.read(0xDC))
+        da.setfilename(self.loader)
+        da.v6 = self.v6
+        return da
+
+    def __repr__(self):
+        return f"HWCode:{hex(self.hw_code)},HWSubCode:{hex(self.hw_sub_code)}," + \
+            f"HWVer:{hex(self.hw_version)},SWVer:{hex(self.sw_version)},Offset:{hex(self.offset)}"
+
+
 class DAconfig(metaclass=LogBase):
+    index_version = 1
+
     def __init__(self, mtk, loader=None, preloader=None, loglevel=logging.INFO):
         self.emi = None
         self.emiver = 0
@@ -159,8 +188,10 @@ class DAconfig(metaclass=LogBase):
                     if "MTK_AllInOne_DA" in file or "MTK_DA" in file:
                         loaders.append(os.path.join(root, file))
             loaders = sorted(loaders)[::-1]
+            index = self.update_index(loaders)
             for loader in loaders:
-                self.parse_da_loader(loader, self.dasetup)
+                for entry in index[loader]["entries"]:
+                    self.add_da(DAIndexEntry(loader, *entry, v6=index[loader]["v6"]), self.dasetup)
         else:
             if not os.path.exists(loader):
                 self.warning(f"Couldn't open {loader}")
@@ -214,6 +245,74 @@ class DAconfig(metaclass=LogBase):
             self.emiver = 0
             self.emi = None
 
+    @staticmethod
+    def add_da(da, dasetup: dict):
+        if da.hw_code == 0:
+            return
+        if da.hw_code not in dasetup:
+            dasetup[da.hw_code] = [da]
+        else:
+            for ldr in dasetup[da.hw_code]:
+                if da.hw_version == ldr.hw_version and da.sw_version == ldr.sw_version:
+                    return
+            dasetup[da.hw_code].append(da)
+
+    def index_da_loader(self, loader: str):
+        """ Reads only the id fields of all DA entries of a loader """
+        with open(loader, "rb") as bootldr:
+            hdr = bootldr.read(0x68)
+            count_da = unpack("<I", bootldr.read(4))[0]
+            entries = []
+            for i in range(0, count_da):
+                offset = 0x6C + (i * 0xDC)
+                bootldr.seek(offset)
+                magic, hw_code, hw_sub_code, hw_version, sw_version = unpack("<5H", bootldr.read(10))
+                entries.append([offset, hw_code, hw_sub_code, hw_version, sw_version])
+        return {"v6": b"MTK_DA_v6" in hdr, "entries": entries}
+
+    def update_index(self, loaders: list) -> dict:
+        """
+        Loads the loader index and reparses only loaders which were added or whose size or mtime changed
+        """
+        indexfile = self.pathconfig.get_loader_index_path()
+        index = {}
+        try:
+            with open(indexfile, "r") as rf:
+                data = json.load(rf)
+            if data.get("version") == self.index_version:
+                index = data["loaders"]
+        except (OSError, ValueError, KeyError):
+            pass
+        changed = set(index) != set(loaders)
+        result = {}
+        for loader in loaders:
+            try:
+                st = os.stat(loader)
+            except OSError as e:
+                self.error(f"Couldn't open loader: {loader}. Reason: {str(e)}")
+                result[loader] = {"size": 0, "mtime": 0, "v6": False, "entries": []}
+                continue
+            item = index.get(loader)
+            if item is not None and item["size"] == st.st_size and item["mtime"] == st.st_mtime_ns:
+                result[loader] = item
+                continue
+            try:
+                item = self.index_da_loader(loader)
+            except Exception as e:
+                self.error(f"Couldn't open loader: {loader}. Reason: {str(e)}")
+                item = {"v6": False, "entries": []}
+            item["size"] = st.st_size
+            item["mtime"] = st.st_mtime_ns
+            result[loader] = item
+            changed = True
+        if changed:
+            try:
+                with open(indexfile, "w") as wf:
+                    json.dump({"version": self.index_version, "loaders": result}, wf)
+            except OSError as e:
+                self.debug(f"Couldn't write loader index {indexfile}: {str(e)}")
+        return result
+
     def parse_da_loader(self, loader: str, dasetup: dict):
         try:
             with open(loader, 'rb') as bootldr:
@@ -229,20 +328,7 @@ class DAconfig(metaclass=LogBase):
                     da.v6 = v6
                     # if da.hw_code == 0x8127 and "5.1824" not in loader:
                     #    continue
-                    if da.hw_code not in dasetup:
-                        if da.hw_code != 0:
-                            dasetup[da.hw_code] = [da]
-                    else:
-                        for ldr in dasetup[da.hw_code]:
-                            found = False
-                            if da.hw_version == ldr.hw_version:
-                                if da.sw_version == ldr.sw_version:
-                                    if da.hw_sub_code == da.hw_sub_code:
-                                        found = True
-                                        break
-                        if not found:
-                            if da.hw_code != 0:
-                                dasetup[da.hw_code].append(da)
+                    self.add_da(da, dasetup)
                 return True
         except Exception as e:
             self.error(f"Couldn't open loader: {loader}. Reason: {str(e)}")
@@ -256,6 +342,8 @@ class DAconfig(metaclass=LogBase):
                 if loader.hw_version <= self.config.hwver:
                     if loader.sw_version <= self.config.swver:
                         if self.da_loader is None:
+                            if isinstance(loader, DAIndexEntry):
+                                loader = loader.load()
                             if loader.v6:
                                 self.config.chipconfig.damode = DAmodes.XML
                             self.da_loader = loader
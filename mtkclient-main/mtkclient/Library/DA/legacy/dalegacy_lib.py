@@ -19,12 +19,10 @@ from mtkclient.Library.DA.daconfig import DaStorage, EmmcPartitionType
 from mtkclient.Library.partition import Partition
 from mtkclient.config.payloads import PathConfig
 from mtkclient.Library.DA.legacy.extension.legacy import LegacyExt
-from mtkclient.Library.thread_handling import writedata
-from queue import Queue
+from mtkclient.Library.thread_handling import writedata, BufferRing
+from mtkclient.Library.checksum import sum16
 from threading import Thread
 
-rq = Queue()
-
 
 class PassInfo:
     ack = None
@@ -41,7 +39,7 @@ class PassInfo:
 
 
 def crc_word(data, chs=0):
-    return (sum(data) + chs) & 0xFFFF
+    return sum16(data, chs)
 
 
 class DALegacy(metaclass=LogBase):
@@ -63,6 +61,7 @@ class DALegacy(metaclass=LogBase):
         self.config = self.mtk.config
         self.usbwrite = self.mtk.port.usbwrite
         self.usbread = self.mtk.port.usbread
+        self.usbreadinto = self.mtk.port.usbreadinto
         self.echo = self.mtk.port.echo
         self.rbyte = self.mtk.port.rbyte
         self.rdword = self.mtk.port.rdword
@@ -849,7 +848,7 @@ class DALegacy(metaclass=LogBase):
         storage = self.get_storage()
         fh = False
         fill = 0
-        if filename is not None:
+        if filename is not None and filename != "":
             fh = open(filename, "rb")
             fsize = os.stat(filename).st_size
             length = min(fsize, length)
@@ -857,7 +856,8 @@ class DALegacy(metaclass=LogBase):
                 fill = 512 - (length % 512)
                 length += fill
             fh.seek(offset)
-        self.mtk.daloader.progress.show_progress("Write", 0, length, display)
+        if display:
+            self.mtk.daloader.progress.show_progress("Write", 0, length, display)
         self.usbwrite(self.Cmd.SDMMC_WRITE_DATA_CMD)
         self.usbwrite(pack(">B", storage))
         self.usbwrite(pack(">B", parttype))
@@ -878,7 +878,7 @@ class DALegacy(metaclass=LogBase):
             else:
                 data = wdata[offset:offset + count]
             self.usbwrite(data)
-            chksum = sum(data) & 0xFFFF
+            chksum = sum16(data)
             self.usbwrite(pack(">H", chksum))
             if self.usbread(1) != self.Rsp.CONT_CHAR:
                 self.error("Data ack failed for sdmmc_write_data")
@@ -930,10 +930,7 @@ class DALegacy(metaclass=LogBase):
                         if self.usbwrite(data):
                             bytestowrite -= size
                             if bytestowrite == 0:
-                                checksum = 0
-                                for val in data:
-                                    checksum += val
-                                checksum = checksum & 0xFFFF
+                                checksum = sum16(data)
                                 self.usbwrite(pack(">H", checksum))
                             if self.usbread(1) == b"\x69":
                                 if bytestowrite == 0:
@@ -1026,8 +1023,51 @@ class DALegacy(metaclass=LogBase):
             length = min(length, self.sdc.m_sdmmc_ua_size)
         return length, parttype
 
+    def read_packet(self, view, size, pos, stats=None):
+        """
+        Reads one readflash packet plus its checksum and acks it. With stats given, the checksum is
+        verified and None is returned for a short or corrupted packet.
+        """
+        rlen = self.usbreadinto(view, w_max_packet_size=size)
+        checksum = unpack(">H", self.usbread(2).rjust(2, b"\x00"))[0]
+        self.debug("Checksum: %04X" % checksum)
+        # The DA streams the next packet after the answer and has no resend, so every packet is acked
+        self.usbwrite(self.Rsp.ACK)
+        if stats is None:
+            return rlen
+        if rlen != size or sum16(view) != checksum:
+            stats["failed"] += 1
+            self.error(f"Checksum mismatch in packet at {hex(pos)}, aborting read.")
+            return None
+        stats["packets"] += 1
+        return rlen
+
+    def drain_read(self, bytestoread, packetsize):
+        """
+        Reads and acks the remaining packets of an aborted read, so the DA finishes the transfer
+        and the next command is in sync again.
+        """
+        buffer = bytearray(min(packetsize, bytestoread))
+        view = memoryview(buffer)
+        while bytestoread > 0:
+            size = min(packetsize, bytestoread)
+            if self.usbreadinto(view[:size], w_max_packet_size=size) != size:
+                break
+            self.usbread(2)
+            self.usbwrite(self.Rsp.ACK)
+            bytestoread -= size
+        view.release()
+
+    def integrity_summary(self, stats):
+        if stats is None:
+            return
+        if stats["failed"]:
+            self.error(f"Integrity check failed: {stats['packets']} packets verified, " +
+                       f"{stats['failed']} corrupted.")
+        else:
+            self.info(f"Integrity check passed: {stats['packets']} packets verified.")
+
     def readflash(self, addr: int, length: int, filename: str, parttype=None, display=True) -> (bytes, bool):
-        global rq
         self.mtk.daloader.progress.clear()
         length, parttype = self.get_parttype(length, parttype)
         if not self.config.iot:
@@ -1092,8 +1132,10 @@ class DALegacy(metaclass=LogBase):
             self.daconfig.readsize = self.daconfig.flashsize
         if display:
             self.mtk.daloader.progress.show_progress("Read", 0, length, display)
+        stats = dict(packets=0, failed=0) if self.config.verifyread else None
         if filename != "":
-            worker = Thread(target=writedata, args=(filename, rq), daemon=True)
+            ring = BufferRing(packetsize)
+            worker = Thread(target=writedata, args=(filename, ring), daemon=True)
             worker.start()
             bytestoread = length
             curpos = 0
@@ -1101,24 +1143,31 @@ class DALegacy(metaclass=LogBase):
                 size = bytestoread
                 if bytestoread > packetsize:
                     size = packetsize
-                tmp = self.usbread(size, w_max_packet_size=size)
-                rq.put(tmp[:size])
+                idx, view = ring.acquire(size)
+                rlen = self.read_packet(view, size, curpos, stats)
+                if rlen is None:
+                    ring.release(idx)
+                    self.drain_read(bytestoread - size, packetsize)
+                    break
+                ring.commit(idx, rlen)
                 bytestoread -= size
                 curpos += size
-                checksum = unpack(">H", self.usbread(2))[0]
-                self.debug("Checksum: %04X" % checksum)
                 if length > bytestoread:
                     rpos = length - bytestoread
                 else:
                     rpos = 0
-                self.usbwrite(self.Rsp.ACK)
                 self.mtk.daloader.progress.show_progress("Read", rpos, length, display)
             self.mtk.daloader.progress.show_progress("Read", length, length, display)
-            rq.put(None)
+            ring.close()
             worker.join(60)
-            return True
+            self.integrity_summary(stats)
+            if ring.error is not None:
+                self.error(f"Error on writing {filename}: {str(ring.error)}")
+                return False
+            return bytestoread == 0
         else:
-            buffer = bytearray()
+            buffer = bytearray(length)
+            view = memoryview(buffer)
             bytestoread = length
             if display:
                 self.mtk.daloader.progress.show_progress("Read", 0, length, display)
@@ -1126,17 +1175,21 @@ class DALegacy(metaclass=LogBase):
                 size = bytestoread
                 if bytestoread > packetsize:
                     size = packetsize
-                buffer.extend(self.usbread(size, w_max_packet_size=size))
-                bytestoread = len(buffer)-length
-                checksum = unpack(">H", self.usbread(2))[0]
-                self.debug("Checksum: %04X" % checksum)
-                self.usbwrite(self.Rsp.ACK)
+                pos = length - bytestoread
+                if self.read_packet(view[pos:pos + size], size, pos, stats) is None:
+                    self.drain_read(bytestoread - size, packetsize)
+                    break
+                bytestoread -= size
                 if length > bytestoread:
                     rpos = length - bytestoread
                 else:
                     rpos = 0
                 if display:
                     self.mtk.daloader.progress.show_progress("Read", rpos, length, display)
+            view.release()
             if display:
                 self.mtk.daloader.progress.show_progress("Read", length, length, display)
-            return bytes(buffer)
+            self.integrity_summary(stats)
+            if bytestoread > 0:
+                return b""
+            return buffer
@@ -125,7 +125,7 @@ class LegacyExt(metaclass=LogBase):
                 pos += 4
         else:
             dat = b"".join([pack("<I", val) for val in dwords])
-            self.custom_write(addr, dat)
+            return self.custom_write(addr, dat)
         return True
 
     def writemem(self, addr, data):
@@ -133,7 +133,8 @@ class LegacyExt(metaclass=LogBase):
             value = data[i:i + 4]
             while len(value) < 4:
                 value += b"\x00"
-            self.writeregister(addr + i, unpack("<I", value))
+            if not self.writeregister(addr + i, unpack("<I", value)):
+                return False
         return True
 
     def custom_write(self, addr, data):
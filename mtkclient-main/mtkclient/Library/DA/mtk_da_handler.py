@@ -8,13 +8,8 @@ from mtkclient.Library.utils import LogBase, logsetup, getint
 from mtkclient.config.payloads import PathConfig
 from mtkclient.Library.error import ErrorHandler
 from mtkclient.Library.utils import Progress
+from mtkclient.Library.thread_handling import SplitWriter
 from mtkclient.config.brom_config import Efuse, DAmodes
-from mtkclient.Library.Filesystem.mtkdafs import MtkDaFS
-
-try:
-    from fuse import FUSE
-except ImportError:
-    FUSE = None
 
 
 class DaHandler(metaclass=LogBase):
@@ -282,6 +277,57 @@ class DaHandler(metaclass=LogBase):
                     print(f"Failed to dump partition {str(partitionname)} as {partfilename}.")
                 i += 1
 
+    @staticmethod
+    def plan_batch_reads(partitions, pagesize, maxpartsize=0x100000, maxbatchsize=0x1000000, maxgap=0x10000):
+        """
+        Groups partitions for dumping: small partitions that follow each other on the flash with at most
+        maxgap bytes in between are merged into one read of at most maxbatchsize bytes, everything else
+        is read on its own.
+        """
+        batches = []
+        batch = []
+        batchstart = 0
+        batchend = 0
+        for partition in sorted(partitions, key=lambda part: part.sector):
+            size = partition.sectors * pagesize
+            if size > maxpartsize:
+                if batch:
+                    batches.append(batch)
+                    batch = []
+                batches.append([partition])
+                continue
+            end = partition.sector + partition.sectors
+            if batch and (not 0 <= (partition.sector - batchend) * pagesize <= maxgap or
+                          (end - batchstart) * pagesize > maxbatchsize):
+                batches.append(batch)
+                batch = []
+            if not batch:
+                batchstart = partition.sector
+            batch.append(partition)
+            batchend = end
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def read_partition_batch(self, batch, storedir, parttype):
+        pagesize = self.config.pagesize
+        start = batch[0].sector
+        length = (batch[-1].sector + batch[-1].sectors - start) * pagesize
+        self.info(f"Dumping partitions {', '.join(partition.name for partition in batch)} " +
+                  f"with sector count {str(length // pagesize)} in one read.")
+        # The read is streamed into the partition files, gaps between them are dropped
+        writer = SplitWriter([(os.path.join(storedir, partition.name + ".bin"), (partition.sector - start) * pagesize,
+                               partition.sectors * pagesize) for partition in batch])
+        if not self.mtk.daloader.readflash(addr=start * pagesize, length=length, filename=writer,
+                                           parttype=parttype) or not writer.complete:
+            writer.close()
+            self.warning("Batched read failed, dumping partitions one by one.")
+            return False
+        for partition in batch:
+            self.info(f"Dumped partition {str(partition.name)} as " +
+                      f"{str(os.path.join(storedir, partition.name + '.bin'))}.")
+        return True
+
     def da_rl(self, directory, parttype, skip):
         if not os.path.exists(directory):
             os.mkdir(directory)
@@ -304,25 +350,30 @@ class DaHandler(metaclass=LogBase):
                 wf.write(data[self.config.pagesize * 2:])
 
             count_gpt = 0
-            for partition in guid_gpt.partentries:
-                partitionname = partition.name
-                if partition.name in skip:
-                    continue
-                filename = os.path.join(storedir, partitionname + ".bin")
-                self.info(
-                    f"Dumping partition {str(partition.name)} with sector count {str(partition.sectors)} " +
-                    f"as {filename}.")
-
-                if self.mtk.daloader.readflash(addr=partition.sector * self.config.pagesize,
-                                               length=partition.sectors * self.config.pagesize,
-                                               filename=filename,
-                                               parttype=parttype):
-
-                    count_gpt += 1
-                    self.info(f"Dumped partition {str(partition.name)} as {str(filename)}.")
-                else:
-                    count_gpt -= 1
-                    self.error(f"Failed to dump partition {str(partition.name)} as {str(filename)}.")
+            partitions = [partition for partition in guid_gpt.partentries if partition.name not in skip]
+            for batch in self.plan_batch_reads(partitions, self.config.pagesize):
+                if len(batch) > 1:
+                    dumped = self.read_partition_batch(batch, storedir, parttype)
+                    if dumped:
+                        count_gpt += len(batch)
+                        continue
+                for partition in batch:
+                    partitionname = partition.name
+                    filename = os.path.join(storedir, partitionname + ".bin")
+                    self.info(
+                        f"Dumping partition {str(partition.name)} with sector count {str(partition.sectors)} " +
+                        f"as {filename}.")
+
+                    if self.mtk.daloader.readflash(addr=partition.sector * self.config.pagesize,
+                                                   length=partition.sectors * self.config.pagesize,
+                                                   filename=filename,
+                                                   parttype=parttype):
+
+                        count_gpt += 1
+                        self.info(f"Dumped partition {str(partition.name)} as {str(filename)}.")
+                    else:
+                        count_gpt -= 1
+                        self.error(f"Failed to dump partition {str(partition.name)} as {str(filename)}.")
 
             partitions_for_read = len(guid_gpt.partentries) - len(skip)
             if count_gpt == partitions_for_read:
@@ -746,9 +797,15 @@ class DaHandler(metaclass=LogBase):
             else:
                 print(f"Failed to dump offset {hex(start)} with length {hex(length)} as {filename}.")
         elif cmd == "fs":
+            try:
+                from fuse import FUSE
+                from mtkclient.Library.Filesystem.mtkdafs import MtkDaFS
+            except (ImportError, OSError) as err:
+                self.error(f"FUSE isn't available: {str(err)}")
+                FUSE = None
             if FUSE is not None:
                 print(f'Mounting FUSE fs at: {args.mountpoint}...')
-                fs = FUSE(MtkDaFS(self, rw=args.rw), mountpoint=args.mountpoint, foreground=True, allow_other=True,
+                fs = FUSE(MtkDaFS(self, rw=args.rw, cachesize=args.cachesize), mountpoint=args.mountpoint, foreground=True, allow_other=True,
                           nothreads=True)
         elif cmd == "footer":
             filename = args.filename
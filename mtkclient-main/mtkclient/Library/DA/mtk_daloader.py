@@ -19,6 +19,7 @@ from mtkclient.Library.DA.xflash.extension.xflash import XFlashExt
 from mtkclient.Library.DA.legacy.extension.legacy import LegacyExt
 from mtkclient.Library.DA.xml.extension.v6 import XmlFlashExt
 from mtkclient.Library.settings import HwParam
+from mtkclient.Library.sparse import SparseImage, write_sparse, write_skipzero
 
 
 class DAloader(metaclass=LogBase):
@@ -45,6 +46,8 @@ class DAloader(metaclass=LogBase):
         self.lft = None
         self.da = None
         self.flashmode = None
+        # parttype -> (data, table, name index), dropped as soon as a write hits a partition table
+        self.partition_cache = {}
 
     def writestate(self):
         config = {}
@@ -138,6 +141,7 @@ class DAloader(metaclass=LogBase):
         return da1
 
     def reinit(self):
+        self.invalidate_partition_cache()
         if os.path.exists(os.path.join(self.mtk.config.hwparam_path, ".state")):
             config = json.loads(open(os.path.join(self.mtk.config.hwparam_path, ".state"), "r").read())
             self.config.hwcode = config["hwcode"]
@@ -204,6 +208,7 @@ class DAloader(metaclass=LogBase):
         return False
 
     def set_da(self):
+        self.invalidate_partition_cache()
         self.flashmode = DAmodes.LEGACY
         if self.mtk.config.plcap is not None:
             PL_CAP0_XFLASH_SUPPORT = (0x1 << 0)
@@ -240,44 +245,102 @@ class DAloader(metaclass=LogBase):
         self.error("Device is not in xflash mode, cannot run meta cmd.")
         return False
 
-    def detect_partition(self, partitionname, parttype=None):
+    def partition_cache_key(self, parttype):
+        """ Tables are cached per area and per gpt settings they were parsed with """
+        if parttype is None or parttype == "":
+            parttype = "user"
+        settings = self.mtk.config.gpt_settings
+        if settings is None:
+            return parttype, None
+        return parttype, (settings.gpt_num_part_entries, settings.gpt_part_entry_size,
+                          settings.gpt_part_entry_start_lba)
+
+    def read_partition_table(self, parttype=None) -> tuple:
+        key = self.partition_cache_key(parttype)
+        if key in self.partition_cache:
+            return self.partition_cache[key]
         if self.partition_table_category() == "GPT":
-            fpartitions = []
-            data, guid_gpt = self.da.partition.get_gpt(self.mtk.config.gpt_settings, parttype)
-            if guid_gpt is None:
-                return [False, fpartitions]
+            data, table = self.da.partition.get_gpt(self.mtk.config.gpt_settings, parttype)
+        else:
+            data, table = self.da.partition.read_pmt()
+        if table is None:
+            return data, None, {}
+        entries = table.partentries if hasattr(table, "partentries") else table
+        index = {}
+        for partition in entries:
+            if isinstance(partition.name, str):
+                index.setdefault(partition.name.lower(), partition)
+        self.partition_cache[key] = (data, table, index)
+        return data, table, index
+
+    def invalidate_partition_cache(self, addr=None, length=None, parttype=None):
+        if addr is None or length is None:
+            self.partition_cache.clear()
+            return
+        area = self.partition_cache_key(parttype)[0]
+        pagesize = self.daconfig.pagesize
+        for key in [key for key in self.partition_cache if key[0] == area]:
+            data, table, index = self.partition_cache[key]
+            # Primary table: everything we read from LBA 0, at least the first two sectors
+            primary_end = max(len(data) if data else 0, 2 * pagesize)
+            # Backup table: behind the last usable lba, or the last 16KiB of the flash as used for the lookup
+            header = getattr(table, "header", None)
+            if header is not None and header.last_usable_lba:
+                backup_start = (header.last_usable_lba + 1) * pagesize
             else:
-                for partition in guid_gpt.partentries:
-                    fpartitions.append(partition)
-                    if partition.name.lower() == partitionname.lower():
-                        return [True, partition]
-            return [False, fpartitions]
+                backup_start = self.daconfig.flashsize - 0x4000
+            if addr < primary_end or addr + length > backup_start:
+                del self.partition_cache[key]
+
+    def detect_partition(self, partitionname, parttype=None):
+        data, table, index = self.read_partition_table(parttype)
+        if self.partition_table_category() == "GPT":
+            if table is None:
+                return [False, []]
+            partition = index.get(partitionname.lower())
+            if partition is not None:
+                return [True, partition]
+            return [False, list(table.partentries)]
         else:
-            data, partitions = self.da.partition.read_pmt()
-            return [True, partitions]
+            return [True, table]
 
     def get_partition_data(self, parttype=None):
+        data, table, index = self.read_partition_table(parttype)
         if self.partition_table_category() == "GPT":
-            fpartitions = []
-            data, guid_gpt = self.da.partition.get_gpt(self.mtk.config.gpt_settings, parttype)
-            if guid_gpt is None:
-                return [False, fpartitions]
+            if table is None:
+                return [False, []]
             else:
-                return guid_gpt.partentries
+                return table.partentries
         else:
-            data, partitions = self.da.partition.read_pmt()
-            return [True, partitions]
+            return [True, table]
+
+    def get_partition_index(self, parttype=None) -> dict:
+        return self.read_partition_table(parttype)[2]
+
+    def get_parttype_size(self, parttype) -> int:
+        # The backends name their storage info fields differently, 0 means not available
+        if self.daconfig.flashtype == "emmc":
+            emmc = getattr(self.da, "emmc", None)
+            names = {"boot1": ["boot1_size", "m_emmc_boot1_size"],
+                     "boot2": ["boot2_size", "m_emmc_boot2_size"],
+                     "rpmb": ["rpmb_size"]}
+            for name in names.get(parttype, []):
+                if getattr(emmc, name, 0):
+                    return getattr(emmc, name)
+        elif self.daconfig.flashtype == "ufs":
+            ufs = getattr(self.da, "ufs", None)
+            if parttype in ["lu1", "lu2", "lu4"]:
+                return getattr(ufs, f"{parttype}_size", 0)
+        return 0
 
     def get_gpt(self, parttype=None) -> tuple:
+        data, table, index = self.read_partition_table(parttype)
         if self.partition_table_category() == "GPT":
-            fpartitions = []
-            data, guid_gpt = self.da.partition.get_gpt(self.mtk.config.gpt_settings, parttype)
-            if guid_gpt is None:
-                return False, fpartitions
-            return data, guid_gpt
+            if table is None:
+                return False, []
+            return data, table
         else:
-            data, partitions = self.da.partition.read_pmt()
-            return data, partitions
+            return data, table
 
     def upload(self):
         return self.da.upload_da1()
@@ -302,10 +365,28 @@ class DAloader(metaclass=LogBase):
         return False
 
     def writeflash(self, addr, length, filename: str = "", offset=0, parttype=None, wdata=None, display=True):
+        self.invalidate_partition_cache(addr, length, parttype)
+        if filename != "" and offset == 0 and wdata is None:
+            if SparseImage.is_sparse(filename):
+                self.info(f"{filename} is a sparse image, skipping unused chunks.")
+                try:
+                    return write_sparse(self.da.writeflash, self.da.formatflash,
+                                        Progress(self.daconfig.pagesize, self.mtk.config.guiprogress),
+                                        addr=addr, length=length, filename=filename, parttype=parttype,
+                                        skipzero=self.mtk.config.skipzero, display=display)
+                except ValueError as err:
+                    self.error(str(err))
+                    return False
+            if self.mtk.config.skipzero:
+                return write_skipzero(self.da.writeflash, self.da.formatflash,
+                                      Progress(self.daconfig.pagesize, self.mtk.config.guiprogress),
+                                      addr=addr, length=length, filename=filename, parttype=parttype,
+                                      display=display)
         return self.da.writeflash(addr=addr, length=length, filename=filename, offset=offset,
                                   parttype=parttype, wdata=wdata, display=display)
 
     def formatflash(self, addr, length, partitionname, parttype, display=True):
+        self.invalidate_partition_cache(addr, length, parttype)
         return self.da.formatflash(addr=addr, length=length, parttype=parttype, display=display)
 
     def readflash(self, addr, length, filename, parttype, display=True):
@@ -25,6 +25,8 @@ class XCmd:
     CUSTOM_RPMB_INIT = 0x0F0008
     CUSTOM_RPMB_READ = 0x0F0009
     CUSTOM_RPMB_WRITE = 0x0F000A
+    CUSTOM_SEJ_RUN = 0x0F000B
+    CUSTOM_REG_OPS = 0x0F000C
 
 
 rpmb_error = [
@@ -63,6 +65,8 @@ class XFlashExt(metaclass=LogBase):
         self.status = self.xflash.status
         self.da2 = None
         self.da2address = None
+        # Older payloads lack CUSTOM_REG_OPS, register transactions are then replayed dword by dword
+        self.reg_batch = True
 
     def patch(self):
         self.da2 = self.xflash.daconfig.da2
@@ -374,6 +378,62 @@ class XFlashExt(metaclass=LogBase):
                 return True
         return False
 
+    def custom_sej_run(self, base, start, data):
+        """
+        Runs the SEJ block loop on the device, max 0x10000 bytes per command.
+        Returns the processed data, None if the payload doesn't support it (nothing was run yet)
+        or False if a command failed after the HACC already processed blocks.
+        """
+        res = bytearray()
+        for pos in range(0, len(data), 0x10000):
+            chunk = data[pos:pos + 0x10000]
+            if not self.cmd(XCmd.CUSTOM_SEJ_RUN):
+                return None if pos == 0 else False
+            self.xsend(base)
+            self.xsend(start)
+            self.xsend(len(chunk))
+            self.xsend(chunk)
+            result = self.xread()
+            tmp = self.xread()
+            status = self.status()
+            if result == -1 or tmp == -1 or status != 0:
+                return False
+            result = unpack("<I", result)[0]
+            if result != 0:
+                self.error(f"SEJ run failed with {hex(result)}")
+                return False
+            res.extend(tmp)
+        return res
+
+    def custom_reg_ops(self, ops):
+        """
+        Runs a list of (type, addr, mask, value) register ops on the device, max 0x800 ops per command.
+        Returns one value per read and poll op, None if the payload doesn't support it (nothing was run yet)
+        or False if the command failed.
+        """
+        if not self.cmd(XCmd.CUSTOM_REG_OPS):
+            return None
+        self.xsend(len(ops))
+        self.xsend(b"".join(pack("<IIII", *op) for op in ops))
+        result = self.xread()
+        status = self.status()
+        if result == -1 or status != 0 or len(result) < 4:
+            return False
+        result = list(unpack(f"<{len(result) // 4}I", result[:len(result) // 4 * 4]))
+        if result[0] != 0:
+            self.error(f"Register ops failed with {hex(result[0])}")
+            return False
+        return result[1:]
+
+    def reg_ops(self, ops):
+        if not self.reg_batch:
+            return None
+        res = self.custom_reg_ops(ops)
+        if res is None:
+            self.debug("Payload doesn't support register op lists, using single registers")
+            self.reg_batch = False
+        return res
+
     def readmem(self, addr, dwords=1):
         res = []
         if dwords < 0x20:
@@ -405,7 +465,7 @@ class XFlashExt(metaclass=LogBase):
                 pos += 4
         else:
             dat = b"".join([pack("<I", val) for val in dwords])
-            self.custom_write(addr, dat)
+            return self.custom_write(addr, dat)
         return True
 
     def writemem(self, addr, data):
@@ -413,7 +473,8 @@ class XFlashExt(metaclass=LogBase):
             value = data[i:i + 4]
             while len(value) < 4:
                 value += b"\x00"
-            self.writeregister(addr + i, unpack("<I", value))
+            if not self.writeregister(addr + i, unpack("<I", value)):
+                return False
         return True
 
     def custom_rpmb_read(self, sector, sectors):
@@ -450,7 +511,7 @@ class XFlashExt(metaclass=LogBase):
             self.xsend(sectors)
             for i in range(sectors):
                 self.xsend(data[i * 0x100:(i * 0x100) + 0x100])
-                resp = unpack("<H", self.xflash.get_response(raw=True))[0]
+                resp = unpack("<H", self.xread())[0]
                 if resp != 0:
                     if resp in rpmb_error:
                         self.error(rpmb_error[resp])
@@ -614,6 +675,8 @@ class XFlashExt(metaclass=LogBase):
         setup.read32 = self.readmem
         setup.write32 = self.writeregister
         setup.writemem = self.writemem
+        setup.sej_run = self.custom_sej_run
+        setup.reg_ops = self.reg_ops
         setup.hwcode = self.config.hwcode
         return HwCrypto(setup, self.loglevel, self.config.gui)
 
@@ -19,12 +19,10 @@ from mtkclient.Library.partition import Partition
 from mtkclient.config.payloads import PathConfig
 from mtkclient.Library.DA.xflash.extension.xflash import XFlashExt, XCmd
 from mtkclient.Library.settings import HwParam
-from mtkclient.Library.thread_handling import writedata
-from queue import Queue
+from mtkclient.Library.thread_handling import writedata, BufferRing, AsyncSender
+from mtkclient.Library.checksum import sum16
 from threading import Thread
 
-rq = Queue()
-
 
 class DAXFlash(metaclass=LogBase):
     def __init__(self, mtk, daconfig, loglevel=logging.INFO):
@@ -51,6 +49,7 @@ class DAXFlash(metaclass=LogBase):
         self.config = self.mtk.config
         self.usbwrite = self.mtk.port.usbwrite
         self.usbread = self.mtk.port.usbread
+        self.usbreadinto = self.mtk.port.usbreadinto
         self.echo = self.mtk.port.echo
         self.rbyte = self.mtk.port.rbyte
         self.rdword = self.mtk.port.rdword
@@ -814,7 +813,6 @@ class DAXFlash(metaclass=LogBase):
         return False
 
     def readflash(self, addr, length, filename, parttype=None, display=True) -> (bytes, bool):
-        global rq
         partinfo = self.getstorage(parttype, length)
         if not partinfo and not filename:
             return b""
@@ -822,65 +820,91 @@ class DAXFlash(metaclass=LogBase):
             return False
         self.mtk.daloader.progress.clear()
         storage, parttype, length = partinfo
-        self.get_packet_length()
+        plen = self.get_packet_length()
+        packetsize = plen.read_packet_length if plen is not None else 0x100000
         bytesread = 0
         if self.cmd_read_data(addr=addr, size=length, storage=storage, parttype=parttype):
             bytestoread = length
             total = length
             if filename != "":
-                worker = Thread(target=writedata, args=(filename, rq), daemon=True)
+                def progress(pos):
+                    self.mtk.daloader.progress.show_progress("Read", pos, total, display)
+                ring = BufferRing(packetsize)
+                worker = Thread(target=writedata, args=(filename, ring, progress if display else None), daemon=True)
                 worker.start()
+                # The ack for a chunk is only queued once it was read completely, the helper thread
+                # sends it while we already commit the chunk and wait for the next header.
+                ack = pack("<IIII", self.Cmd.MAGIC, self.DataType.DT_PROTOCOL_FLOW, 4, 0)
+                acker = AsyncSender(self.usbwrite)
+                usbread = self.usbread
+                usbreadinto = self.usbreadinto
                 while bytestoread > 0:
-                    status = self.usbread(4 + 4 + 4)
+                    status = usbread(4 + 4 + 4)
                     try:
                         magic, datatype, slength = unpack("<III", status)
-                        if magic == 0xFEEEEEEF:
-                            resdata = self.usbread(slength, w_max_packet_size=slength)
-                            if slength > 4:
-                                rq.put(resdata)
-                                stmp = pack("<III", self.Cmd.MAGIC, self.DataType.DT_PROTOCOL_FLOW, 4)
-                                data = pack("<I", 0)
-                                self.usbwrite(stmp)
-                                self.usbwrite(data)
-                                bytestoread -= len(resdata)
-                                bytesread += len(resdata)
-                                if display:
-                                    self.mtk.daloader.progress.show_progress("Read", bytesread, total, display)
-                            elif slength == 4:
-                                if unpack("<I", resdata)[0] != 0:
-                                    break
-                            else:
-                                print("Error: Invalid slength")
-                    except:
-                        print("Error: Timeout")
+                    except Exception:
+                        self.error("Error: Timeout")
+                        break
+                    if magic != 0xFEEEEEEF:
+                        self.error("Error: Wrong magic")
+                        break
+                    if slength > 4:
+                        idx, view = ring.acquire(slength)
+                        rlen = usbreadinto(view, w_max_packet_size=slength)
+                        ring.commit(idx, rlen)
+                        bytestoread -= rlen
+                        if rlen != slength or acker.error:
+                            self.error(f"Error on reading data at pos {hex(addr + length - bytestoread)}")
+                            break
+                        acker.put(ack)
+                    elif slength == 4:
+                        dstatus = usbread(slength)
+                        if len(dstatus) != 4:
+                            self.error(f"Error on reading data at pos {hex(addr + length - bytestoread)}")
+                            break
+                        if unpack("<I", dstatus)[0] != 0:
+                            break
+                    else:
+                        self.error("Error: Invalid slength")
+                        break
+                acker.close()
 
                 status = self.usbread(4 + 4 + 4)
-                magic, datatype, slength = unpack("<III", status)
-                if magic == 0xFEEEEEEF:
-                    resdata = self.usbread(slength)
-                    if slength == 4:
-                        if unpack("<I", resdata)[0] == 0:
-                            if display:
-                                self.mtk.daloader.progress.show_progress("Read", total, total, display)
-                            rq.put(None)
-                            worker.join(60)
-                            return True
-                rq.put(None)
+                if len(status) == 12:
+                    magic, datatype, slength = unpack("<III", status)
+                    if magic == 0xFEEEEEEF:
+                        self.usbread(slength)
+                ring.close()
                 worker.join(60)
-                return True
+                if ring.error is not None:
+                    self.error(f"Error on writing {filename}: {str(ring.error)}")
+                    return False
+                if display:
+                    self.mtk.daloader.progress.show_progress("Read", total, total, display)
+                return bytestoread == 0
             else:
-                buffer = bytearray()
-                while length > 0:
-                    tmp = self.xread()
-                    buffer.extend(tmp)
+                buffer = bytearray(total)
+                view = memoryview(buffer)
+                while bytesread < total:
+                    hdr = self.usbread(4 + 4 + 4)
+                    if len(hdr) != 12:
+                        self.error("readflash error: No header")
+                        break
+                    magic, datatype, slength = unpack("<III", hdr)
+                    if magic != 0xFEEEEEEF or slength > total - bytesread:
+                        self.error("readflash error: Wrong header")
+                        break
+                    rlen = self.usbreadinto(view[bytesread:bytesread + slength], w_max_packet_size=slength)
+                    bytesread += rlen
                     if self.ack() != 0:
                         break
                     if display:
                         self.mtk.daloader.progress.show_progress("Read", bytesread, total, display)
-                    length -= len(tmp)
-                    bytesread += len(tmp)
+                view.release()
                 if display:
                     self.mtk.daloader.progress.show_progress("Read", total, total, display)
+                if bytesread < total:
+                    return buffer[:bytesread]
                 return buffer
         if filename != b"":
             return b""
@@ -973,7 +997,7 @@ class DAXFlash(metaclass=LogBase):
                             data.extend(b"\x00" * fill)
                     else:
                         data = wdata[pos:pos + dsize]
-                    checksum = sum(data) & 0xFFFF
+                    checksum = sum16(data)
                     dparams = [pack("<I", 0x0), pack("<I", checksum), data]
                     if not self.send_param(dparams):
                         self.error("Error on writing pos 0x%08X" % pos)
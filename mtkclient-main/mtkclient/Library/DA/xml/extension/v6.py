@@ -26,6 +26,12 @@ rpmb_error = [
 ]
 
 
+def rpmb_errorstr(resp):
+    if resp < len(rpmb_error):
+        return rpmb_error[resp]
+    return f"Unknown error {hex(resp)}"
+
+
 class XmlFlashExt(metaclass=LogBase):
     def __init__(self, _mtk, _xmlflash, loglevel):
         self.pathconfig = PathConfig()
@@ -47,6 +53,11 @@ class XmlFlashExt(metaclass=LogBase):
         self.xread = self.xflash.xread
         self.da2 = None
         self.da2address = None
+        # Number of rpmb frames per CUSTOM(U)RPMBRM/WM command, older payloads only know single frames
+        self.rpmb_batchsize = 0x10
+        self.rpmb_batch = True
+        # Older payloads lack CUSTOMREGOPS, register transactions are then replayed dword by dword
+        self.reg_batch = True
 
     def patch_command(self, _da2):
         self.da2address = self.xflash.daconfig.da_loader.region[2].m_start_addr  # at_address
@@ -430,6 +441,114 @@ class XmlFlashExt(metaclass=LogBase):
         self.xflash.ack()
         return False
 
+    def custom_rpmb_end(self):
+        # CMD:END
+        self.xflash.get_response()
+        self.xflash.ack()
+        # CMD:START
+        self.xflash.get_response()
+        self.xflash.ack()
+
+    def rpmb_status(self):
+        """
+        Reads the 16 bit status of a rpmb frame, None on a short read or timeout.
+        """
+        resp = self.xflash.get_response(raw=True)
+        if len(resp) != 2:
+            return None
+        return unpack("<H", resp)[0]
+
+    def custom_rpmb_read_multi(self, sector, count, ufs=False):
+        """
+        Reads count rpmb frames starting at sector with one command.
+        Returns the frames read until the first failing one, or None if the payload lacks the command.
+        """
+        data = bytearray()
+        xmlcmd = self.xflash.Cmd.create_cmd("CUSTOMURPMBRM" if ufs else "CUSTOMRPMBRM")
+        if not self.xsend(xmlcmd):
+            return None
+        result = self.xflash.get_response()
+        if result != "OK":
+            self.custom_rpmb_end()
+            return None
+        self.xsend(sector)
+        self.xsend(count)
+        for pos in range(count):
+            resp = self.rpmb_status()
+            if resp is None:
+                self.error(f"Couldn't read rpmb at sector {sector + pos}: no response")
+                break
+            if resp != 0:
+                self.error(f"Couldn't read rpmb at sector {sector + pos}: {rpmb_errorstr(resp)}")
+                break
+            frame = self.xflash.get_response(raw=True)
+            if len(frame) != 0x100:
+                self.error(f"Couldn't read rpmb at sector {sector + pos}: short frame")
+                break
+            data.extend(frame)
+        self.custom_rpmb_end()
+        return data
+
+    def custom_rpmb_write_multi(self, sector, data: bytes, ufs=False):
+        """
+        Writes len(data) // 0x100 rpmb frames starting at sector with one command.
+        Returns the number of frames written, or None if the payload lacks the command.
+        """
+        if len(data) % 0x100 != 0:
+            self.error("Incorrect rpmb frame length. Aborting")
+            return 0
+        count = len(data) // 0x100
+        xmlcmd = self.xflash.Cmd.create_cmd("CUSTOMURPMBWM" if ufs else "CUSTOMRPMBWM")
+        if not self.xsend(xmlcmd):
+            return None
+        result = self.xflash.get_response()
+        if result != "OK":
+            self.custom_rpmb_end()
+            return None
+        self.xsend(sector)
+        self.xsend(count)
+        written = 0
+        for pos in range(count):
+            self.xsend(data[pos * 0x100:(pos + 1) * 0x100])
+            resp = self.rpmb_status()
+            if resp is None:
+                self.error(f"Couldn't write rpmb at sector {sector + pos}: no response")
+                break
+            if resp != 0:
+                self.error(f"Couldn't write rpmb at sector {sector + pos}: {rpmb_errorstr(resp)}")
+                break
+            written += 1
+        self.custom_rpmb_end()
+        return written
+
+    def rpmb_read_frames(self, sector, count, ufs=False):
+        if self.rpmb_batch and count > 1:
+            data = self.custom_rpmb_read_multi(sector=sector, count=count, ufs=ufs)
+            if data is not None:
+                return data
+            self.debug("Payload doesn't support batched rpmb, using single frames")
+            self.rpmb_batch = False
+        data = bytearray()
+        for pos in range(count):
+            frame = self.custom_rpmb_read(sector=sector + pos, ufs=ufs)
+            if frame == b"":
+                break
+            data.extend(frame)
+        return data
+
+    def rpmb_write_frames(self, sector, data: bytes, ufs=False):
+        count = len(data) // 0x100
+        if self.rpmb_batch and count > 1:
+            written = self.custom_rpmb_write_multi(sector=sector, data=data, ufs=ufs)
+            if written is not None:
+                return written
+            self.debug("Payload doesn't support batched rpmb, using single frames")
+            self.rpmb_batch = False
+        for pos in range(count):
+            if not self.custom_rpmb_write(sector=sector + pos, data=data[pos * 0x100:(pos + 1) * 0x100]):
+                return pos
+        return count
+
     def setotp(self, hwc):
         otp = None
         if self.mtk.config.preloader is not None:
@@ -440,7 +559,7 @@ class XmlFlashExt(metaclass=LogBase):
             otp = 32 * b"\x00"
         hwc.sej.sej_set_otp(otp)
 
-    def read_rpmb(self, filename=None, sector: int = None, sectors: int = None, display=True):
+    def read_rpmb(self, filename=None, sector: int = None, sectors: int = None, display=True, batchsize=None):
         # self.custom_rpmb_prog(b"vutsrqponmlkjihgfedcba9876543210")
         # self.custom_rpmb_init()
         progressbar = Progress(1, self.mtk.config.guiprogress)
@@ -456,6 +575,9 @@ class XmlFlashExt(metaclass=LogBase):
                 sectors = (512 * 256)
         if filename is None:
             filename = "rpmb.bin"
+        if batchsize is None:
+            batchsize = self.rpmb_batchsize
+        batchsize = max(1, batchsize)
         if sectors > 0:
             with open(filename, "wb") as wf:
                 pos = 0
@@ -463,20 +585,21 @@ class XmlFlashExt(metaclass=LogBase):
                 while toread > 0:
                     if display:
                         progressbar.show_progress("RPMB read", pos * 0x100, sectors * 0x100, display)
-                    data = self.custom_rpmb_read(sector=sector + pos, ufs=ufs)
-                    if data == b"":
-                        self.error("Couldn't read rpmb.")
-                        return False
+                    count = min(batchsize, toread)
+                    data = self.rpmb_read_frames(sector=sector + pos, count=count, ufs=ufs)
                     wf.write(data)
-                    pos += 0x1
-                    toread -= 0x1
+                    if len(data) != count * 0x100:
+                        self.error(f"Couldn't read rpmb at sector {sector + pos + len(data) // 0x100}.")
+                        return False
+                    pos += count
+                    toread -= count
             if display:
                 progressbar.show_progress("RPMB read", sectors * 0x100, sectors * 0x100, display)
             self.info(f"Done reading rpmb to {filename}")
             return True
         return False
 
-    def write_rpmb(self, filename=None, sector: int = None, sectors: int = None, display=True):
+    def write_rpmb(self, filename=None, sector: int = None, sectors: int = None, display=True, batchsize=None):
         progressbar = Progress(1, self.mtk.config.guiprogress)
         if filename is None:
             self.error("Filename has to be given for writing to rpmb")
@@ -492,6 +615,10 @@ class XmlFlashExt(metaclass=LogBase):
             max_sector_size = sectors
         filesize = os.path.getsize(filename)
         sectors = min(filesize // 256, max_sector_size)
+        if batchsize is None:
+            batchsize = self.rpmb_batchsize
+        batchsize = max(1, batchsize)
+        ufs = self.xflash.emmc is None
         if self.custom_rpmb_init():
             if sectors > 0:
                 with open(filename, "rb") as rf:
@@ -500,18 +627,20 @@ class XmlFlashExt(metaclass=LogBase):
                     while towrite > 0:
                         if display:
                             progressbar.show_progress("RPMB written", pos * 0x100, sectors * 0x100, display)
-                        if not self.custom_rpmb_write(sector=pos + sector, data=rf.read(0x100)):
-                            self.error(f"Couldn't write rpmb at sector {sector + pos}.")
+                        count = min(batchsize, towrite)
+                        written = self.rpmb_write_frames(sector=pos + sector, data=rf.read(count * 0x100), ufs=ufs)
+                        if written != count:
+                            self.error(f"Couldn't write rpmb at sector {sector + pos + written}.")
                             return False
-                        pos += 0x1
-                        towrite -= 0x1
+                        pos += count
+                        towrite -= count
                 if display:
                     progressbar.show_progress("RPMB written", sectors * 0x100, sectors * 0x100, display)
                 self.info(f"Done reading writing {filename} to rpmb")
                 return True
         return False
 
-    def erase_rpmb(self, sector: int = None, sectors: int = None, display=True):
+    def erase_rpmb(self, sector: int = None, sectors: int = None, display=True, batchsize=None):
         progressbar = Progress(1, self.mtk.config.guiprogress)
         if sector is None:
             sector = 0
@@ -521,6 +650,10 @@ class XmlFlashExt(metaclass=LogBase):
             elif self.xflash.ufs.block_size != 0:
                 sectors = (512 * 256)
 
+        if batchsize is None:
+            batchsize = self.rpmb_batchsize
+        batchsize = max(1, batchsize)
+        ufs = self.xflash.emmc is None
         if self.custom_rpmb_init():
             if sectors > 0:
                 pos = 0
@@ -528,11 +661,13 @@ class XmlFlashExt(metaclass=LogBase):
                 while towrite > 0:
                     if display:
                         progressbar.show_progress("RPMB erased", pos * 0x100, sectors * 0x100, display)
-                    if not self.custom_rpmb_write(sector=pos + sector, data=b"\x00" * 0x100):
-                        self.error(f"Couldn't erase rpmb at sector {sector + pos}.")
+                    count = min(batchsize, towrite)
+                    written = self.rpmb_write_frames(sector=pos + sector, data=b"\x00" * 0x100 * count, ufs=ufs)
+                    if written != count:
+                        self.error(f"Couldn't erase rpmb at sector {sector + pos + written}.")
                         return False
-                    pos += 0x1
-                    towrite -= 0x1
+                    pos += count
+                    towrite -= count
                 if display:
                     progressbar.show_progress("RPMB erased", sectors * 0x100, sectors * 0x100, display)
                 self.info("Done erasing rpmb")
@@ -583,6 +718,40 @@ class XmlFlashExt(metaclass=LogBase):
                 return int.from_bytes(data, 'little')
         return None
 
+    def custom_reg_ops(self, ops):
+        """
+        Runs a list of (type, addr, mask, value) register ops on the device, max 0x800 ops per command.
+        Returns one value per read and poll op, None if the payload doesn't support it (nothing was run yet)
+        or False if the command failed.
+        """
+        xmlcmd = self.xflash.Cmd.create_cmd("CUSTOMREGOPS")
+        if not self.xsend(xmlcmd):
+            return None
+        result = self.xflash.get_response()
+        if result != "OK":
+            self.custom_rpmb_end()
+            return None
+        self.xsend(len(ops))
+        self.xsend(b"".join(pack("<IIII", *op) for op in ops))
+        data = self.xflash.get_response(raw=True)
+        self.custom_rpmb_end()
+        if len(data) < 4:
+            return False
+        data = list(unpack(f"<{len(data) // 4}I", data[:len(data) // 4 * 4]))
+        if data[0] != 0:
+            self.error(f"Register ops failed with {hex(data[0])}")
+            return False
+        return data[1:]
+
+    def reg_ops(self, ops):
+        if not self.reg_batch:
+            return None
+        res = self.custom_reg_ops(ops)
+        if res is None:
+            self.debug("Payload doesn't support register op lists, using single registers")
+            self.reg_batch = False
+        return res
+
     def custom_write(self, addr, data) -> bool:
         xmlcmd = self.xflash.Cmd.create_cmd("CUSTOMMEMR")
         if self.xsend(xmlcmd):
@@ -648,7 +817,7 @@ class XmlFlashExt(metaclass=LogBase):
                 pos += 4
         else:
             dat = b"".join([pack("<I", val) for val in dwords])
-            self.custom_write(addr, dat)
+            return self.custom_write(addr, dat)
         return True
 
     def writemem(self, addr, data):
@@ -656,7 +825,8 @@ class XmlFlashExt(metaclass=LogBase):
             value = data[i:i + 4]
             while len(value) < 4:
                 value += b"\x00"
-            self.writeregister(addr + i, unpack("<I", value))
+            if not self.writeregister(addr + i, unpack("<I", value)):
+                return False
         return True
 
     def cryptosetup(self):
@@ -670,6 +840,7 @@ class XmlFlashExt(metaclass=LogBase):
         setup.read32 = self.readmem
         setup.write32 = self.writeregister
         setup.writemem = self.writemem
+        setup.reg_ops = self.reg_ops
         setup.hwcode = self.config.hwcode
         return HwCrypto(setup, self.loglevel, self.config.gui)
 
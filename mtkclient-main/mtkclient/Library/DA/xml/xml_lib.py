@@ -4,7 +4,6 @@
 import logging
 import os
 from struct import pack, unpack
-from queue import Queue
 from threading import Thread
 
 from Cryptodome.Cipher import PKCS1_OAEP
@@ -17,14 +16,12 @@ from mtkclient.Library.error import ErrorHandler
 from mtkclient.Library.DA.daconfig import EmmcPartitionType, UFSPartitionType, DaStorage
 from mtkclient.Library.partition import Partition
 from mtkclient.config.payloads import PathConfig
-from mtkclient.Library.thread_handling import writedata
+from mtkclient.Library.thread_handling import writedata, BufferRing, iter_chunks
 from mtkclient.Library.DA.xml.xml_cmd import XMLCmd, BootModes
 from mtkclient.Library.DA.xml.extension.v6 import XmlFlashExt
 from mtkclient.Library.Auth.sla import generate_da_sla_signature
 from mtkclient.Library.Auth.sla_keys import da_sla_keys, SlaKey
 
-rq = Queue()
-
 
 class ShutDownModes:
     TEST = 3
@@ -101,6 +98,7 @@ class DAXML(metaclass=LogBase):
         self.config = self.mtk.config
         self.usbwrite = self.mtk.port.usbwrite
         self.usbread = self.mtk.port.usbread
+        self.usbreadinto = self.mtk.port.usbreadinto
         self.echo = self.mtk.port.echo
         self.rbyte = self.mtk.port.rbyte
         self.rdword = self.mtk.port.rdword
@@ -221,21 +219,24 @@ class DAXML(metaclass=LogBase):
                         return data.rstrip(b"\x00").decode('utf-8')
         return ""
 
-    def get_response_data(self) -> bytes:
+    def get_response_length(self) -> int:
         sync = self.usbread(4 * 3)
         if len(sync) == 4 * 3:
             if int.from_bytes(sync[:4], 'little') == 0xfeeeeeef:
                 if int.from_bytes(sync[4:8], 'little') == 0x1:
-                    length = int.from_bytes(sync[8:12], 'little')
-                    usbepsz = self.mtk.port.cdc.get_read_packetsize()
-                    data = bytearray()
-                    bytestoread = length
-                    while bytestoread > 0:
-                        sz = min(usbepsz, bytestoread)
-                        data.extend(self.usbread(sz,w_max_packet_size=sz))
-                        bytestoread -= sz
-                    if len(data) == length:
-                        return data
+                    return int.from_bytes(sync[8:12], 'little')
+        return -1
+
+    def get_response_data_into(self, view) -> int:
+        usbepsz = self.mtk.port.cdc.get_read_packetsize()
+        return self.usbreadinto(view, w_max_packet_size=usbepsz)
+
+    def get_response_data(self) -> bytes:
+        length = self.get_response_length()
+        if length >= 0:
+            data = bytearray(length)
+            if self.get_response_data_into(data) == length:
+                return data
         return b""
 
     def patch_da(self, da1, da2):
@@ -451,7 +452,8 @@ class DAXML(metaclass=LogBase):
             resp = self.get_response()
             byteswritten = 0
             if resp == "OK":
-                for pos in range(0, length, packet_length):
+                pos = 0
+                for tmp in iter_chunks(data, length, packet_length):
                     self.ack_value(0)
                     resp = self.get_response()
                     if "OK" not in resp:
@@ -459,7 +461,6 @@ class DAXML(metaclass=LogBase):
                         self.error(f"Error on writing stage2 ACK0 at pos {hex(pos)}")
                         self.error(rmsg)
                         return False
-                    tmp = data[pos:pos + packet_length]
                     tmplen = len(tmp)
                     self.xsend(data=tmp)
                     resp = self.get_response()
@@ -467,8 +468,12 @@ class DAXML(metaclass=LogBase):
                         self.error(f"Error on writing stage2 at pos {hex(pos)}")
                         return False
                     byteswritten += tmplen
+                    pos += tmplen
                     if display:
                         self.mtk.daloader.progress.show_progress("Written", byteswritten, length, display)
+                if hasattr(data, "readinto") and byteswritten < length:
+                    self.error(f"Error on reading upload data at pos {hex(byteswritten)}")
+                    return False
                 if raw:
                     self.ack()
                 cmd, result = self.get_command_result()
@@ -486,7 +491,6 @@ class DAXML(metaclass=LogBase):
             return False
 
     def download_raw(self, result, filename: str = "", display: bool = False):
-        global rq
         if display:
             self.mtk.daloader.progress.clear()
         if type(result) is UpFile:
@@ -502,21 +506,33 @@ class DAXML(metaclass=LogBase):
                 sresp = self.get_response()
                 if "OK" in sresp:
                     self.ack()
-                    data = bytearray()
+                    data = bytearray(length if filename == "" else 0)
                     bytesread = 0
                     bytestoread = length
                     worker = None
+                    ring = None
                     if filename != "":
-                        worker = Thread(target=writedata, args=(filename, rq), daemon=True)
+                        try:
+                            packet_length = int(result.packet_length, 16)
+                        except (TypeError, ValueError):
+                            packet_length = 0x100000
+                        ring = BufferRing(packet_length)
+                        worker = Thread(target=writedata, args=(filename, ring), daemon=True)
                         worker.start()
+                    view = memoryview(data)
                     while bytestoread > 0:
-                        tmp = self.get_response_data()
-                        bytestoread -= len(tmp)
-                        bytesread += len(tmp)
+                        rlength = self.get_response_length()
+                        if rlength < 0 or rlength > bytestoread:
+                            self.error("Error on downloading data: wrong response header")
+                            break
                         if filename != "":
-                            rq.put(tmp)
+                            idx, slot = ring.acquire(rlength)
+                            rlen = self.get_response_data_into(slot)
+                            ring.commit(idx, rlen)
                         else:
-                            data.extend(tmp)
+                            rlen = self.get_response_data_into(view[bytesread:bytesread + rlength])
+                        bytestoread -= rlen
+                        bytesread += rlen
                         if display:
                             self.mtk.daloader.progress.show_progress("Read", bytesread, length, display)
                         self.ack()
@@ -526,9 +542,15 @@ class DAXML(metaclass=LogBase):
                         else:
                             self.ack()
                     if filename != "":
-                        rq.put(None)
+                        ring.close()
                         worker.join(60)
+                        if ring.error is not None:
+                            self.error(f"Error on writing {filename}: {str(ring.error)}")
+                            return False
                         return True
+                    view.release()
+                    if bytesread < length:
+                        return data[:bytesread]
                     return data
             self.error("Error on downloading data:" + resp)
             return False
@@ -897,7 +919,6 @@ class DAXML(metaclass=LogBase):
         return part_info
 
     def readflash(self, addr, length, filename, parttype=None, display=True) -> (bytes, bool):
-        global rq
         if parttype is None:
             if self.daconfig.flashtype == "emmc":
                 parttype = "user"
@@ -958,9 +979,11 @@ class DAXML(metaclass=LogBase):
             self.ack_value(length)
             cmd, result = self.get_command_result()
             if type(result) is DwnFile:
-                data = fh.read(length)
-                if not self.upload(result, data, raw=True):
+                source = fh if fh else wdata
+                if not self.upload(result, source, display=display, raw=True):
                     self.error("Error on writing flash at 0x%08X" % addr)
+                    if fh:
+                        fh.close()
                     return False
                 if fh:
                     fh.close()
@@ -1034,11 +1057,13 @@ class DAXML(metaclass=LogBase):
             self.daconfig.boot2size = 0x400000
         elif self.storage.storagetype == "UFS":
             self.daconfig.flashtype = "ufs"
-            self.daconfig.flashsize = self.storage.lua0_size
-            self.daconfig.rpmbsize = self.storage.lua1_size
-            self.daconfig.boot1size = self.storage.lua1_size
-            self.daconfig.boot2size = self.storage.lua2_size
-            self.config.pagesize = 4096
+            # lua0/lua1 are the boot lus, lua2 the user lu and lua3 rpmb, see partitiontype_and_size
+            self.daconfig.flashsize = self.storage.lua2_size
+            self.daconfig.rpmbsize = self.storage.lua3_size
+            self.daconfig.boot1size = self.storage.lua0_size
+            self.daconfig.boot2size = self.storage.lua1_size
+            self.config.pagesize = self.storage.block_size
+            self.daconfig.pagesize = self.storage.block_size
 
             class UfsInfo:
                 type = 1  # nor, none
@@ -1085,6 +1110,7 @@ class DAXML(metaclass=LogBase):
             self.info(f"Formatting addr {hex(addr)} with length {hex(length)}, please standby....")
         self.mtk.daloader.progress.show_progress("Erasing", 0, length, True)
         self.send_command(self.Cmd.cmd_erase_flash(partition=parttype, offset=addr, length=length))
+        # send_command already read CMD:END and CMD:START, what the DA sends after that still needs a device capture
         result = self.get_response()
         if result == "OK":
             if display:
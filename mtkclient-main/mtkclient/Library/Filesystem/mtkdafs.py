@@ -1,5 +1,6 @@
+from collections import OrderedDict
+from errno import EIO, ENOENT
 from stat import S_IFDIR, S_IFREG
-from tempfile import NamedTemporaryFile
 from time import time
 import sys
 import os
@@ -9,72 +10,339 @@ if not os.environ.get('FUSE_LIBRARY_PATH') and os.name == 'nt':
                           os.path.join(os.path.dirname(__file__),
                                        r"bin\winfsp-%s.dll" % ("x64" if sys.maxsize > 0xffffffff else "x86")))
 try:
-    from fuse import Operations, LoggingMixIn
+    from fuse import Operations, LoggingMixIn, FuseOSError
 except ImportError:
     raise ImportError('fuse library not installed')
 
+
+class BlockCache:
+    """
+    LRU cache of flash blocks in front of readflash. Reads that continue where the last one ended
+    double the read-ahead window up to maxreadahead, any other access resets it.
+    """
+
+    def __init__(self, readflash, blocksize=0x10000, cachesize=64, maxreadahead=0x400000):
+        self.readflash = readflash
+        self.blocksize = blocksize
+        self.maxblocks = max(1, (cachesize * 1024 * 1024) // blocksize)
+        self.maxreadahead = max(1, maxreadahead // blocksize)
+        self.blocks = OrderedDict()
+        self.readahead = 0
+        self.lastend = None
+        self.stats = dict(hits=0, misses=0, readahead_blocks=0, device_reads=0, device_bytes=0)
+
+    def fetch(self, parttype, first, count, limit=None):
+        length = count * self.blocksize
+        if limit is not None:
+            length = min(length, limit - first * self.blocksize)
+        data = self.readflash(first * self.blocksize, length, parttype)
+        if not data or len(data) < length:
+            return False
+        self.stats["device_reads"] += 1
+        self.stats["device_bytes"] += len(data)
+        if length < count * self.blocksize:
+            # Last block of the storage is only partially backed by flash
+            data = bytes(data) + bytes(count * self.blocksize - length)
+        view = memoryview(data)
+        for idx in range(count):
+            self.blocks[(parttype, first + idx)] = bytes(view[idx * self.blocksize:(idx + 1) * self.blocksize])
+            self.blocks.move_to_end((parttype, first + idx))
+        while len(self.blocks) > self.maxblocks:
+            self.blocks.popitem(last=False)
+        return True
+
+    def read(self, addr, size, parttype=None, limit=None):
+        first = addr // self.blocksize
+        last = (addr + size - 1) // self.blocksize
+        if self.lastend == addr:
+            self.readahead = min(max(1, self.readahead * 2), self.maxreadahead)
+        else:
+            self.readahead = 0
+        self.lastend = addr + size
+        if last - first + 1 > self.maxblocks // 2:
+            # Larger than the cache can sensibly hold, don't evict everything for it
+            self.stats["misses"] += last - first + 1
+            self.stats["device_reads"] += 1
+            self.stats["device_bytes"] += size
+            return bytes(self.readflash(addr, size, parttype))
+        maxblock = None if limit is None else (limit - 1) // self.blocksize
+        # Never read ahead further than what fits next to the requested blocks
+        maxblock_cache = first + self.maxblocks - 1
+        maxblock = maxblock_cache if maxblock is None else min(maxblock, maxblock_cache)
+        block = first
+        while block <= last:
+            if (parttype, block) in self.blocks:
+                self.stats["hits"] += 1
+                self.blocks.move_to_end((parttype, block))
+                block += 1
+                continue
+            # Fetch the whole run of missing blocks at once, extended by the read-ahead window
+            end = block
+            while end + 1 <= last and (parttype, end + 1) not in self.blocks:
+                end += 1
+            self.stats["misses"] += end - block + 1
+            if end == last and self.readahead:
+                extra = max(0, min(self.readahead, maxblock - end))
+                self.stats["readahead_blocks"] += extra
+                end += extra
+            if not self.fetch(parttype, block, end - block + 1, limit):
+                return b""
+            block = last + 1 if end >= last else end + 1
+        data = bytearray()
+        for block in range(first, last + 1):
+            self.blocks.move_to_end((parttype, block))
+            data += self.blocks[(parttype, block)]
+        start = addr - first * self.blocksize
+        return bytes(data[start:start + size])
+
+    def store(self, parttype, block, data):
+        self.blocks[(parttype, block)] = bytes(data)
+        self.blocks.move_to_end((parttype, block))
+        while len(self.blocks) > self.maxblocks:
+            self.blocks.popitem(last=False)
+
+    def invalidate(self, addr, size, parttype=None):
+        for block in range(addr // self.blocksize, (addr + size - 1) // self.blocksize + 1):
+            self.blocks.pop((parttype, block), None)
+
+    def tostring(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        ratio = (self.stats["hits"] * 100 / lookups) if lookups else 0
+        lines = [f"{key}: {value}" for key, value in self.stats.items()]
+        lines.append(f"hit_ratio: {ratio:.2f}%")
+        lines.append(f"cached_blocks: {len(self.blocks)}/{self.maxblocks}")
+        lines.append(f"blocksize: {hex(self.blocksize)}")
+        lines.append(f"readahead_blocks_current: {self.readahead}")
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class DirtyBuffer:
+    """
+    Write-back buffer of modified cache blocks. Only the touched sectors are written on flush,
+    merged into extents of up to maxextent bytes. Partially written sectors are completed with the
+    current flash content first.
+    """
+
+    def __init__(self, cache, writeflash, sectorsize=0x200, threshold=0x1000000, maxextent=0x1000000):
+        self.cache = cache
+        self.writeflash = writeflash
+        self.blocksize = cache.blocksize
+        self.sectorsize = sectorsize
+        self.threshold = threshold
+        self.maxextent = maxextent
+        self.pages = {}
+        self.dirtybytes = 0
+
+    def write(self, addr, data, parttype=None, limit=None):
+        view = memoryview(data)
+        pos = 0
+        while pos < len(view):
+            block = (addr + pos) // self.blocksize
+            blockaddr = block * self.blocksize
+            start = addr + pos - blockaddr
+            end = min(self.blocksize, start + len(view) - pos)
+            key = (parttype, block)
+            if key not in self.pages:
+                if start == 0 and end == self.blocksize:
+                    page = bytearray(self.blocksize)
+                else:
+                    # read-modify-write, the remaining sectors of the block stay as they are on flash
+                    length = self.blocksize if limit is None else min(self.blocksize, limit - blockaddr)
+                    page = bytearray(self.cache.read(blockaddr, length, parttype=parttype, limit=limit))
+                    if len(page) != length:
+                        return False
+                    page += bytes(self.blocksize - len(page))
+                self.pages[key] = [page, set()]
+            page, sectors = self.pages[key]
+            page[start:end] = view[pos:pos + end - start]
+            for sector in range(start // self.sectorsize, (end - 1) // self.sectorsize + 1):
+                if sector not in sectors:
+                    sectors.add(sector)
+                    self.dirtybytes += self.sectorsize
+            self.cache.invalidate(blockaddr, self.blocksize, parttype)
+            pos += end - start
+        if self.dirtybytes >= self.threshold:
+            return self.flush()
+        return True
+
+    def overlay(self, addr, data, parttype=None):
+        for block in range(addr // self.blocksize, (addr + len(data) - 1) // self.blocksize + 1):
+            if (parttype, block) not in self.pages:
+                continue
+            page = self.pages[(parttype, block)][0]
+            blockaddr = block * self.blocksize
+            start = max(addr, blockaddr)
+            end = min(addr + len(data), blockaddr + self.blocksize)
+            data[start - addr:end - addr] = page[start - blockaddr:end - blockaddr]
+        return data
+
+    def extents(self):
+        extent = None
+        for parttype, block in sorted(self.pages, key=lambda item: (str(item[0]), item[1])):
+            page, sectors = self.pages[(parttype, block)]
+            for sector in sorted(sectors):
+                addr = block * self.blocksize + sector * self.sectorsize
+                if (extent is not None and extent[0] == parttype and extent[1] + len(extent[2]) == addr and
+                        len(extent[2]) < self.maxextent):
+                    extent[2] += page[sector * self.sectorsize:(sector + 1) * self.sectorsize]
+                    continue
+                if extent is not None:
+                    yield extent
+                extent = [parttype, addr, bytearray(page[sector * self.sectorsize:(sector + 1) * self.sectorsize])]
+        if extent is not None:
+            yield extent
+
+    def flush(self):
+        for parttype, addr, data in self.extents():
+            if not self.writeflash(addr, data, parttype):
+                return False
+        for (parttype, block), (page, sectors) in self.pages.items():
+            self.cache.store(parttype, block, page)
+        self.pages = {}
+        self.dirtybytes = 0
+        return True
+
+
 class MtkDaFS(LoggingMixIn, Operations):
-    def __init__(self, da_handler, rw=False):
+    def __init__(self, da_handler, rw=False, cachesize=64):
         self.da_handler = da_handler
         self.rw = rw
-        self.files = {'/': dict(
+        daconfig = self.da_handler.mtk.daloader.daconfig
+        pagesize = daconfig.pagesize
+        self.cache = BlockCache(self.readflash, blocksize=max(0x10000 // pagesize, 1) * pagesize,
+                                cachesize=cachesize)
+        self.dirty = DirtyBuffer(self.cache, self.writeflash, sectorsize=pagesize)
+        # path -> attributes, directory path -> child names, directory path -> populate callback
+        self.files = {}
+        self.children = {}
+        self.loaders = {}
+        self.add_dir('/')
+        self.add_file('/emmc_user.bin', daconfig.flashsize, parttype=None)
+        self.add_file('/.cache_stats', 0, mode=0o444)
+        self.add_dir('/partitions', loader=lambda: self.add_partitions('/partitions', None, daconfig.flashsize))
+        if daconfig.flashtype == "emmc":
+            for parttype in ["boot1", "boot2", "rpmb"]:
+                size = self.da_handler.mtk.daloader.get_parttype_size(parttype)
+                if size:
+                    self.add_file(f'/emmc_{parttype}.bin', size, parttype=parttype)
+        elif daconfig.flashtype == "ufs":
+            for parttype in ["lu1", "lu2", "lu4"]:
+                size = self.da_handler.mtk.daloader.get_parttype_size(parttype)
+                if size:
+                    self.add_dir(f'/{parttype}', loader=lambda lu=parttype, lusize=size: self.add_lu(lu, lusize))
+
+    def add_node(self, path, attrs):
+        parent, name = path.rsplit('/', 1)
+        parent = parent or '/'
+        if path != '/' and name not in self.children[parent]:
+            self.children[parent].append(name)
+        self.files[path] = attrs
+
+    def add_dir(self, path, loader=None):
+        self.add_node(path, dict(
             st_mode=(S_IFDIR | 0o555),
             st_ctime=time(),
             st_mtime=time(),
             st_atime=time(),
-            st_nlink=2), '/emmc_user.bin': dict(
-            st_mode=(S_IFREG | 0o777) if self.rw else (S_IFREG | 0o555),
+            st_nlink=2))
+        self.children[path] = []
+        if loader is not None:
+            self.loaders[path] = loader
+
+    def add_file(self, path, size, parttype=None, offset=0, mode=None):
+        if mode is None:
+            mode = 0o777 if self.rw else 0o555
+        self.add_node(path, dict(
+            st_mode=(S_IFREG | mode),
             st_ctime=time(),
             st_mtime=time(),
             st_atime=time(),
             st_nlink=2,
-            st_size=self.da_handler.mtk.daloader.daconfig.flashsize), '/partitions': dict(
-            st_mode=(S_IFDIR | 0o555),
-            st_ctime=time(),
-            st_mtime=time(),
-            st_atime=time(),
-            st_nlink=2)}
-
-        for part in self.da_handler.mtk.daloader.get_partition_data():
-            self.files[f'/partitions/{part.name}'] = dict(
-                st_mode=(S_IFREG | 0o777) if self.rw else (S_IFREG | 0o555),
-                st_ctime=time(),
-                st_mtime=time(),
-                st_atime=time(),
-                st_nlink=2,
-                st_size=part.sectors * self.da_handler.mtk.daloader.daconfig.pagesize,
-                offset=part.sector * self.da_handler.mtk.daloader.daconfig.pagesize)
+            st_size=size,
+            offset=offset,
+            parttype=parttype,
+            limit=offset + size))
+
+    def add_partitions(self, path, parttype, limit):
+        pagesize = self.da_handler.mtk.daloader.daconfig.pagesize
+        partitions = self.da_handler.mtk.daloader.get_partition_data(parttype=parttype)
+        if partitions and partitions[0] is False:
+            return
+        for part in partitions:
+            self.add_file(f'{path}/{part.name}', part.sectors * pagesize, parttype=parttype,
+                          offset=part.sector * pagesize)
+            self.files[f'{path}/{part.name}']['limit'] = limit
+
+    def add_lu(self, parttype, size):
+        self.add_file(f'/{parttype}/{parttype}.bin', size, parttype=parttype)
+        self.add_dir(f'/{parttype}/partitions',
+                     loader=lambda: self.add_partitions(f'/{parttype}/partitions', parttype, size))
+
+    def resolve(self, path):
+        # Populate lazily exposed directories on the way to path, only the first access hits the device
+        if self.loaders:
+            parts = path.strip('/').split('/')
+            for pos in range(len(parts) + 1):
+                directory = '/' + '/'.join(parts[:pos])
+                loader = self.loaders.pop(directory, None)
+                if loader is not None:
+                    loader()
+        if path not in self.files:
+            raise FuseOSError(ENOENT)
+        return self.files[path]
 
     def readdir(self, path, fh):
-        return ['.', '..'] + [x.removeprefix(path).removeprefix('/') for x in self.files if
-                              x.startswith(path) and x != path]
+        self.resolve(path)
+        return ['.', '..'] + self.children.get(path, [])
+
+    def readflash(self, addr, length, parttype):
+        return self.da_handler.mtk.daloader.readflash(addr=addr, length=length, filename='', parttype=parttype,
+                                                      display=False)
+
+    def writeflash(self, addr, data, parttype):
+        return self.da_handler.mtk.daloader.writeflash(addr=addr, length=len(data), filename='', parttype=parttype,
+                                                       wdata=data, display=False)
 
     def read(self, path, size, offset, fh):
-        if size + offset > self.files[path]['st_size']:
+        if path == '/.cache_stats':
+            return self.cache.tostring()[offset:offset + size]
+        attrs = self.resolve(path)
+        if offset >= attrs['st_size']:
             return b''
-        file_offset = 0
-        if 'offset' in self.files[path]:
-            file_offset = self.files[path]['offset']
-        data = self.da_handler.da_ro(start=file_offset + offset, length=size, filename='', parttype=None)
-        return bytes(data)
+        size = min(size, attrs['st_size'] - offset)
+        addr = attrs['offset'] + offset
+        data = self.cache.read(addr, size, parttype=attrs['parttype'], limit=attrs['limit'])
+        if self.dirty.pages:
+            data = bytes(self.dirty.overlay(addr, bytearray(data), parttype=attrs['parttype']))
+        return data
 
     def write(self, path, data, offset, fh):
         if not self.rw:
             return 0
-
-        if offset + len(data) > self.files[path]['st_size']:
+        attrs = self.resolve(path)
+        if offset + len(data) > attrs['st_size']:
             return b''
+        if not self.dirty.write(attrs['offset'] + offset, data, parttype=attrs['parttype'], limit=attrs['limit']):
+            raise FuseOSError(EIO)
+        return len(data)
 
-        file_offset = 0
-        if 'offset' in self.files[path]:
-            file_offset = self.files[path]['offset']
+    def fsync(self, path, datasync, fh):
+        if not self.dirty.flush():
+            raise FuseOSError(EIO)
+        return 0
 
-        with NamedTemporaryFile('rb+', buffering=0) as f_write:
-            f_write.write(data)
-            self.da_handler.da_wo(start=file_offset + offset, length=len(data), filename=f_write.name, parttype=None)
-        return len(data)
+    def release(self, path, fh):
+        if not self.dirty.flush():
+            raise FuseOSError(EIO)
+        return 0
+
+    def destroy(self, path):
+        self.dirty.flush()
 
     def getattr(self, path, fh=None):
+        attrs = self.resolve(path)
+        if path == '/.cache_stats':
+            attrs['st_size'] = len(self.cache.tostring())
         if not self.rw:
-            self.files[path]['st_mode'] &= ~0o222
-        return self.files[path]
+            attrs['st_mode'] &= ~0o222
+        return attrs
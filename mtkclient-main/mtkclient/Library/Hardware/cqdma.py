@@ -5,6 +5,7 @@ import logging
 import os
 from struct import pack, unpack
 from mtkclient.Library.utils import LogBase
+from mtkclient.Library.Hardware.regbatch import RegTransaction
 
 regval = {
     "CQDMA_INT_FLAG": 0x0,
@@ -26,9 +27,10 @@ class CqdmaReg:
         self.cqdma_base = setup.cqdma_base
         self.read32 = setup.read32
         self.write32 = setup.write32
+        self.reg_ops = getattr(setup, "reg_ops", None)
 
     def __setattr__(self, key, value):
-        if key in ("cqdma_base", "read32", "write32", "regval"):
+        if key in ("cqdma_base", "read32", "write32", "reg_ops", "regval"):
             return super(CqdmaReg, self).__setattr__(key, value)
         if key in regval:
             addr = regval[key] + self.cqdma_base
@@ -37,7 +39,7 @@ class CqdmaReg:
             return super(CqdmaReg, self).__setattr__(key, value)
 
     def __getattribute__(self, item):
-        if item in ("cqdma_base", "read32", "write32", "regval"):
+        if item in ("cqdma_base", "read32", "write32", "reg_ops", "regval"):
             return super(CqdmaReg, self).__getattribute__(item)
         if item in regval:
             addr = regval[item] + self.cqdma_base
@@ -45,6 +47,9 @@ class CqdmaReg:
         else:
             return super(CqdmaReg, self).__getattribute__(item)
 
+    def transaction(self) -> RegTransaction:
+        return RegTransaction(self.read32, self.write32, self.cqdma_base, regval, self.reg_ops)
+
 
 class Cqdma(metaclass=LogBase):
     def __init__(self, setup, loglevel=logging.INFO):
@@ -70,30 +75,32 @@ class Cqdma(metaclass=LogBase):
         res = bytearray()
         dst_addr = self.chipconfig.ap_dma_mem  # AP_DMA_IrDA_o_MEM_ADDR (any DMA mem addr reg)
         if self.cqdma_base is not None:
+            trans = self.reg.transaction()
+            results = []
             for i in range(dwords):
-                self.reg.CQDMA_SRC = [addr + (i * 4)]
-                self.reg.CQDMA_DST = [dst_addr]
-                self.reg.CQDMA_LEN1 = [4]
-                self.reg.CQDMA_EN = [1]
-                while True:
-                    if self.reg.CQDMA_EN & 1 == 0:
-                        break
-                res.extend(pack("<I", self.read32(dst_addr)))
+                # CQDMA_SRC, CQDMA_DST and CQDMA_LEN1 are adjacent and are merged into one write32
+                trans.write("CQDMA_SRC", [addr + (i * 4), dst_addr, 4])
+                trans.write("CQDMA_EN", 1)
+                trans.poll("CQDMA_EN", 1, 0, retries=None)
+                results.append(trans.read(dst_addr))
+            trans.run()
+            for result in results:
+                if not result.ok:
+                    break
+                res.extend(pack("<I", result.value))
         return res
 
     def cqwrite32(self, addr, dwords):
         dst_addr = self.setup.ap_dma_mem  # AP_DMA_IrDA_o_MEM_ADDR (any DMA mem addr reg)
         if self.cqdma_base is not None:
+            trans = self.reg.transaction()
             for i in range(len(dwords)):
-                self.write32(dst_addr, [dwords[i]])
-                self.reg.CQDMA_SRC = [dst_addr]
-                self.reg.CQDMA_DST = [addr + (i * 4)]
-                self.reg.CQDMA_LEN1 = [4]
-                self.reg.CQDMA_EN = [1]
-                while True:
-                    if self.reg.CQDMA_EN & 1 == 0:
-                        break
-                self.write32(dst_addr, [0xcafebabe])
+                trans.write(dst_addr, dwords[i])
+                trans.write("CQDMA_SRC", [dst_addr, addr + (i * 4), 4])
+                trans.write("CQDMA_EN", 1)
+                trans.poll("CQDMA_EN", 1, 0, retries=None)
+                trans.write(dst_addr, 0xcafebabe)
+            trans.run()
 
     def mem_read(self, addr: int, length: int, ucqdma=False):
         dwords = length // 4
@@ -109,17 +116,17 @@ class Cqdma(metaclass=LogBase):
         res = res[:length]
         return res
 
-    def mem_write(self, addr: int, data: bytes, ucqdma=False):
+    def mem_write(self, addr: int, data: bytes, ucqdma=False, maxdwords=0x400):
         cnt = len(data) % 4
         if cnt:
             data += b'\x00' * (4 - cnt)
-        dwords = []
-        for i in range(0, len(data), 4):
-            dwords.append(unpack("<I", data[i * 4:(i * 4) + 4])[0])
+        dwords = list(unpack(f"<{len(data) // 4}I", data))
         if ucqdma:
             self.cqwrite32(addr, dwords)
         else:
-            self.write32(addr, dwords)
+            # One write command per maxdwords values, every command is echoed back in one piece
+            for pos in range(0, len(dwords), maxdwords):
+                self.write32(addr + pos * 4, dwords[pos:pos + maxdwords])
 
     def disable_range_blacklist(self):
         self.info("Disabling bootrom range checks..")
@@ -5,10 +5,6 @@ import logging
 import sys
 
 from mtkclient.Library.utils import LogBase, logsetup
-from mtkclient.Library.Hardware.hwcrypto_gcpu import GCpu
-from mtkclient.Library.Hardware.hwcrypto_dxcc import Dxcc
-from mtkclient.Library.Hardware.hwcrypto_sej import Sej
-from mtkclient.Library.Hardware.cqdma import Cqdma
 
 
 class CryptoSetup:
@@ -27,15 +23,19 @@ class CryptoSetup:
     socid_addr = None
     prov_addr = None
     efuse_base = None
+    sej_run = None
+    reg_ops = None
 
 
 class HwCrypto(metaclass=LogBase):
     def __init__(self, setup, loglevel=logging.INFO, gui: bool = False):
         self.__logger, self.info, self.debug, self.warning, self.error = logsetup(self, self.__logger, loglevel, gui)
-        self.dxcc = Dxcc(setup, loglevel, gui)
-        self.gcpu = GCpu(setup, loglevel, gui)
-        self.sej = Sej(setup, loglevel)
-        self.cqdma = Cqdma(setup, loglevel)
+        self.loglevel = loglevel
+        self.gui = gui
+        self._dxcc = None
+        self._gcpu = None
+        self._sej = None
+        self._cqdma = None
         self.hwcode = setup.hwcode
         self.setup = setup
         self.read32 = setup.read32
@@ -44,6 +44,36 @@ class HwCrypto(metaclass=LogBase):
         self.socid_addr = setup.socid_addr
         self.prov_addr = setup.prov_addr
 
+    # The engines pull in the crypto libraries, so they are only imported and set up on first use
+
+    @property
+    def dxcc(self):
+        if self._dxcc is None:
+            from mtkclient.Library.Hardware.hwcrypto_dxcc import Dxcc
+            self._dxcc = Dxcc(self.setup, self.loglevel, self.gui)
+        return self._dxcc
+
+    @property
+    def gcpu(self):
+        if self._gcpu is None:
+            from mtkclient.Library.Hardware.hwcrypto_gcpu import GCpu
+            self._gcpu = GCpu(self.setup, self.loglevel, self.gui)
+        return self._gcpu
+
+    @property
+    def sej(self):
+        if self._sej is None:
+            from mtkclient.Library.Hardware.hwcrypto_sej import Sej
+            self._sej = Sej(self.setup, self.loglevel)
+        return self._sej
+
+    @property
+    def cqdma(self):
+        if self._cqdma is None:
+            from mtkclient.Library.Hardware.cqdma import Cqdma
+            self._cqdma = Cqdma(self.setup, self.loglevel)
+        return self._cqdma
+
     def mtee(self, data, keyseed, ivseed, aeskey1, aeskey2):
         self.gcpu.init()
         self.gcpu.acquire()
@@ -6,11 +6,12 @@
 
 import logging
 import hashlib
-from struct import pack
+from struct import pack, unpack
 from Cryptodome.Util.number import bytes_to_long
 from Cryptodome.Cipher import AES
 from Cryptodome.Util import Counter
 from mtkclient.Library.utils import LogBase, logsetup
+from mtkclient.Library.Hardware.regbatch import RegTransaction
 
 Lcs = 0xA
 KceSet = 0xB
@@ -1010,25 +1011,29 @@ class DxccReg:
         self.dxcc_base = setup.dxcc_base
         self.read32 = setup.read32
         self.write32 = setup.write32
+        self.reg_ops = getattr(setup, "reg_ops", None)
 
     def __setattr__(self, key, value):
-        if key in ("sej_base", "read32", "write32", "regval"):
+        if key in ("dxcc_base", "read32", "write32", "reg_ops", "regval"):
             return super(DxccReg, self).__setattr__(key, value)
         if key in regval:
-            addr = regval[key] + self.sej_base
+            addr = regval[key] + self.dxcc_base
             return self.write32(addr, value)
         else:
             return super(DxccReg, self).__setattr__(key, value)
 
     def __getattribute__(self, item):
-        if item in ("sej_base", "read32", "write32", "regval"):
+        if item in ("dxcc_base", "read32", "write32", "reg_ops", "regval"):
             return super(DxccReg, self).__getattribute__(item)
         if item in regval:
-            addr = regval[item] + self.sej_base
+            addr = regval[item] + self.dxcc_base
             return self.read32(addr)
         else:
             return super(DxccReg, self).__getattribute__(item)
 
+    def transaction(self) -> RegTransaction:
+        return RegTransaction(self.read32, self.write32, self.dxcc_base, regval, self.reg_ops)
+
 
 class Dxcc(metaclass=LogBase):
     DX_HOST_IRR = 0xA00
@@ -1046,7 +1051,10 @@ class Dxcc(metaclass=LogBase):
     DX_HOST_SEP_HOST_GPR3 = 0xA9C
     DX_HOST_SEP_HOST_GPR4 = 0xAA0
 
-    def sb_hal_clear_interrupt_bit(self):
+    def sb_hal_clear_interrupt_bit(self, trans=None):
+        if trans is not None:
+            trans.write(self.dxcc_base + self.DX_HOST_ICR, 4)
+            return
         self.write32(self.dxcc_base + self.DX_HOST_ICR, 4)
 
     def sb_crypto_wait(self):
@@ -1063,16 +1071,17 @@ class Dxcc(metaclass=LogBase):
         # value2=value1
         return value1
 
-    def sasi_sb_adddescsequence(self, data):
-        while True:
-            if self.read32(self.dxcc_base + self.DX_DSCRPTR_QUEUE0_CONTENT) << 0x1C != 0:
-                break
-        self.write32(self.dxcc_base + self.DX_DSCRPTR_QUEUE0_WORD0, data[0])
-        self.write32(self.dxcc_base + self.DX_DSCRPTR_QUEUE0_WORD1, data[1])
-        self.write32(self.dxcc_base + self.DX_DSCRPTR_QUEUE0_WORD2, data[2])
-        self.write32(self.dxcc_base + self.DX_DSCRPTR_QUEUE0_WORD3, data[3])
-        self.write32(self.dxcc_base + self.DX_DSCRPTR_QUEUE0_WORD4, data[4])
-        self.write32(self.dxcc_base + self.DX_DSCRPTR_QUEUE0_WORD5, data[5])
+    def sasi_sb_adddescsequence(self, data, trans=None):
+        """
+        Queues a descriptor once the queue has room, appended to trans if given, else run right away
+        """
+        run = trans is None
+        if run:
+            trans = self.reg.transaction()
+        trans.poll(self.dxcc_base + self.DX_DSCRPTR_QUEUE0_CONTENT, 0xFFFFFFFF, retries=None)
+        trans.write(self.dxcc_base + self.DX_DSCRPTR_QUEUE0_WORD0, data[:6])
+        if run:
+            trans.run()
 
     def __init__(self, setup, loglevel=logging.INFO, gui: bool = False):
         self.__logger, self.info, self.debug, self.warning, self.error = logsetup(self, self.__logger, loglevel, gui)
@@ -1100,7 +1109,7 @@ class Dxcc(metaclass=LogBase):
             itrustee = b"TrustedCorekeymaster" + b"\x07" * 0x10 + appid
             seed = itrustee + pack("<B", ctr)
             paddr = self.sbrom_aes_cmac(1, 0x0, seed, 0x0, len(seed), dstaddr)
-            for field in self.read32(paddr, 4):
+            for field in self.read_dwords(paddr, 4):
                 fdekey += pack("<I", field)
         self.tzcc_clk(0)
         return fdekey
@@ -1298,10 +1307,17 @@ class Dxcc(metaclass=LogBase):
             _buffer = pack("<B", i + 1) + label + b"\x00" + salt + pack("<B", (8 * requestedlen) & 0xFF)
             dstaddr = self.sbrom_aes_cmac(aeskeytype, 0x0, _buffer[:bufferlen], 0, bufferlen, destaddr)
             if dstaddr != 0:
-                for field in self.read32(dstaddr, 4):
+                for field in self.read_dwords(dstaddr, 4):
                     result.extend(pack("<I", field))
         return result
 
+    def read_dwords(self, addr, dwords):
+        # A transaction reads all dwords with one op-list command on the DA extensions
+        trans = self.reg.transaction()
+        result = trans.read(addr, dwords)
+        trans.run()
+        return result.values
+
     def sbrom_aes_cmac(self, aes_key_type, internal_key, data_in, dma_mode, bufferlen, destaddr):
         sram_addr = destaddr
         iv_sram_addr = sram_addr
@@ -1314,17 +1330,27 @@ class Dxcc(metaclass=LogBase):
             self.writemem(key_sram_addr, internal_key)
         if dma_mode != 0:
             dma_mode = dma_mode
-        self.writemem(input_sram_addr, data_in[:bufferlen])
-        if self.sbrom_aes_cmac_driver(aes_key_type, p_internal_key, input_sram_addr, dma_mode, bufferlen, sram_addr):
+        # The input data, the descriptors and the completion polls go out as one register transaction
+        trans = self.reg.transaction()
+        data = data_in[:bufferlen]
+        data += b"\x00" * (-len(data) % 4)
+        trans.write(input_sram_addr, list(unpack(f"<{len(data) // 4}I", data)))
+        if self.sbrom_aes_cmac_driver(aes_key_type, p_internal_key, input_sram_addr, dma_mode, bufferlen, sram_addr,
+                                      trans):
             return sram_addr
         return 0
 
-    def sb_hal_init(self):
-        return self.sb_hal_clear_interrupt_bit()
+    def sb_hal_init(self, trans=None):
+        return self.sb_hal_clear_interrupt_bit(trans)
 
-    def sb_hal_wait_desc_completion(self, destptr=0):
+    def sb_hal_wait_desc_completion(self, destptr=0, trans=None):
+        """
+        Runs trans (the descriptors queued so far) together with the completion descriptor and its polls
+        """
         data = []
-        self.sb_hal_clear_interrupt_bit()
+        if trans is None:
+            trans = self.reg.transaction()
+        self.sb_hal_clear_interrupt_bit(trans)
         val = self.sasi_paldmamap(0)
         data.append(0x0)  # 0
         data.append(0x8000011)  # 1 #DIN_DMA|DOUT_DMA|DIN_CONST
@@ -1332,14 +1358,12 @@ class Dxcc(metaclass=LogBase):
         data.append(0x8000012)  # 3
         data.append(0x100)  # 4
         data.append((destptr >> 32) << 16)  # 5
-        self.sasi_sb_adddescsequence(data)
-        while True:
-            if self.sb_crypto_wait() & 4 != 0:
-                break
-        while True:
-            value = self.read32(self.dxcc_base + 0xBA0)
-            if value != 0:
-                break
+        self.sasi_sb_adddescsequence(data, trans)
+        # sb_crypto_wait until the irr has bit 2 set
+        trans.poll(self.dxcc_base + self.DX_HOST_IRR, 4, retries=None)
+        done = trans.poll(self.dxcc_base + 0xBA0, 0xFFFFFFFF, retries=None)
+        trans.run()
+        value = done.value
         if value == 1:
             self.sb_hal_clear_interrupt_bit()
             self.sasi_paldmaunmap(val)
@@ -1347,7 +1371,8 @@ class Dxcc(metaclass=LogBase):
         else:
             return 0xF6000001
 
-    def sbrom_aes_cmac_driver(self, aes_key_type, p_internal_key, p_data_in, dma_mode, block_size, p_data_out):
+    def sbrom_aes_cmac_driver(self, aes_key_type, p_internal_key, p_data_in, dma_mode, block_size, p_data_out,
+                              trans=None):
         iv_sram_addr = 0
         if aes_key_type == HwCryptoKey.ROOT_KEY:
             if self.read32(self.dxcc_base + self.DX_HOST_SEP_HOST_GPR4) & 2 != 0:
@@ -1356,7 +1381,9 @@ class Dxcc(metaclass=LogBase):
                 key_size_in_bytes = 0x10  # SEP_AES_128_BIT_KEY_SIZE
         else:
             key_size_in_bytes = 0x10  # SEP_AES_128_BIT_KEY_SIZE
-        self.sb_hal_init()
+        if trans is None:
+            trans = self.reg.transaction()
+        self.sb_hal_init(trans)
 
         pdesc = hw_desc_init()
         pdesc = hw_desc_set_cipher_mode(pdesc, SepCipherMode.SEP_CIPHER_CMAC)  # desc[4]=0x1C00
@@ -1367,7 +1394,7 @@ class Dxcc(metaclass=LogBase):
         pdesc = hw_desc_set_flow_mode(pdesc, FlowMode.S_DIN_to_AES)  # desc[4]=0x801C20
         pdesc = hw_desc_set_setup_mode(pdesc, SetupOp.SETUP_LOAD_STATE0)  # desc[4]=0x1801C20
         # pdesc[1] |= 0x8000000 #
-        self.sasi_sb_adddescsequence(pdesc)
+        self.sasi_sb_adddescsequence(pdesc, trans)
 
         # Load key
         mdesc = hw_desc_init()
@@ -1381,7 +1408,7 @@ class Dxcc(metaclass=LogBase):
         mdesc = hw_desc_set_flow_mode(mdesc, FlowMode.S_DIN_to_AES)  # desc[4]=0x809C20
         mdesc = hw_desc_set_setup_mode(mdesc, SetupOp.SETUP_LOAD_KEY0)  # desc[4]=0x4809C20
         mdesc[4] |= ((aes_key_type >> 2) & 3) << 20
-        self.sasi_sb_adddescsequence(mdesc)
+        self.sasi_sb_adddescsequence(mdesc, trans)
 
         # Process input data
         rdesc = hw_desc_init()
@@ -1391,7 +1418,7 @@ class Dxcc(metaclass=LogBase):
             rdesc = hw_desc_set_din_type(rdesc, DmaMode.DMA_DLLI, p_data_in, block_size, SB_AXI_ID,
                                          AXI_SECURE)  # desc[1]=0x3E, desc[0]=0x200E18
         rdesc = hw_desc_set_flow_mode(rdesc, FlowMode.DIN_AES_DOUT)  # desc[4]=1
-        self.sasi_sb_adddescsequence(rdesc)
+        self.sasi_sb_adddescsequence(rdesc, trans)
 
         if aes_key_type != HwCryptoKey.PROVISIONING_KEY:
             xdesc = hw_desc_init()
@@ -1406,8 +1433,8 @@ class Dxcc(metaclass=LogBase):
                                               0)  # desc[2]=0x200E08, desc[3]=0x42
             # xdesc = hw_desc_set_din_sram(xdesc, 0, 0)
             xdesc = hw_desc_set_din_nodma(xdesc, 0, 0)
-            self.sasi_sb_adddescsequence(xdesc)
-        return self.sb_hal_wait_desc_completion() == 0
+            self.sasi_sb_adddescsequence(xdesc, trans)
+        return self.sb_hal_wait_desc_completion(trans=trans) == 0
 
     @staticmethod
     def mtee_decrypt(data):
@@ -5,6 +5,7 @@ import logging
 import os
 from struct import pack, unpack
 from mtkclient.Library.utils import LogBase, logsetup
+from mtkclient.Library.Hardware.regbatch import RegTransaction
 from mtkclient.Library.cryptutils import CryptUtils
 
 CustomSeed = bytes.fromhex("00be13bb95e218b53d07a089cb935255294f70d4088f3930350bc636cc49c9025ece7a62c292853ef55b23a6e" +
@@ -84,9 +85,10 @@ class HaccReg:
         self.sej_base = setup.sej_base
         self.read32 = setup.read32
         self.write32 = setup.write32
+        self.reg_ops = getattr(setup, "reg_ops", None)
 
     def __setattr__(self, key, value):
-        if key in ("sej_base", "read32", "write32", "regval"):
+        if key in ("sej_base", "read32", "write32", "reg_ops", "regval"):
             return super(HaccReg, self).__setattr__(key, value)
         if key in regval:
             addr = regval[key] + self.sej_base
@@ -95,7 +97,7 @@ class HaccReg:
             return super(HaccReg, self).__setattr__(key, value)
 
     def __getattribute__(self, item):
-        if item in ("sej_base", "read32", "write32", "regval"):
+        if item in ("sej_base", "read32", "write32", "reg_ops", "regval"):
             return super(HaccReg, self).__getattribute__(item)
         if item in regval:
             addr = regval[item] + self.sej_base
@@ -103,6 +105,9 @@ class HaccReg:
         else:
             return super(HaccReg, self).__getattribute__(item)
 
+    def transaction(self) -> RegTransaction:
+        return RegTransaction(self.read32, self.write32, self.sej_base, regval, self.reg_ops)
+
 
 class Sej(metaclass=LogBase):
     encrypt = True
@@ -174,6 +179,8 @@ class Sej(metaclass=LogBase):
         self.sej_base = setup.sej_base
         self.read32 = setup.read32
         self.write32 = setup.write32
+        # Device side block loop (base, start, data) -> data or None, if the DA extension provides one
+        self.bulk_run = getattr(setup, "sej_run", None)
         if loglevel == logging.DEBUG:
             logfilename = os.path.join("logs", "log.txt")
             fh = logging.FileHandler(logfilename, encoding='utf-8')
@@ -227,9 +234,11 @@ class Sej(metaclass=LogBase):
         self.write32(0x10007400, tv | (2 << (self.uffs(0xF0000000) - 1)))
 
     def sej_set_mode(self, mode):
-        self.reg.HACC_ACON = self.reg.HACC_ACON & ((~2) & 0xFFFFFFFF)
+        trans = self.reg.transaction()
+        trans.modify("HACC_ACON", (~2) & 0xFFFFFFFF, 0)
         if mode == 1:  # CBC
-            self.reg.HACC_ACON |= 2
+            trans.modify("HACC_ACON", 0xFFFFFFFF, 2)
+        trans.run()
 
     def sej_set_key(self, key, flag, data=None):
         # 0 uses software key (sml_aes_key)
@@ -242,32 +251,20 @@ class Sej(metaclass=LogBase):
             klen = 0x10
         elif flag == 0x20:
             klen = 0x20
-        self.write32(0x109E64, klen)
-        self.reg.HACC_ACON = (self.reg.HACC_ACON & 0xFFFFFFCF) | klen
-        self.reg.HACC_AKEY0 = 0
-        self.reg.HACC_AKEY1 = 0
-        self.reg.HACC_AKEY2 = 0
-        self.reg.HACC_AKEY3 = 0
-        self.reg.HACC_AKEY4 = 0
-        self.reg.HACC_AKEY5 = 0
-        self.reg.HACC_AKEY6 = 0
-        self.reg.HACC_AKEY7 = 0
+        trans = self.reg.transaction()
+        trans.write(0x109E64, klen)
+        trans.modify("HACC_ACON", 0xFFFFFFCF, klen)
+        trans.write("HACC_AKEY0", [0] * 8)
 
         if key == 1:
-            self.reg.HACC_ACONK |= 0x10
+            trans.modify("HACC_ACONK", 0xFFFFFFFF, 0x10)
         else:
             # Key has to be converted to be big endian
             keydata = [0, 0, 0, 0, 0, 0, 0, 0]
             for i in range(0, len(data), 4):
                 keydata[i // 4] = unpack(">I", data[i:i + 4])[0]
-            self.reg.HACC_AKEY0 = keydata[0]
-            self.reg.HACC_AKEY1 = keydata[1]
-            self.reg.HACC_AKEY2 = keydata[2]
-            self.reg.HACC_AKEY3 = keydata[3]
-            self.reg.HACC_AKEY4 = keydata[4]
-            self.reg.HACC_AKEY5 = keydata[5]
-            self.reg.HACC_AKEY6 = keydata[6]
-            self.reg.HACC_AKEY7 = keydata[7]
+            trans.write("HACC_AKEY0", keydata)
+        trans.run()
 
     def tz_pre_init(self):
         # self.device_APC_dom_setup()
@@ -276,28 +273,37 @@ class Sej(metaclass=LogBase):
         return
 
     def sej_run(self, data):
+        return self.sej_run_blocks(bytes_to_dwords(data), self.HACC_AES_START)
+
+    def sej_run_blocks(self, psrc, start):
+        psrc = psrc[:len(psrc) // 4 * 4]
+        if self.bulk_run is not None and psrc:
+            # The whole buffer is processed by the DA in one command, the register path stays as fallback
+            data = pack(f"<{len(psrc)}I", *psrc)
+            pdst = self.bulk_run(self.sej_base, start, data)
+            if pdst is not None:
+                if pdst is not False and len(pdst) == len(data):
+                    return bytearray(pdst)
+                # The HACC already processed blocks, a rerun over registers would continue from
+                # the advanced chaining state and silently return wrong data
+                self.error("SEJ run on the device failed, the result is undefined.")
+                return bytearray()
+            self.debug("Bulk SEJ isn't available, running the blocks over registers")
+            self.bulk_run = None
+        # All blocks are queued as one register transaction, the DA extensions run it as one op-list command,
+        # on the preloader the source and output registers take one command each instead of one per register
+        trans = self.reg.transaction()
+        results = []
+        for pos in range(0, len(psrc), 4):
+            trans.write("HACC_ASRC0", psrc[pos:pos + 4])
+            trans.write("HACC_ACON2", start)
+            ready = trans.poll("HACC_ACON2", self.HACC_AES_RDY, retries=20)
+            results.append((ready, trans.read("HACC_AOUT0", 4)))
+        if not trans.run():
+            self.error("SEJ Hardware seems not to be configured correctly. Results may be wrong.")
         pdst = bytearray()
-        psrc = bytes_to_dwords(data)
-        plen = len(psrc)
-        pos = 0
-        for i in range(plen // 4):
-            self.reg.HACC_ASRC0 = psrc[pos + 0]
-            self.reg.HACC_ASRC1 = psrc[pos + 1]
-            self.reg.HACC_ASRC2 = psrc[pos + 2]
-            self.reg.HACC_ASRC3 = psrc[pos + 3]
-            self.reg.HACC_ACON2 = self.HACC_AES_START
-            i = 0
-            while i < 20:
-                if self.reg.HACC_ACON2 & self.HACC_AES_RDY != 0:
-                    break
-                i += 1
-            if i == 20:
-                self.error("SEJ Hardware seems not to be configured correctly. Results may be wrong.")
-            pdst.extend(pack("<I", self.reg.HACC_AOUT0))
-            pdst.extend(pack("<I", self.reg.HACC_AOUT1))
-            pdst.extend(pack("<I", self.reg.HACC_AOUT2))
-            pdst.extend(pack("<I", self.reg.HACC_AOUT3))
-            pos += 4
+        for ready, aout in results:
+            pdst.extend(pack("<4I", *(aout.values + [0] * (4 - len(aout.values)))))
         return pdst
 
     def sej_aes_hw_init(self, attr, key: SymKey, sej_param=3):
@@ -311,7 +317,8 @@ class Sej(metaclass=LogBase):
         if key.iv is None and key.mode == 1:
             return 0x6002
 
-        self.reg.HACC_SECINIT0 = 1
+        trans = self.reg.transaction()
+        trans.write("HACC_SECINIT0", 1)
         if attr & 1 == 0 or sej_param & 1 != 0:
             acon_setting = self.HACC_AES_128
         elif len(key.key) == 0x18:
@@ -322,7 +329,7 @@ class Sej(metaclass=LogBase):
             acon_setting = self.HACC_AES_192
         if key.mode:
             acon_setting |= self.HACC_AES_CBC
-        self.reg.HACC_ACON = acon_setting
+        trans.write("HACC_ACON", acon_setting)
         """
         if m_src_addr<<30 or m_dst_addr << 30:
             return 0x6007
@@ -338,70 +345,32 @@ class Sej(metaclass=LogBase):
         """
 
         if attr & 1 != 0:
-            self.reg.HACC_AKEY0 = 0
-            self.reg.HACC_AKEY1 = 0
-            self.reg.HACC_AKEY2 = 0
-            self.reg.HACC_AKEY3 = 0
-            self.reg.HACC_AKEY4 = 0
-            self.reg.HACC_AKEY5 = 0
-            self.reg.HACC_AKEY6 = 0
-            self.reg.HACC_AKEY7 = 0
+            trans.write("HACC_AKEY0", [0] * 8)
             if sej_param & 1 != 0:
-                self.reg.HACC_ACONK = self.HACC_AES_BK2C
+                trans.write("HACC_ACONK", self.HACC_AES_BK2C)
             else:
                 keydata = [0, 0, 0, 0, 0, 0, 0, 0]
                 # toDo: Is this valid ?
                 for i in range(0, len(key.key), 4):
                     keydata[i // 4] = unpack(">I", key.key[i:i + 4])[0]
                 if len(key.key) >= 8:
-                    self.reg.HACC_AKEY0 = keydata[0]
-                    self.reg.HACC_AKEY1 = keydata[1]
-                if len(key.key) >= 16:
-                    self.reg.HACC_AKEY2 = keydata[2]
-                    self.reg.HACC_AKEY3 = keydata[3]
-                if len(key.key) >= 24:
-                    self.reg.HACC_AKEY4 = keydata[4]
-                    self.reg.HACC_AKEY5 = keydata[5]
-                if len(key.key) >= 32:
-                    self.reg.HACC_AKEY6 = keydata[6]
-                    self.reg.HACC_AKEY7 = keydata[7]
+                    trans.write("HACC_AKEY0", keydata[:min(len(key.key), 32) // 8 * 2])
         if attr & 2 != 0:
-            self.reg.HACC_ACON2 = self.HACC_AES_CLR
-            self.reg.HACC_ACFG0 = key.iv[0]  # g_AC_CFG
-            self.reg.HACC_ACFG1 = key.iv[1]
-            self.reg.HACC_ACFG2 = key.iv[2]
-            self.reg.HACC_ACFG3 = key.iv[3]
+            trans.write("HACC_ACON2", self.HACC_AES_CLR)
+            trans.write("HACC_ACFG0", key.iv[:4])  # g_AC_CFG
+        trans.run()
 
     def sej_aes_hw_internal(self, data, encrypt, attr, sej_param, legacy=True):
+        trans = self.reg.transaction()
         if encrypt:
-            self.reg.HACC_ACON |= 1
+            trans.modify("HACC_ACON", 0xFFFFFFFF, 1)
         if legacy:
             if (attr & 8) != 0 and (sej_param & 2) != 0:
-                self.reg.HACC_ACONK |= self.HACC_AES_R2K
+                trans.modify("HACC_ACONK", 0xFFFFFFFF, self.HACC_AES_R2K)
             else:
-                self.reg.HACC_ACONK &= 0xFFFFFEFF
-        pdst = bytearray()
-        psrc = bytes_to_dwords(data)
-        plen = len(psrc)
-        pos = 0
-        for i in range(plen // 4):
-            self.reg.HACC_ASRC0 = psrc[pos + 0]
-            self.reg.HACC_ASRC1 = psrc[pos + 1]
-            self.reg.HACC_ASRC2 = psrc[pos + 2]
-            self.reg.HACC_ASRC3 = psrc[pos + 3]
-            self.reg.HACC_ACON2 = self.HACC_AES_START
-            i = 0
-            while i < 20:
-                if self.reg.HACC_ACON2 & self.HACC_AES_RDY != 0:
-                    break
-                i += 1
-            if i == 20:
-                self.error("SEJ Hardware seems not to be configured correctly. Results may be wrong.")
-            pdst.extend(pack("<I", self.reg.HACC_AOUT0))
-            pdst.extend(pack("<I", self.reg.HACC_AOUT1))
-            pdst.extend(pack("<I", self.reg.HACC_AOUT2))
-            pdst.extend(pack("<I", self.reg.HACC_AOUT3))
-            pos += 4
+                trans.modify("HACC_ACONK", 0xFFFFFEFF, 0)
+        trans.run()
+        pdst = self.sej_run_blocks(bytes_to_dwords(data), self.HACC_AES_START)
         if legacy:
             if (attr & 8) != 0 and (sej_param & 2) == 0:
                 # Key_Feedback_XOR_Handler
@@ -411,7 +380,8 @@ class Sej(metaclass=LogBase):
         return pdst
 
     def sst_init(self, attr, iv, keylen=0x10, mparam=5, key=None):
-        self.reg.HACC_SECINIT0 = 1
+        trans = self.reg.transaction()
+        trans.write("HACC_SECINIT0", 1)
         if keylen == 0x10 or mparam & 1 != 0 or attr & 1 != 0:
             acon_setting = 0
         elif keylen == 0x18:
@@ -424,33 +394,17 @@ class Sej(metaclass=LogBase):
             print("SEJ_3DES_HW_SetKey")
         if iv is not None:
             acon_setting |= self.HACC_AES_CBC  # 0
-        self.reg.HACC_ACON = acon_setting
-
-        self.reg.HACC_AKEY0 = 0
-        self.reg.HACC_AKEY1 = 0
-        self.reg.HACC_AKEY2 = 0
-        self.reg.HACC_AKEY3 = 0
-        self.reg.HACC_AKEY4 = 0
-        self.reg.HACC_AKEY5 = 0
-        self.reg.HACC_AKEY6 = 0
-        self.reg.HACC_AKEY7 = 0
+        trans.write("HACC_ACON", acon_setting)
+
+        trans.write("HACC_AKEY0", [0] * 8)
         if mparam & 1 != 0:
-            self.reg.HACC_ACONK = 0x10
+            trans.write("HACC_ACONK", 0x10)
         else:
-            self.reg.HACC_AKEY0 = key[0]
-            self.reg.HACC_AKEY1 = key[1]
-            self.reg.HACC_AKEY2 = key[2]
-            self.reg.HACC_AKEY3 = key[3]
-            self.reg.HACC_AKEY4 = key[4]
-            self.reg.HACC_AKEY5 = key[5]
-            self.reg.HACC_AKEY6 = key[6]
-            self.reg.HACC_AKEY7 = key[7]
+            trans.write("HACC_AKEY0", key[:8])
         if attr & 2 != 0:
-            self.reg.HACC_ACON2 = self.HACC_AES_CLR
-            self.reg.HACC_ACFG0 = iv[0]  # g_AC_CFG
-            self.reg.HACC_ACFG1 = iv[1]
-            self.reg.HACC_ACFG2 = iv[2]
-            self.reg.HACC_ACFG3 = iv[3]
+            trans.write("HACC_ACON2", self.HACC_AES_CLR)
+            trans.write("HACC_ACFG0", iv[:4])  # g_AC_CFG
+        trans.run()
 
         """
         if attr&8!=0:
@@ -510,15 +464,10 @@ class Sej(metaclass=LogBase):
         return buf2
 
     def sej_terminate(self):
-        self.reg.HACC_ACON2 = self.HACC_AES_CLR
-        self.reg.HACC_AKEY0 = 0
-        self.reg.HACC_AKEY1 = 0
-        self.reg.HACC_AKEY2 = 0
-        self.reg.HACC_AKEY3 = 0
-        self.reg.HACC_AKEY4 = 0
-        self.reg.HACC_AKEY5 = 0
-        self.reg.HACC_AKEY6 = 0
-        self.reg.HACC_AKEY7 = 0
+        trans = self.reg.transaction()
+        trans.write("HACC_ACON2", self.HACC_AES_CLR)
+        trans.write("HACC_AKEY0", [0] * 8)
+        trans.run()
 
     def SEJ_V3_Init(self, ben=True, iv=None, legacy=False):
         acon_setting = self.HACC_AES_CHG_BO_OFF | self.HACC_AES_128
@@ -529,73 +478,51 @@ class Sej(metaclass=LogBase):
         else:
             acon_setting |= self.HACC_AES_DEC
 
+        # The whole init runs as one register transaction, on the DA extensions the polls run on the device
+        trans = self.reg.transaction()
         # clear key
-        self.reg.HACC_AKEY0 = 0  # 0x20
-        self.reg.HACC_AKEY1 = 0
-        self.reg.HACC_AKEY2 = 0
-        self.reg.HACC_AKEY3 = 0
-        self.reg.HACC_AKEY4 = 0
-        self.reg.HACC_AKEY5 = 0
-        self.reg.HACC_AKEY6 = 0
-        self.reg.HACC_AKEY7 = 0  # 0x3C
+        trans.write("HACC_AKEY0", [0] * 8)  # 0x20 - 0x3C
 
         # Generate META Key # 0x04
-        self.reg.HACC_ACON = self.HACC_AES_CHG_BO_OFF | self.HACC_AES_CBC | self.HACC_AES_128 | self.HACC_AES_DEC
+        trans.write("HACC_ACON", self.HACC_AES_CHG_BO_OFF | self.HACC_AES_CBC | self.HACC_AES_128 | self.HACC_AES_DEC)
 
         # init ACONK, bind HUID/HUK to HACC, this may differ
         # enable R2K, so that output data is feedback to key by HACC internal algorithm
-        self.reg.HACC_ACONK = self.HACC_AES_BK2C | self.HACC_AES_R2K  # 0x0C
+        trans.write("HACC_ACONK", self.HACC_AES_BK2C | self.HACC_AES_R2K)  # 0x0C
 
         # clear HACC_ASRC/HACC_ACFG/HACC_AOUT
-        self.reg.HACC_ACON2 = self.HACC_AES_CLR  # 0x08
+        trans.write("HACC_ACON2", self.HACC_AES_CLR)  # 0x08
 
-        self.reg.HACC_ACFG0 = iv[0]  # g_AC_CFG
-        self.reg.HACC_ACFG1 = iv[1]
-        self.reg.HACC_ACFG2 = iv[2]
-        self.reg.HACC_ACFG3 = iv[3]
+        trans.write("HACC_ACFG0", iv[:4])  # g_AC_CFG
 
         if legacy:
-            self.reg.HACC_UNK |= 2
+            trans.modify("HACC_UNK", 0xFFFFFFFF, 2)
             # clear HACC_ASRC/HACC_ACFG/HACC_AOUT
-            self.reg.HACC_ACON2 |= 0x40000000
-            i = 0
-            while i < 20:
-                if self.reg.HACC_ACON2 > 0x80000000:
-                    break
-                i += 1
-            if i == 20:
+            trans.modify("HACC_ACON2", 0xFFFFFFFF, 0x40000000)
+            trans.poll("HACC_ACON2", 0x80000000, retries=20)
+            trans.modify("HACC_UNK", 0xFFFFFFFE, 0)
+            trans.write("HACC_ACONK", self.HACC_AES_BK2C)
+            trans.write("HACC_ACON", acon_setting)
+            if not trans.run():
                 self.error("SEJ Legacy Hardware seems not to be configured correctly. Results may be wrong.")
-            self.reg.HACC_UNK &= 0xFFFFFFFE
-            self.reg.HACC_ACONK = self.HACC_AES_BK2C
-            self.reg.HACC_ACON = acon_setting
         else:
             # The reg below needed for mtee ?
-            self.reg.HACC_UNK = 1
+            trans.write("HACC_UNK", 1)
 
             # encrypt fix pattern 3 rounds to generate a pattern from HUID/HUK
             for i in range(0, 3):
                 pos = i * 4
-                self.reg.HACC_ASRC0 = self.g_CFG_RANDOM_PATTERN[pos]
-                self.reg.HACC_ASRC1 = self.g_CFG_RANDOM_PATTERN[pos + 1]
-                self.reg.HACC_ASRC2 = self.g_CFG_RANDOM_PATTERN[pos + 2]
-                self.reg.HACC_ASRC3 = self.g_CFG_RANDOM_PATTERN[pos + 3]
-                self.reg.HACC_ACON2 = self.HACC_AES_START
-                i = 0
-                while i < 20:
-                    if self.reg.HACC_ACON2 & self.HACC_AES_RDY != 0:
-                        break
-                    i += 1
-                if i == 20:
-                    self.error("SEJ Hardware seems not to be configured correctly. Results may be wrong.")
-
-            self.reg.HACC_ACON2 = self.HACC_AES_CLR
-
-            self.reg.HACC_ACFG0 = iv[0]
-            self.reg.HACC_ACFG1 = iv[1]
-            self.reg.HACC_ACFG2 = iv[2]
-            self.reg.HACC_ACFG3 = iv[3]
-            self.reg.HACC_ACON = acon_setting
-            self.reg.HACC_ACONK = 0
+                trans.write("HACC_ASRC0", self.g_CFG_RANDOM_PATTERN[pos:pos + 4])
+                trans.write("HACC_ACON2", self.HACC_AES_START)
+                trans.poll("HACC_ACON2", self.HACC_AES_RDY, retries=20)
+
+            trans.write("HACC_ACON2", self.HACC_AES_CLR)
+
+            trans.write("HACC_ACFG0", iv[:4])
+            trans.write("HACC_ACON", acon_setting)
+            trans.write("HACC_ACONK", 0)
+            if not trans.run():
+                self.error("SEJ Hardware seems not to be configured correctly. Results may be wrong.")
         return acon_setting
 
     def hw_aes128_cbc_encrypt(self, buf, encrypt=True, iv=None, legacy=False):
@@ -612,54 +539,27 @@ class Sej(metaclass=LogBase):
 
     def sej_set_otp(self, data):
         pd = bytes_to_dwords(data)
-        self.reg.HACC_SW_OTP0 = pd[0]
-        self.reg.HACC_SW_OTP1 = pd[1]
-        self.reg.HACC_SW_OTP2 = pd[2]
-        self.reg.HACC_SW_OTP3 = pd[3]
-        self.reg.HACC_SW_OTP4 = pd[4]
-        self.reg.HACC_SW_OTP5 = pd[5]
-        self.reg.HACC_SW_OTP6 = pd[6]
-        self.reg.HACC_SW_OTP7 = pd[7]
+        self.reg.transaction().write("HACC_SW_OTP0", pd[:8]).run()
         # self.reg.HACC_SECINIT0 = pd[8]
         # self.reg.HACC_SECINIT1 = pd[9]
         # self.reg.HACC_SECINIT2 = pd[0xA]
         # self.reg.HACC_MKJ = pd[0xB]
 
     def sej_do_aes(self, encrypt, iv=None, data=b"", length=16):
-        self.reg.HACC_ACON2 |= self.HACC_AES_CLR
+        trans = self.reg.transaction()
+        trans.modify("HACC_ACON2", 0xFFFFFFFF, self.HACC_AES_CLR)
         if iv is not None:
-            piv = bytes_to_dwords(iv)
-            self.reg.HACC_ACFG0 = piv[0]
-            self.reg.HACC_ACFG1 = piv[1]
-            self.reg.HACC_ACFG2 = piv[2]
-            self.reg.HACC_ACFG3 = piv[3]
+            trans.write("HACC_ACFG0", bytes_to_dwords(iv)[:4])
         if encrypt:
-            self.reg.HACC_ACON |= self.HACC_AES_ENC
+            trans.modify("HACC_ACON", 0xFFFFFFFF, self.HACC_AES_ENC)
         else:
-            self.reg.HACC_ACON &= 0xFFFFFFFE
-        pdst = bytearray()
+            trans.modify("HACC_ACON", 0xFFFFFFFE, 0)
+        acon2 = trans.read("HACC_ACON2")
+        trans.run()
+        psrc = []
         for pos in range(0, length, 16):
-            psrc = bytes_to_dwords(data[(pos % len(data)):(pos % len(data)) + 16])
-            plen = len(psrc)
-            pos = 0
-            for i in range(plen // 4):
-                self.reg.HACC_ASRC0 = psrc[pos + 0]
-                self.reg.HACC_ASRC1 = psrc[pos + 1]
-                self.reg.HACC_ASRC2 = psrc[pos + 2]
-                self.reg.HACC_ASRC3 = psrc[pos + 3]
-                self.reg.HACC_ACON2 |= self.HACC_AES_START
-                i = 0
-                while i < 20:
-                    if self.reg.HACC_ACON2 & self.HACC_AES_RDY != 0:
-                        break
-                    i += 1
-                if i == 20:
-                    self.error("SEJ Hardware seems not to be configured correctly. Results may be wrong.")
-                pdst.extend(pack("<I", self.reg.HACC_AOUT0))
-                pdst.extend(pack("<I", self.reg.HACC_AOUT1))
-                pdst.extend(pack("<I", self.reg.HACC_AOUT2))
-                pdst.extend(pack("<I", self.reg.HACC_AOUT3))
-        return pdst
+            psrc.extend(bytes_to_dwords(data[(pos % len(data)):(pos % len(data)) + 16])[:4])
+        return self.sej_run_blocks(psrc, (acon2.value or 0) | self.HACC_AES_START)
 
     def sej_key_config(self, swkey):
         iv = bytes.fromhex("57325A5A125497661254976657325A5A")
@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+from itertools import count
+
+
+class RegResult:
+    def __init__(self, dwords=1):
+        self.dwords = dwords
+        self.values = []
+        self.ok = True
+
+    @property
+    def value(self):
+        if self.dwords == 1:
+            return self.values[0] if self.values else None
+        return self.values
+
+
+class RegOp:
+    WRITE = 0
+    READ = 1
+    POLL = 2
+    MODIFY = 3
+
+    def __init__(self, optype, addr, values=None, result=None, mask=0, expected=None, retries=20):
+        self.type = optype
+        self.addr = addr
+        self.values = values
+        self.result = result
+        self.mask = mask
+        self.expected = expected
+        self.retries = retries
+
+
+class RegTransaction:
+    """
+    Records register writes, reads, read-modify-writes and "poll until mask" steps and runs them in one go.
+    With run_ops (the register op-list command of the DA extensions) the ops are executed on the device,
+    polls included, with one command per 0x800 ops. Otherwise they are replayed through read32/write32,
+    with accesses to consecutive registers merged into one multi-dword call, which the preloader sends
+    as a single READ32/WRITE32 command.
+    """
+
+    # Op types of the CUSTOM_REG_OPS/CUSTOMREGOPS payload command
+    DEV_WRITE = 0
+    DEV_READ = 1
+    DEV_POLL = 2
+    DEV_POLL_ANY = 3
+    DEV_MODIFY = 4
+    DEV_MAX_OPS = 0x800
+
+    def __init__(self, read32, write32, base=0, regs=None, run_ops=None):
+        self.read32 = read32
+        self.write32 = write32
+        self.run_ops = run_ops
+        self.base = base
+        self.regs = regs if regs is not None else {}
+        self.ops = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.run()
+        return False
+
+    def address(self, reg):
+        # Register names are resolved with the register table and the base, numbers are absolute addresses
+        if isinstance(reg, str):
+            return self.base + self.regs[reg]
+        return reg
+
+    def write(self, reg, values):
+        if isinstance(values, int):
+            values = [values]
+        self.ops.append(RegOp(RegOp.WRITE, self.address(reg), values=list(values)))
+        return self
+
+    def read(self, reg, dwords=1) -> RegResult:
+        result = RegResult(dwords)
+        self.ops.append(RegOp(RegOp.READ, self.address(reg), result=result))
+        return result
+
+    def modify(self, reg, mask, value):
+        """
+        Sets reg to (reg & mask) | value
+        """
+        self.ops.append(RegOp(RegOp.MODIFY, self.address(reg), values=[value], mask=mask))
+        return self
+
+    def poll(self, reg, mask, expected=None, retries=20) -> RegResult:
+        """
+        Reads reg until reg & mask == expected (any bit of mask set if expected is None),
+        retries=None waits forever. On the device the payload bounds the poll by its own loop limit.
+        """
+        result = RegResult()
+        self.ops.append(RegOp(RegOp.POLL, self.address(reg), result=result, mask=mask, expected=expected,
+                              retries=retries))
+        return result
+
+    def run(self) -> bool:
+        ops = self.ops
+        self.ops = []
+        if self.run_ops is not None and ops:
+            success = self.run_device(ops)
+            if success is not None:
+                return success
+        return self.replay(ops)
+
+    @staticmethod
+    def polled(op, value) -> bool:
+        if op.expected is None:
+            return value & op.mask != 0
+        return value & op.mask == op.expected
+
+    def run_device(self, ops):
+        """
+        Runs the ops with the payload op-list command, None if the payload doesn't support it (nothing was run yet)
+        """
+        devops = []
+        for op in ops:
+            if op.type == RegOp.WRITE:
+                devops.extend((self.DEV_WRITE, op.addr + 4 * pos, 0, value) for pos, value in enumerate(op.values))
+            elif op.type == RegOp.READ:
+                devops.extend((self.DEV_READ, op.addr + 4 * pos, 0, 0) for pos in range(op.result.dwords))
+            elif op.type == RegOp.POLL:
+                if op.expected is None:
+                    devops.append((self.DEV_POLL_ANY, op.addr, op.mask, 0))
+                else:
+                    devops.append((self.DEV_POLL, op.addr, op.mask, op.expected))
+            elif op.type == RegOp.MODIFY:
+                devops.append((self.DEV_MODIFY, op.addr, op.mask, op.values[0]))
+        values = []
+        for pos in range(0, len(devops), self.DEV_MAX_OPS):
+            res = self.run_ops(devops[pos:pos + self.DEV_MAX_OPS])
+            if res is None and pos == 0:
+                return None
+            if not isinstance(res, list):
+                # Part of the ops already ran on the device, replaying them could repeat writes with side effects
+                self.fail(ops)
+                return False
+            values.extend(res)
+        success = True
+        pos = 0
+        for op in ops:
+            if op.type == RegOp.READ:
+                op.result.values = values[pos:pos + op.result.dwords]
+                op.result.ok = len(op.result.values) == op.result.dwords
+                pos += op.result.dwords
+            elif op.type == RegOp.POLL:
+                op.result.values = values[pos:pos + 1]
+                op.result.ok = len(op.result.values) == 1 and self.polled(op, op.result.values[0])
+                pos += 1
+            else:
+                continue
+            success &= op.result.ok
+        return success
+
+    @staticmethod
+    def merge(ops):
+        merged = []
+        for op in ops:
+            if merged and op.type == merged[-1].type and op.type in (RegOp.WRITE, RegOp.READ):
+                last = merged[-1]
+                if op.type == RegOp.WRITE and op.addr == last.addr + 4 * len(last.values):
+                    last.values = last.values + op.values
+                    continue
+                if op.type == RegOp.READ and op.addr == last.addr + 4 * sum(r.dwords for r in last.result):
+                    last.result.append(op.result)
+                    continue
+            if op.type == RegOp.READ:
+                op = RegOp(RegOp.READ, op.addr, result=[op.result])
+            merged.append(op)
+        return merged
+
+    def read_dwords(self, addr, dwords):
+        res = self.read32(addr, dwords)
+        if isinstance(res, int):
+            return [res]
+        if not res:
+            return []
+        return list(res)
+
+    @staticmethod
+    def fail(ops):
+        for op in ops:
+            for result in (op.result if isinstance(op.result, list) else [op.result]):
+                if result is not None:
+                    result.ok = False
+
+    def replay(self, ops) -> bool:
+        """
+        Runs the ops, a failed write stops the sequence and marks all results which weren't read as failed
+        """
+        success = True
+        merged = self.merge(ops)
+        for idx, op in enumerate(merged):
+            if op.type == RegOp.WRITE:
+                if not self.write32(op.addr, op.values[0] if len(op.values) == 1 else op.values):
+                    self.fail(merged[idx:])
+                    return False
+            elif op.type == RegOp.MODIFY:
+                values = self.read_dwords(op.addr, 1)
+                if not values or not self.write32(op.addr, (values[0] & op.mask) | op.values[0]):
+                    self.fail(merged[idx:])
+                    return False
+            elif op.type == RegOp.READ:
+                values = self.read_dwords(op.addr, sum(result.dwords for result in op.result))
+                pos = 0
+                for result in op.result:
+                    result.values = values[pos:pos + result.dwords]
+                    result.ok = len(result.values) == result.dwords
+                    success &= result.ok
+                    pos += result.dwords
+            elif op.type == RegOp.POLL:
+                result = op.result
+                result.ok = False
+                for _ in (count() if op.retries is None else range(op.retries)):
+                    values = self.read_dwords(op.addr, 1)
+                    if not values:
+                        break
+                    result.values = values
+                    if self.polled(op, values[0]):
+                        result.ok = True
+                        break
+                success &= result.ok
+        return success
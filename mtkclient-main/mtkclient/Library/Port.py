@@ -27,12 +27,29 @@ class Port(metaclass=LogBase):
         self.config = mtk.config
         self.mtk = mtk
         self.serialportname = None
-        if serialportname is not None:
-            self.cdc = SerialClass(portconfig=portconfig, loglevel=loglevel, devclass=10)
+        record = getattr(self.config, "record", None)
+        replay = getattr(self.config, "replay", None)
+        simulator = getattr(self.config, "simulator", None)
+        if simulator is not None:
+            # simulated device with an already running DA, see Library/Simulator
+            self.cdc = simulator
+        elif replay is not None:
+            from mtkclient.Library.Connection.sessionlib import ReplayClass
+            self.cdc = ReplayClass(replay, portconfig=portconfig, loglevel=loglevel, devclass=10)
+        elif serialportname is not None:
+            if record is not None:
+                from mtkclient.Library.Connection.sessionlib import SerialRecordClass
+                self.cdc = SerialRecordClass(record, portconfig=portconfig, loglevel=loglevel, devclass=10)
+            else:
+                self.cdc = SerialClass(portconfig=portconfig, loglevel=loglevel, devclass=10)
             self.cdc.setportname(serialportname)
+        elif record is not None:
+            from mtkclient.Library.Connection.sessionlib import UsbRecordClass
+            self.cdc = UsbRecordClass(record, portconfig=portconfig, loglevel=loglevel, devclass=10)
         else:
             self.cdc = UsbClass(portconfig=portconfig, loglevel=loglevel, devclass=10)
         self.usbread = self.cdc.usbread
+        self.usbreadinto = self.cdc.usbreadinto
         self.usbwrite = self.cdc.usbwrite
         self.close = self.cdc.close
         self.rdword = self.cdc.rdword
@@ -172,7 +189,7 @@ class Port(metaclass=LogBase):
                         sys.stdout.write('\n')
                         loop = 0
                     loop += 1
-                    time.sleep(0.3)
+                    self.wait_for_device(0.3)
                     sys.stdout.flush()
 
             except Exception as serr:
@@ -182,22 +199,81 @@ class Port(metaclass=LogBase):
                 pass
         return False
 
+    def device_present(self) -> bool:
+        if not isinstance(self.cdc, UsbClass):
+            return True
+        try:
+            ids = [(dev.vid, dev.pid) for dev in self.detectusbdevices()]
+        except Exception as err:
+            self.debug(str(err))
+            return False
+        return any((usbid[0], usbid[1]) in ids for usbid in self.cdc.portconfig)
+
+    def wait_for_device(self, timeout=0.3, interval=0.1) -> bool:
+        """
+        Sleeps timeout seconds, but returns as soon as a matching device shows up which wasn't
+        enumerated before. A present device which fails to connect always waits the whole timeout.
+        """
+        deadline = time.monotonic() + timeout
+        present = self.device_present()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return present
+            time.sleep(min(interval, remaining))
+            if not present and self.device_present():
+                return True
+
+    def read_timeout(self, timeout) -> int:
+        """
+        Converts timeout in seconds to the maxtimeout of the transport: serial reads take ms,
+        usb reads count retries of the usb read timeout (cdc.timeout in ms, rounded up to one read).
+        """
+        if isinstance(self.cdc, UsbClass):
+            return max(int(timeout * 1000) // max(self.cdc.timeout, 1) - 1, 0)
+        return max(int(timeout * 1000), 1)
+
+    def read_response(self, resplen, timeout=1.0) -> bytes:
+        """
+        Reads resplen bytes and returns as soon as they arrived. Short reads are retried until
+        timeout seconds passed, so slow replies don't need a fixed sleep before reading.
+        """
+        res = bytearray(resplen)
+        view = memoryview(res)
+        pos = 0
+        deadline = time.monotonic() + timeout
+        while pos < resplen:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            pos += self.usbreadinto(view[pos:], maxtimeout=self.read_timeout(remaining))
+        return bytes(res[:pos])
+
+    def send_payload(self, data, maxpackets=32) -> bool:
+        """ Writes data in multiples of the endpoint packet size, followed by a zero length packet """
+        pktsize = self.cdc.get_write_packetsize()
+        chunksize = pktsize * maxpackets
+        view = memoryview(data)
+        for pos in range(0, len(view), chunksize):
+            if not self.usbwrite(view[pos:pos + chunksize].tobytes(), pktsize):
+                return False
+        return self.usbwrite(b"")
+
     def mtk_cmd(self, value, bytestoread=0, nocmd=False):
         resp = b""
         dlen = len(value)
         wr = self.usbwrite(value)
-        time.sleep(0.05)
         if wr:
             if nocmd:
-                cmdrsp = self.usbread(bytestoread)
+                cmdrsp = self.read_response(bytestoread)
                 return cmdrsp
             else:
-                cmdrsp = self.usbread(dlen)
-                if cmdrsp[0] is not value[0]:
+                cmdrsp = self.read_response(dlen)
+                if not cmdrsp or cmdrsp[0] is not value[0]:
                     self.error(f"Cmd error :{hexlify(cmdrsp).decode('utf-8')}")
                     return -1
                 if bytestoread > 0:
-                    resp = self.usbread(bytestoread)
+                    resp = self.read_response(bytestoread)
                 return resp
         else:
             self.warning(f"Couldn't send :{hexlify(value).decode('utf-8')}")
@@ -215,3 +291,17 @@ class Port(metaclass=LogBase):
             if val != tmp:
                 return False
         return True
+
+    def echo_bulk(self, data: bytes, window=0x100) -> bool:
+        """
+        Sends data in blocks of window bytes and verifies the echo of each block at once,
+        instead of waiting for the echo of every single value
+        """
+        view = memoryview(data)
+        for pos in range(0, len(view), window):
+            chunk = view[pos:pos + window]
+            self.usbwrite(chunk.tobytes())
+            tmp = self.usbread(len(chunk), maxtimeout=0)
+            if chunk != tmp:
+                return False
+        return True
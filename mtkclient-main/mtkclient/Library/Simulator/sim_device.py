@@ -0,0 +1,211 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+"""
+Simulated device with a running DA. The protocol side is a generator (run) that asks for the number of
+bytes it wants to receive next by yielding it, and queues its responses with send. It advances whenever
+the host writes, so a session needs no extra thread. Optional latency per transfer and link bandwidth
+slow the host down like a real usb link would.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from struct import pack, unpack
+from mtkclient.Library.Connection.devicehandler import DeviceClass
+from mtkclient.Library.Connection.usblib import UsbClass
+
+
+class SimDevice(DeviceClass):
+    flashmode = None
+    hwcode = 0
+    meid = bytes.fromhex("4d544b53494d554c41544f524d454944")
+    socid = bytes.fromhex("4d544b53494d554c41544f52534f4349444d544b53494d554c41544f52534f43")
+
+    def __init__(self, storage, latency=0.0, bandwidth=0, loglevel=logging.INFO, portconfig=None, devclass=-1,
+                 timeout=5.0):
+        super().__init__(loglevel, portconfig, devclass)
+        self.storage = storage
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.readtimeout = timeout
+        self.vid = 0x0E8D
+        self.pid = 0x2001
+        self.cond = threading.Condition()
+        self.inbuf = bytearray()
+        self.outbuf = bytearray()
+        self.linkfree = 0.0
+        # thread cpu time spent in the simulated device and transport, to be subtracted from host figures
+        self.cpu = 0.0
+        self.engine = self.run()
+        self.need = next(self.engine)
+
+    def run(self):
+        raise NotImplementedError()
+
+    @staticmethod
+    def recv(length):
+        data = yield length
+        return data
+
+    def send(self, data):
+        self.outbuf += data
+
+    def state(self):
+        return {}
+
+    def write_state(self, path):
+        """
+        Writes the .state file of an already running DA to path, so DaHandler.configure_da reinitializes
+        from it instead of going through brom and preloader.
+        """
+        config = dict(flashmode=self.flashmode, hwcode=self.hwcode, meid=self.meid.hex(), socid=self.socid.hex(),
+                      flashtype=self.storage.flashtype, flashsize=self.storage.size("user"))
+        config.update(self.state())
+        if not os.path.exists(path):
+            os.makedirs(path)
+        with open(os.path.join(path, ".state"), "w") as wf:
+            wf.write(json.dumps(config))
+
+    def transfer(self, length):
+        if not self.latency and not self.bandwidth:
+            return
+        with self.cond:
+            now = time.perf_counter()
+            self.linkfree = max(now, self.linkfree) + self.latency
+            if self.bandwidth:
+                self.linkfree += length / self.bandwidth
+            delay = self.linkfree - now
+        # Short delays add up until they are worth a sleep
+        if delay > 0.001:
+            time.sleep(delay)
+
+    def feed(self, data):
+        with self.cond:
+            start = time.thread_time()
+            self.inbuf += data
+            while self.need is not None and len(self.inbuf) >= self.need:
+                with memoryview(self.inbuf) as view:
+                    chunk = bytes(view[:self.need])
+                del self.inbuf[:self.need]
+                try:
+                    self.need = self.engine.send(chunk)
+                except StopIteration:
+                    self.need = None
+            self.cpu += time.thread_time() - start
+            self.cond.notify_all()
+
+    def wait(self, length):
+        """
+        Waits until length bytes (any if None) are queued or the read timeout passed, returns the available count.
+        """
+        count = 1 if length is None else length
+        if len(self.outbuf) < count:
+            self.cond.wait_for(lambda: len(self.outbuf) >= count, self.readtimeout)
+        if length is None:
+            return len(self.outbuf)
+        return min(length, len(self.outbuf))
+
+    def connect(self, ep_in=-1, ep_out=-1):
+        self.connected = True
+        return True
+
+    def close(self, reset=False):
+        self.connected = False
+        self.storage.flush()
+
+    def setportname(self, portname: str):
+        self.portname = portname
+
+    def set_fast_mode(self, enabled: bool):
+        return
+
+    def flush(self):
+        return
+
+    def detectdevices(self):
+        return [UsbClass.DeviceClass(self.vid, self.pid)]
+
+    def get_interface_count(self):
+        return 1
+
+    def set_line_coding(self, baudrate=None, parity=0, databits=8, stopbits=1):
+        return
+
+    def setbreak(self):
+        return
+
+    def setcontrollinestate(self, rts=None, dtr=None, is_ftdi=False):
+        return
+
+    def get_read_packetsize(self):
+        return 512
+
+    def get_write_packetsize(self):
+        return 512
+
+    def ctrl_transfer(self, bm_request_type, b_request, w_value, w_index, data_or_w_length):
+        return 0
+
+    def write(self, command, pktsize=None):
+        if isinstance(command, str):
+            command = bytes(command, 'utf-8')
+        self.transfer(len(command))
+        self.feed(command)
+        return True
+
+    def usbwrite(self, data, pktsize=None):
+        return self.write(data, pktsize)
+
+    def usbread(self, resplen=None, maxtimeout=0, w_max_packet_size=None, **kwargs):
+        with self.cond:
+            count = self.wait(resplen)
+            start = time.thread_time()
+            res = bytes(self.outbuf[:count])
+            del self.outbuf[:count]
+            self.cpu += time.thread_time() - start
+        self.transfer(len(res))
+        return res
+
+    def usbreadinto(self, buffer, maxtimeout=0, w_max_packet_size=None):
+        view = memoryview(buffer).cast('B')
+        with self.cond:
+            count = self.wait(len(view))
+            start = time.thread_time()
+            with memoryview(self.outbuf) as data:
+                view[:count] = data[:count]
+            del self.outbuf[:count]
+            self.cpu += time.thread_time() - start
+        self.transfer(count)
+        return count
+
+    def usbxmlread(self, maxtimeout=0):
+        return self.usbread()
+
+    def usbreadwrite(self, data, resplen):
+        self.usbwrite(data)
+        return self.usbread(resplen)
+
+
+class SimFramedDevice(SimDevice):
+    """
+    Base of the xflash and xml DA, every transfer is a frame of magic, data type and payload length.
+    """
+    MAGIC = 0xFEEEEEEF
+
+    def recv_frame(self):
+        hdr = yield from self.recv(12)
+        magic, datatype, length = unpack("<III", hdr)
+        if magic != self.MAGIC:
+            raise ValueError(f"Simulator: frame with wrong magic {hex(magic)}")
+        data = yield from self.recv(length)
+        return data
+
+    def recv_dword(self):
+        data = yield from self.recv_frame()
+        return int.from_bytes(data[:4], 'little')
+
+    def send_frame(self, data):
+        self.send(pack("<III", self.MAGIC, 1, len(data)))
+        self.send(data)
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import logging
+from struct import pack, unpack
+from mtkclient.Library.checksum import sum16
+from mtkclient.Library.DA.legacy.dalegacy_param import Cmd, Rsp
+from mtkclient.Library.Simulator.sim_device import SimDevice
+
+# emmc partition type of switch part / sdmmc write to the simulated area
+emmc_parts = {1: "boot1", 2: "boot2", 3: "rpmb", 8: "user"}
+
+
+class SimLegacy(SimDevice):
+    """
+    Running legacy DA on an emmc device, serving USB_CHECK_STATUS, SDMMC_SWITCH_PART, READ (D6),
+    SDMMC_WRITE_DATA and FORMAT.
+    """
+    flashmode = "LEGACY"
+    hwcode = 0x6580
+    STATUS_INVALID_RANGE = 0xC0030007
+
+    def __init__(self, storage, latency=0.0, bandwidth=0, loglevel=logging.INFO, portconfig=None, devclass=-1,
+                 timeout=5.0):
+        if storage.flashtype != "emmc":
+            raise ValueError("The legacy DA simulator only supports emmc")
+        self.part = "user"
+        super().__init__(storage, latency, bandwidth, loglevel, portconfig, devclass, timeout)
+
+    def state(self):
+        return dict(m_emmc_ua_size=self.storage.size("user"), m_emmc_boot1_size=self.storage.size("boot1"),
+                    m_emmc_boot2_size=self.storage.size("boot2"), m_emmc_gp_size=[0, 0, 0, 0],
+                    m_nand_flash_size=0, m_nor_flash_size=0, m_sdmmc_ua_size=0)
+
+    def run(self):
+        commands = {
+            Cmd.USB_CHECK_STATUS: self.usb_check_status,
+            Cmd.SDMMC_SWITCH_PART_CMD: self.switch_part,
+            Cmd.READ_CMD: self.read,
+            Cmd.SDMMC_WRITE_DATA_CMD: self.sdmmc_write_data,
+            Cmd.FORMAT_CMD: self.format
+        }
+        while True:
+            cmd = yield from self.recv(1)
+            handler = commands.get(cmd)
+            if handler is None:
+                self.send(Rsp.NACK)
+                continue
+            yield from handler()
+
+    def usb_check_status(self):
+        # ack, high speed
+        self.send(Rsp.ACK + b"\x01")
+        yield from ()
+
+    def switch_part(self):
+        self.send(Rsp.ACK)
+        partition = yield from self.recv(1)
+        self.part = emmc_parts.get(partition[0])
+        self.send(Rsp.ACK)
+
+    def read(self):
+        # host type, storage type, addr, length, packet size
+        _, _, addr, length, packetsize = unpack(">BBQQI", (yield from self.recv(22)))
+        if not self.storage.valid(self.part, addr, length) or packetsize == 0:
+            self.send(Rsp.NACK)
+            yield from self.recv(1)
+            self.send(pack("<I", self.STATUS_INVALID_RANGE))
+            return
+        self.send(Rsp.ACK)
+        pos = 0
+        while pos < length:
+            size = min(packetsize, length - pos)
+            data = self.storage.read(self.part, addr + pos, size)
+            self.send(data)
+            self.send(pack(">H", sum16(data)))
+            # NACK requests the packet again
+            if (yield from self.recv(1)) != Rsp.NACK:
+                pos += size
+
+    def sdmmc_write_data(self):
+        _, parttype, addr, length, packetsize = unpack(">BBQQI", (yield from self.recv(22)))
+        area = emmc_parts.get(parttype)
+        if not self.storage.valid(area, addr, length) or packetsize == 0:
+            self.send(Rsp.NACK)
+            return
+        self.send(Rsp.ACK)
+        pos = 0
+        while pos < length:
+            yield from self.recv(1)
+            data = yield from self.recv(min(packetsize, length - pos))
+            checksum = unpack(">H", (yield from self.recv(2)))[0]
+            if checksum != sum16(data):
+                self.error(f"Simulator: checksum mismatch at {hex(addr + pos)}")
+            self.storage.write(area, addr + pos, data)
+            pos += len(data)
+            self.send(Rsp.CONT_CHAR)
+
+    def format(self):
+        # storage type, nutl erase, validation, address type, addr, length
+        _, _, _, _, addr, length = unpack(">BBBBQQ", (yield from self.recv(20)))
+        if not self.storage.erase(self.part, addr, length):
+            self.send(Rsp.NACK)
+            return
+        # progress report of 100%, then the final acks
+        self.send(Rsp.ACK + Rsp.ACK + pack(">I", 0) + b"\x64")
+        yield from self.recv(1)
+        self.send(Rsp.ACK + Rsp.ACK)
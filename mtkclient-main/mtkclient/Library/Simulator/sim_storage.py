@@ -0,0 +1,162 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import mmap
+import os
+import zlib
+from struct import pack
+
+# name, size of the partitions written by FlashStorage.format_gpt, the rest of the user area goes to userdata.
+# The small ones are contiguous, so rl reads them batched like on a real device.
+default_partitions = [
+    ("proinfo", 0x40000),
+    ("nvcfg", 0x80000),
+    ("seccfg", 0x20000),
+    ("para", 0x80000),
+    ("misc", 0x80000),
+    ("vbmeta", 0x10000),
+    ("lk", 0x100000),
+    ("boot", 0x800000),
+    ("recovery", 0x800000),
+    ("super", 0x1000000),
+]
+
+
+class FlashStorage:
+    """
+    Flash areas of a simulated eMMC or UFS device (user, boot1, boot2, rpmb). The areas are kept in memory,
+    the user area can instead be backed by an image file, which is then modified by writes and erases.
+    An existing image keeps its size, a missing one is created with user_size.
+    """
+
+    def __init__(self, flashtype="emmc", user_size=0x4000000, boot_size=0x400000, rpmb_size=0x400000,
+                 filename=None, fill=None):
+        if flashtype not in ["emmc", "ufs"]:
+            raise ValueError(f"Unsupported flash type: {flashtype}")
+        self.flashtype = flashtype
+        self.block_size = 0x200 if flashtype == "emmc" else 0x1000
+        self.file = None
+        self.areas = {}
+        if filename is not None:
+            if not os.path.exists(filename):
+                with open(filename, "wb") as wf:
+                    wf.truncate(user_size)
+            self.file = open(filename, "r+b")
+            self.areas["user"] = mmap.mmap(self.file.fileno(), os.path.getsize(filename))
+        else:
+            self.areas["user"] = bytearray(user_size)
+        self.areas["boot1"] = bytearray(boot_size)
+        self.areas["boot2"] = bytearray(boot_size)
+        self.areas["rpmb"] = bytearray(rpmb_size)
+        if fill is not None:
+            self.fill(fill)
+
+    def size(self, area):
+        if area not in self.areas:
+            return 0
+        return len(self.areas[area])
+
+    def valid(self, area, offset, length):
+        return area in self.areas and offset >= 0 and length >= 0 and offset + length <= len(self.areas[area])
+
+    def read(self, area, offset, length):
+        """
+        Returns a memoryview of the requested range, None if it is out of range.
+        """
+        if not self.valid(area, offset, length):
+            return None
+        return memoryview(self.areas[area])[offset:offset + length]
+
+    def write(self, area, offset, data):
+        if not self.valid(area, offset, len(data)):
+            return False
+        self.areas[area][offset:offset + len(data)] = data
+        return True
+
+    def erase(self, area, offset, length, chunksize=0x100000):
+        if not self.valid(area, offset, length):
+            return False
+        zeros = bytes(min(length, chunksize))
+        end = offset + length
+        while offset < end:
+            size = min(chunksize, end - offset)
+            self.areas[area][offset:offset + size] = zeros[:size]
+            offset += size
+        return True
+
+    def fill(self, func, chunksize=0x100000):
+        """
+        Fills all areas with func(size), for example os.urandom, so every page is resident and
+        read back data can be compared.
+        """
+        for area in self.areas.values():
+            for pos in range(0, len(area), chunksize):
+                size = min(chunksize, len(area) - pos)
+                area[pos:pos + size] = func(size)
+
+    def has_gpt(self):
+        return bytes(self.areas["user"][self.block_size:self.block_size + 8]) == b"EFI PART"
+
+    def format_gpt(self, partitions=None, num_part_entries=128, part_entry_size=0x80):
+        """
+        Writes a protective mbr, the primary and the backup gpt to the user area. partitions is a list of
+        (name, size), the last one is extended to the end of the usable area.
+        """
+        if partitions is None:
+            partitions = default_partitions + [("userdata", 0)]
+        sector = self.block_size
+        totalsectors = len(self.areas["user"]) // sector
+        entrysectors = (num_part_entries * part_entry_size + sector - 1) // sector
+        first_usable_lba = 2 + entrysectors
+        last_usable_lba = totalsectors - 2 - entrysectors
+        entries = bytearray(num_part_entries * part_entry_size)
+        # partitions start 1MiB aligned, like on mtk devices
+        lba = max(first_usable_lba, 0x100000 // sector)
+        for idx, (name, size) in enumerate(partitions):
+            sectors = (size + sector - 1) // sector
+            if idx == len(partitions) - 1 or lba + sectors - 1 > last_usable_lba:
+                sectors = last_usable_lba - lba + 1
+            if sectors <= 0:
+                raise ValueError(f"User area too small for partition {name}")
+            # basic data type guid, unique guid derived from the index
+            entry = bytes.fromhex("a2a0d0ebe5b9334487c068b6b72699c7")
+            entry += pack("<IHHH", 0x4D544B00 + idx, 0x5349, 0x4D55, 0x4C41) + idx.to_bytes(6, 'big')
+            entry += pack("<QQQ", lba, lba + sectors - 1, 0)
+            entry += name.encode("utf-16-le")[:72].ljust(72, b"\x00")
+            entries[idx * part_entry_size:idx * part_entry_size + len(entry)] = entry
+            lba += sectors
+            if lba > last_usable_lba:
+                break
+        entries_crc = zlib.crc32(entries)
+        mbr = bytearray(sector)
+        mbr[0x1BE:0x1CE] = pack("<BBBBBBBBII", 0, 0, 2, 0, 0xEE, 0xFF, 0xFF, 0xFF, 1,
+                                min(totalsectors - 1, 0xFFFFFFFF))
+        mbr[0x1FE:0x200] = b"\x55\xAA"
+        self.write("user", 0, mbr)
+        self.write("user", sector, self.gpt_header(1, totalsectors - 1, first_usable_lba, last_usable_lba, 2,
+                                                   num_part_entries, part_entry_size, entries_crc))
+        self.write("user", 2 * sector, entries)
+        self.write("user", (last_usable_lba + 1) * sector, entries)
+        self.write("user", (totalsectors - 1) * sector,
+                   self.gpt_header(totalsectors - 1, 1, first_usable_lba, last_usable_lba, last_usable_lba + 1,
+                                   num_part_entries, part_entry_size, entries_crc))
+
+    def gpt_header(self, current_lba, backup_lba, first_usable_lba, last_usable_lba, part_entry_start_lba,
+                   num_part_entries, part_entry_size, entries_crc):
+        disk_guid = bytes.fromhex("4d544b53494d554c41544f5244495343")
+        header = bytearray(pack("<8sIIIIQQQQ16sQIII", b"EFI PART", 0x10000, 0x5C, 0, 0, current_lba, backup_lba,
+                                first_usable_lba, last_usable_lba, disk_guid, part_entry_start_lba,
+                                num_part_entries, part_entry_size, entries_crc))
+        header[0x10:0x14] = pack("<I", zlib.crc32(header))
+        return bytes(header).ljust(self.block_size, b"\x00")
+
+    def flush(self):
+        user = self.areas["user"]
+        if isinstance(user, mmap.mmap):
+            user.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.areas["user"].close()
+            self.file.close()
+            self.file = None
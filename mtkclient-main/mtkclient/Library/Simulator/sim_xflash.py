@@ -0,0 +1,197 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import logging
+from struct import pack, unpack
+from mtkclient.Library.DA.xflash.xflash_param import Cmd
+from mtkclient.Library.DA.xflash.extension.xflash import XCmd
+from mtkclient.Library.Simulator.sim_device import SimFramedDevice
+
+# storage, parttype of the read/write/format params to the simulated area
+emmc_parts = {1: "boot1", 2: "boot2", 3: "rpmb", 8: "user"}
+ufs_parts = {1: "boot1", 2: "boot2", 3: "user", 4: "rpmb"}
+
+
+class SimXFlash(SimFramedDevice):
+    """
+    Running xflash (v5) DA with the mtkclient patches, serving READ_DATA, WRITE_DATA, FORMAT,
+    the device info queries and the custom rpmb commands.
+    """
+    flashmode = "XFLASH"
+    # MT6750, no meid readout, so rpmb init doesn't need the sej
+    hwcode = 0x601
+    STATUS_OK = 0
+    STATUS_COMPLETE = 0x40040005
+    STATUS_UNSUPPORTED_CMD = 0xC0010003
+    STATUS_UNSUPPORTED_CTRL_CODE = 0xC0010004
+    STATUS_INVALID_PARAMETERS = 0xC0030007
+
+    def __init__(self, storage, latency=0.0, bandwidth=0, loglevel=logging.INFO, portconfig=None, devclass=-1,
+                 timeout=5.0, read_packet_length=0x100000, write_packet_length=0x100000):
+        self.read_packet_length = read_packet_length
+        self.write_packet_length = write_packet_length
+        super().__init__(storage, latency, bandwidth, loglevel, portconfig, devclass, timeout)
+
+    def send_status(self, status):
+        self.send_frame(pack("<I", status))
+
+    def area(self, storage, parttype):
+        if storage == 1 and self.storage.flashtype == "emmc":
+            return emmc_parts.get(parttype)
+        elif storage == 0x30 and self.storage.flashtype == "ufs":
+            return ufs_parts.get(parttype)
+        return None
+
+    def run(self):
+        commands = {
+            Cmd.READ_DATA: self.read_data,
+            Cmd.WRITE_DATA: self.write_data,
+            Cmd.FORMAT: self.format,
+            Cmd.DEVICE_CTRL: self.device_ctrl
+        }
+        while True:
+            cmd = yield from self.recv_dword()
+            handler = commands.get(cmd)
+            if handler is None:
+                self.send_status(self.STATUS_UNSUPPORTED_CMD)
+                continue
+            yield from handler()
+
+    def recv_param(self):
+        """
+        Returns area, addr and length of a read/write/format param, area is None if the range is invalid.
+        """
+        param = yield from self.recv_frame()
+        storage, parttype, addr, length = unpack("<IIQQ", param[:24])
+        area = self.area(storage, parttype)
+        if area is not None and not self.storage.valid(area, addr, length):
+            area = None
+        return area, addr, length
+
+    def read_data(self):
+        self.send_status(self.STATUS_OK)
+        area, addr, length = yield from self.recv_param()
+        # the param is taken, the host then waits for the status of the read itself
+        self.send_status(self.STATUS_OK)
+        if area is None:
+            self.send_status(self.STATUS_INVALID_PARAMETERS)
+            return
+        self.send_status(self.STATUS_OK)
+        pos = 0
+        while pos < length:
+            size = min(self.read_packet_length, length - pos)
+            self.send_frame(self.storage.read(area, addr + pos, size))
+            yield from self.recv_frame()
+            self.send_status(self.STATUS_OK)
+            pos += size
+
+    def write_data(self):
+        self.send_status(self.STATUS_OK)
+        area, addr, length = yield from self.recv_param()
+        if area is None:
+            self.send_status(self.STATUS_INVALID_PARAMETERS)
+            return
+        self.send_status(self.STATUS_OK)
+        pos = 0
+        while pos < length:
+            # zero, checksum, data
+            yield from self.recv_frame()
+            yield from self.recv_frame()
+            data = yield from self.recv_frame()
+            data = data[:length - pos]
+            self.storage.write(area, addr + pos, data)
+            pos += len(data)
+            self.send_status(self.STATUS_OK)
+        self.send_status(self.STATUS_OK)
+
+    def format(self):
+        self.send_status(self.STATUS_OK)
+        area, addr, length = yield from self.recv_param()
+        if area is None:
+            self.send_status(self.STATUS_INVALID_PARAMETERS)
+            return
+        self.send_status(self.STATUS_OK)
+        self.storage.erase(area, addr, length)
+        self.send_status(self.STATUS_COMPLETE)
+
+    def device_ctrl(self):
+        self.send_status(self.STATUS_OK)
+        cmd = yield from self.recv_dword()
+        custom = {
+            XCmd.CUSTOM_RPMB_READ: self.rpmb_read,
+            XCmd.CUSTOM_RPMB_WRITE: self.rpmb_write
+        }
+        if cmd == XCmd.CUSTOM_RPMB_INIT:
+            self.send_status(self.STATUS_OK)
+            self.rpmb_init()
+            return
+        elif cmd in custom:
+            self.send_status(self.STATUS_OK)
+            yield from custom[cmd]()
+            return
+        data = self.device_info(cmd)
+        if data is None:
+            self.send_status(self.STATUS_UNSUPPORTED_CTRL_CODE)
+            return
+        self.send_status(self.STATUS_OK)
+        self.send_frame(data)
+        self.send_status(self.STATUS_OK)
+
+    def device_info(self, cmd):
+        storage = self.storage
+        if cmd == Cmd.GET_PACKET_LENGTH:
+            return pack("<II", self.write_packet_length, self.read_packet_length)
+        elif cmd == Cmd.GET_RAM_INFO:
+            # sram type, base, size, dram type, base, size
+            return pack("<IIIIII", 0, 0x100000, 0x40000, 1, 0x40000000, 0x80000000)
+        elif cmd == Cmd.GET_EMMC_INFO and storage.flashtype == "emmc":
+            boot_size = storage.size("boot1")
+            return (pack("<II", 1, storage.block_size) +
+                    pack("<QQQQQQQQ", boot_size, storage.size("boot2"), storage.size("rpmb"), 0, 0, 0, 0,
+                         storage.size("user")) +
+                    bytes.fromhex("1501004d544b53494d0112345678a800") + pack("<Q", 1))
+        elif cmd == Cmd.GET_UFS_INFO and storage.flashtype == "ufs":
+            # lu2 is boot2, lu1 boot1, lu0 user, followed by cid, fw version and serial
+            buf = b"\xceMTKSIM".ljust(16, b"\x00") + bytes(6) + b"0100" + bytes(4) + b"4D544B53494D"
+            return (pack("<IIQQQ", 1, storage.block_size, storage.size("boot2"), storage.size("boot1"),
+                         storage.size("user")) + buf)
+        elif cmd == Cmd.GET_CHIP_ID:
+            return pack("<HHHHH", self.hwcode, 0x8A00, 0xCA00, 0, 0)
+        elif cmd == Cmd.GET_DA_VERSION:
+            return b"MTKSIM-1.0"
+        elif cmd == Cmd.GET_RANDOM_ID:
+            return self.socid[:16]
+        elif cmd == Cmd.GET_USB_SPEED:
+            return b"high-speed"
+        return None
+
+    def rpmb_init(self):
+        self.send_status(self.STATUS_OK)
+        self.send_frame(self.meid + self.meid)
+        self.send_status(self.STATUS_OK)
+
+    def rpmb_sectors(self):
+        sector = yield from self.recv_dword()
+        sectors = yield from self.recv_dword()
+        return sector, sectors
+
+    def rpmb_read(self):
+        sector, sectors = yield from self.rpmb_sectors()
+        for i in range(sectors):
+            data = self.storage.read("rpmb", (sector + i) * 0x100, 0x100)
+            if data is None:
+                # Address failure, the host gives up without reading the status
+                self.send_frame(pack("<H", 4))
+                return
+            self.send_frame(data)
+        self.send_status(self.STATUS_OK)
+
+    def rpmb_write(self):
+        sector, sectors = yield from self.rpmb_sectors()
+        for i in range(sectors):
+            data = yield from self.recv_frame()
+            if not self.storage.write("rpmb", (sector + i) * 0x100, data):
+                self.send_frame(pack("<H", 4))
+                break
+            self.send_frame(pack("<H", 0))
+        self.send_status(self.STATUS_OK)
@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import logging
+from struct import pack
+from mtkclient.Library.DA.xml.xml_lib import get_field
+from mtkclient.Library.Simulator.sim_device import SimFramedDevice
+
+# partition argument of READ-FLASH, WRITE-FLASH and ERASE-FLASH to the simulated area
+emmc_parts = {"EMMC-USER": "user", "EMMC-BOOT1": "boot1", "EMMC-BOOT2": "boot2", "EMMC-RPMB": "rpmb"}
+ufs_parts = {"UFS-LUA2": "user", "UFS-LUA0": "boot1", "UFS-LUA1": "boot2", "UFS-LUA3": "rpmb"}
+
+
+class SimXml(SimFramedDevice):
+    """
+    Running xml (v6) DA with the mtkclient extension, serving GET-HW-INFO, READ-FLASH, WRITE-FLASH,
+    ERASE-FLASH and the custom rpmb commands.
+    """
+    flashmode = "XML"
+    # MT6886, no meid readout, so rpmb init doesn't need the sej
+    hwcode = 0x1229
+    RPMB_ADDRESS_FAILURE = 4
+
+    def __init__(self, storage, latency=0.0, bandwidth=0, loglevel=logging.INFO, portconfig=None, devclass=-1,
+                 timeout=5.0, packet_length=0x100000):
+        self.packet_length = packet_length
+        super().__init__(storage, latency, bandwidth, loglevel, portconfig, devclass, timeout)
+
+    def send_text(self, text):
+        self.send_frame(bytes(text, 'utf-8') + b"\x00")
+
+    def recv_text(self):
+        data = yield from self.recv_frame()
+        return bytes(data).rstrip(b"\x00").decode('utf-8', errors='replace')
+
+    def send_cmd(self, cmd, content=""):
+        self.send_text("<?xml version=\"1.0\" encoding=\"utf-8\"?><host><version>1.0</version>" +
+                       f"<command>CMD:{cmd}</command>{content}</host>")
+
+    def finish(self, result="OK"):
+        self.send_cmd("END", f"<result>{result}</result>")
+        yield from self.recv_frame()
+        self.send_cmd("START")
+        yield from self.recv_frame()
+
+    def area(self, partition):
+        if self.storage.flashtype == "ufs":
+            return ufs_parts.get(partition)
+        return emmc_parts.get(partition)
+
+    def run(self):
+        rpmb = {
+            "INIT": self.rpmb_init,
+            "R": self.rpmb_read,
+            "W": self.rpmb_write,
+            "RM": self.rpmb_read_multi,
+            "WM": self.rpmb_write_multi
+        }
+        commands = {
+            "CMD:GET-HW-INFO": self.get_hw_info,
+            "CMD:READ-FLASH": self.read_flash,
+            "CMD:WRITE-FLASH": self.write_flash,
+            "CMD:ERASE-FLASH": self.erase_flash,
+            "CMD:CUSTOMRPMBKEY": self.rpmb_key,
+            "CMD:CUSTOMMMCINIT": rpmb["INIT"],
+            "CMD:CUSTOMUFSINIT": rpmb["INIT"]
+        }
+        for suffix in ["R", "W", "RM", "WM"]:
+            commands[f"CMD:CUSTOMRPMB{suffix}"] = rpmb[suffix]
+            commands[f"CMD:CUSTOMURPMB{suffix}"] = rpmb[suffix]
+        while True:
+            data = yield from self.recv_text()
+            handler = commands.get(get_field(data, "command"))
+            if handler is None:
+                self.send_text("ERR!UNSUPPORTED")
+                yield from self.finish()
+                continue
+            self.send_text("OK")
+            yield from handler(data)
+
+    def upload_file(self, data, info, packet_length):
+        """
+        Sends data to the host, the UPLOAD-FILE handshake followed by packet_length chunks.
+        """
+        self.send_cmd("UPLOAD-FILE", f"<arg><checksum>CHK_NO</checksum><info>{info}</info>" +
+                      f"<target_file>ROM_0</target_file><packet_length>{hex(packet_length)}</packet_length></arg>")
+        yield from self.recv_frame()
+        self.send_text(f"OK@{hex(len(data))}")
+        yield from self.recv_frame()
+        self.send_text("OK")
+        yield from self.recv_frame()
+        for pos in range(0, len(data), packet_length):
+            if pos:
+                self.send_text("OK")
+                yield from self.recv_frame()
+            self.send_frame(data[pos:pos + packet_length])
+            yield from self.recv_frame()
+
+    def hw_info(self):
+        storage = self.storage
+        if storage.flashtype == "ufs":
+            info = ("<storage>UFS</storage><ufs>" +
+                    f"<block_size>{hex(storage.block_size)}</block_size>" +
+                    f"<lua0_size>{hex(storage.size('boot1'))}</lua0_size>" +
+                    f"<lua1_size>{hex(storage.size('boot2'))}</lua1_size>" +
+                    f"<lua2_size>{hex(storage.size('user'))}</lua2_size>" +
+                    f"<lua3_size>{hex(storage.size('rpmb'))}</lua3_size>" +
+                    "<id>4D544B53494D554C41544F5255465330</id></ufs>")
+        else:
+            info = ("<storage>EMMC</storage><emmc>" +
+                    f"<block_size>{hex(storage.block_size)}</block_size>" +
+                    f"<boot1_size>{hex(storage.size('boot1'))}</boot1_size>" +
+                    f"<boot2_size>{hex(storage.size('boot2'))}</boot2_size>" +
+                    f"<rpmb_size>{hex(storage.size('rpmb'))}</rpmb_size>" +
+                    "<gp1_size>0x0</gp1_size><gp2_size>0x0</gp2_size>" +
+                    "<gp3_size>0x0</gp3_size><gp4_size>0x0</gp4_size>" +
+                    f"<user_size>{hex(storage.size('user'))}</user_size>" +
+                    "<id>1501004D544B53494D0112345678A800</id></emmc>")
+        return ("<?xml version=\"1.0\" encoding=\"utf-8\"?><da_hw_info><version>1.2</version>" +
+                "<ram_size>0x80000000</ram_size><battery_voltage>3810</battery_voltage>" +
+                f"<random_id>{self.socid[:16].hex()}</random_id>{info}<product_id></product_id></da_hw_info>")
+
+    def get_hw_info(self, data):
+        info = bytes(self.hw_info(), 'utf-8')
+        # the host reads the hw info without acking each chunk, so it has to fit into one
+        yield from self.upload_file(info, "HW-INFO", len(info))
+        yield from self.finish()
+
+    def read_flash(self, data):
+        area = self.area(get_field(data, "partition"))
+        offset = int(get_field(data, "offset"), 16)
+        length = int(get_field(data, "length"), 16)
+        view = self.storage.read(area, offset, length)
+        if view is None:
+            yield from self.finish("ERR!INVALID-RANGE")
+            return
+        yield from self.upload_file(view, get_field(data, "partition"), self.packet_length)
+        yield from self.finish()
+
+    def write_flash(self, data):
+        area = self.area(get_field(data, "partition"))
+        offset = int(get_field(data, "offset"), 16)
+        source_file = get_field(data, "source_file")
+        self.send_cmd("FILE-SYS-OPERATION", f"<arg><key>FILE-SIZE</key><file_path>{source_file}</file_path></arg>")
+        yield from self.recv_frame()
+        # OK@<file size>
+        size = yield from self.recv_text()
+        length = int(size.split("@")[1], 16)
+        if not self.storage.valid(area, offset, length):
+            yield from self.finish("ERR!INVALID-RANGE")
+            return
+        self.send_cmd("DOWNLOAD-FILE", f"<arg><checksum>CHK_NO</checksum><info>{get_field(data, 'partition')}</info>" +
+                      f"<source_file>{source_file}</source_file>" +
+                      f"<packet_length>{hex(self.packet_length)}</packet_length></arg>")
+        yield from self.recv_frame()
+        yield from self.recv_text()
+        self.send_text("OK")
+        pos = 0
+        while True:
+            # OK@0x0 before each chunk, a plain OK once the host is done
+            text = yield from self.recv_text()
+            if text == "OK":
+                break
+            self.send_text("OK")
+            chunk = yield from self.recv_frame()
+            if not self.storage.write(area, offset + pos, chunk):
+                self.send_text("ERR!INVALID-RANGE")
+                return
+            pos += len(chunk)
+            self.send_text("OK")
+        yield from self.finish()
+
+    def erase_flash(self, data):
+        area = self.area(get_field(data, "partition"))
+        offset = int(get_field(data, "offset"), 16)
+        length = int(get_field(data, "length"), 16)
+        if not self.storage.erase(area, offset, length):
+            yield from self.finish("ERR!INVALID-RANGE")
+            return
+        yield from self.finish()
+
+    def rpmb_key(self, data):
+        key = yield from self.recv_frame()
+        self.send_frame(key)
+        yield from self.finish()
+
+    def rpmb_init(self, data):
+        self.send_frame(self.meid + self.meid)
+        yield from self.finish()
+
+    def rpmb_frame(self, sector):
+        frame = self.storage.read("rpmb", sector * 0x100, 0x100)
+        if frame is None:
+            self.send_frame(pack("<H", self.RPMB_ADDRESS_FAILURE))
+            return False
+        self.send_frame(pack("<H", 0))
+        self.send_frame(frame)
+        return True
+
+    def rpmb_read(self, data):
+        sector = yield from self.recv_dword()
+        self.rpmb_frame(sector)
+        yield from self.finish()
+
+    def rpmb_write(self, data):
+        sector = yield from self.recv_dword()
+        frame = yield from self.recv_frame()
+        res = 0 if self.storage.write("rpmb", sector * 0x100, frame) else self.RPMB_ADDRESS_FAILURE
+        self.send_frame(pack("<H", res))
+        yield from self.finish()
+
+    def rpmb_read_multi(self, data):
+        sector = yield from self.recv_dword()
+        count = yield from self.recv_dword()
+        for pos in range(count):
+            if not self.rpmb_frame(sector + pos):
+                break
+        yield from self.finish()
+
+    def rpmb_write_multi(self, data):
+        sector = yield from self.recv_dword()
+        count = yield from self.recv_dword()
+        for pos in range(count):
+            frame = yield from self.recv_frame()
+            if not self.storage.write("rpmb", (sector + pos) * 0x100, frame):
+                self.send_frame(pack("<H", self.RPMB_ADDRESS_FAILURE))
+                break
+            self.send_frame(pack("<H", 0))
+        yield from self.finish()
@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# adler32 keeps the byte sum modulo 65521, so it is exact as long as 1 + 255 * chunk < 65521
+ADLER_CHUNK = 256
+
+
+def byte_sum(data) -> int:
+    """ Sum of all bytes in data """
+    if np is not None:
+        return int(np.frombuffer(data, dtype=np.uint8).sum(dtype=np.uint64))
+    view = memoryview(data).cast("B")
+    length = len(view)
+    if length < 4 * ADLER_CHUNK:
+        return sum(view)
+    adler32 = zlib.adler32
+    total = 0
+    for pos in range(0, length, ADLER_CHUNK):
+        total += adler32(view[pos:pos + ADLER_CHUNK]) & 0xFFFF
+    # every chunk started with A=1
+    return total - (length + ADLER_CHUNK - 1) // ADLER_CHUNK
+
+
+def sum16(data, chs=0) -> int:
+    """ 16-bit byte sum as used by the legacy and xflash DA write commands """
+    return (byte_sum(data) + chs) & 0xFFFF
+
+
+def xor16(data) -> int:
+    """ XOR of all little endian 16-bit words, data has to be of even length """
+    view = memoryview(data).cast("B")
+    length = len(view) & ~1
+    if np is not None:
+        return int(np.bitwise_xor.reduce(np.frombuffer(view[:length], dtype="<u2"), initial=0))
+    # Fold the buffer onto itself as one big integer, halving it until a single word is left
+    value = int.from_bytes(view[:length], "little")
+    width = length * 8
+    while width > 16:
+        half = ((width // 2) + 15) // 16 * 16
+        value = (value & ((1 << half) - 1)) ^ (value >> half)
+        width = half
+    return value
+
+
+def sum32(data) -> int:
+    """ Sum of all little endian 32-bit words, truncated to 32 bit """
+    view = memoryview(data).cast("B")
+    length = len(view) & ~3
+    if np is not None:
+        words = np.frombuffer(view[:length], dtype="<u4")
+        return int(words.sum(dtype=np.uint64)) & 0xFFFFFFFF
+    # Sum the four byte lanes of the words separately, stepped slicing of bytes is done in C
+    data = view[:length].tobytes()
+    return sum(byte_sum(data[lane::4]) << (8 * lane) for lane in range(4)) & 0xFFFFFFFF
@@ -8,6 +8,7 @@ from Cryptodome.Util import Counter
 from Cryptodome.Hash import CMAC
 from Cryptodome.Util.number import long_to_bytes, bytes_to_long
 from binascii import hexlify
+from struct import unpack
 import hmac
 
 
@@ -125,9 +126,48 @@ class CryptUtils:
             decrypted = my_gcm.decrypt(init_value, ciphertext, auth_tag)
             """
 
-            def __init__(self, master_key):
+            # GHASH tables per auth key, shared by all instances using the same key
+            table_cache = {}
+            table_cache_size = 16
+
+            def __init__(self, master_key, native=None):
+                # native: use the GCM mode of the crypto library, None = use it if available
+                if native is None:
+                    native = hasattr(AES, "MODE_GCM")
+                self.native = native
                 self.change_key(master_key)
 
+            @staticmethod
+            def ghash_tables(auth_key):
+                """
+                Returns 16 tables of 256 entries, table[k][b] = b * H for byte b at big endian position k.
+                Multiplication by H is linear, so each table is built from the 8 single bit products.
+                """
+                tables = CryptUtils.Aes.AesGcm.table_cache.get(auth_key)
+                if tables is not None:
+                    return tables
+                # powers[i] = H * x^i, x^i being bit i counted from the MSB
+                powers = []
+                val = auth_key
+                for _ in range(128):
+                    powers.append(val)
+                    val = (val >> 1) ^ ((val & 1) * 0xE1000000000000000000000000000000)
+                tables = []
+                for k in range(16):
+                    row = [0] * 256
+                    for bit in range(8):
+                        step = 1 << bit
+                        power = powers[8 * k + 7 - bit]
+                        for j in range(step):
+                            row[step + j] = row[j] ^ power
+                    tables.append(tuple(row))
+                tables = tuple(tables)
+                cache = CryptUtils.Aes.AesGcm.table_cache
+                if len(cache) >= CryptUtils.Aes.AesGcm.table_cache_size:
+                    cache.pop(next(iter(cache)))
+                cache[auth_key] = tables
+                return tables
+
             def change_key(self, master_key):
                 if master_key >= (1 << 128):
                     raise InvalidInputException('Master key should be 128-bit')
@@ -135,50 +175,54 @@ class CryptUtils:
                 self.__master_key = long_to_bytes(master_key, 16)
                 self.__aes_ecb = AES.new(self.__master_key, AES.MODE_ECB)
                 self.__auth_key = bytes_to_long(self.__aes_ecb.encrypt(b'\x00' * 16))
-
-                # precompute the table for multiplication in finite field
-                table = []  # for 8-bit
-                for i in range(16):
-                    row = []
-                    for j in range(256):
-                        row.append(self.gf_2_128_mul(self.__auth_key, j << (8 * i)))
-                    table.append(tuple(row))
-                self.__pre_table = tuple(table)
+                # tables for the pure python GHASH are built on first use
+                self.__pre_table = None
 
                 self.prev_init_value = None  # reset
 
             def __times_auth_key(self, val):
-                res = 0
-                for i in range(16):
-                    res ^= self.__pre_table[i][val & 0xFF]
-                    val >>= 8
-                return res
+                t = self.__pre_table
+                b = val.to_bytes(16, 'big')
+                return (t[0][b[0]] ^ t[1][b[1]] ^ t[2][b[2]] ^ t[3][b[3]] ^
+                        t[4][b[4]] ^ t[5][b[5]] ^ t[6][b[6]] ^ t[7][b[7]] ^
+                        t[8][b[8]] ^ t[9][b[9]] ^ t[10][b[10]] ^ t[11][b[11]] ^
+                        t[12][b[12]] ^ t[13][b[13]] ^ t[14][b[14]] ^ t[15][b[15]])
 
             def __ghash(self, aad, txt):
+                if self.__pre_table is None:
+                    self.__pre_table = self.ghash_tables(self.__auth_key)
                 len_aad = len(aad)
                 len_txt = len(txt)
 
                 # padding
-                if 0 == len_aad % 16:
-                    data = aad
-                else:
-                    data = aad + b'\x00' * (16 - len_aad % 16)
-                if 0 == len_txt % 16:
-                    data += txt
-                else:
-                    data += txt + b'\x00' * (16 - len_txt % 16)
+                data = bytes(aad) + b'\x00' * (-len_aad % 16) + bytes(txt) + b'\x00' * (-len_txt % 16)
 
+                t = self.__pre_table
                 tag = 0
-                assert len(data) % 16 == 0
-                for i in range(len(data) // 16):
-                    tag ^= bytes_to_long(data[i * 16: (i + 1) * 16])
-                    tag = self.__times_auth_key(tag)
-                    # print 'X\t', hex(tag)
+                # unpack all blocks at once, each 16 byte block is a (high, low) pair of 64-bit words
+                words = unpack(f">{len(data) // 8}Q", data)
+                for i in range(0, len(words), 2):
+                    tag ^= (words[i] << 64) | words[i + 1]
+                    b = tag.to_bytes(16, 'big')
+                    tag = (t[0][b[0]] ^ t[1][b[1]] ^ t[2][b[2]] ^ t[3][b[3]] ^
+                           t[4][b[4]] ^ t[5][b[5]] ^ t[6][b[6]] ^ t[7][b[7]] ^
+                           t[8][b[8]] ^ t[9][b[9]] ^ t[10][b[10]] ^ t[11][b[11]] ^
+                           t[12][b[12]] ^ t[13][b[13]] ^ t[14][b[14]] ^ t[15][b[15]])
                 tag ^= ((8 * len_aad) << 64) | (8 * len_txt)
                 tag = self.__times_auth_key(tag)
 
                 return tag
 
+            def __ctr(self, init_value, data):
+                if len(data) == 0:
+                    return b''
+                counter = Counter.new(
+                    nbits=32,
+                    prefix=long_to_bytes(init_value, 12),
+                    initial_value=2,  # notice this
+                    allow_wraparound=True)
+                return AES.new(self.__master_key, AES.MODE_CTR, counter=counter).encrypt(data)
+
             def encrypt(self, init_value, plaintext, auth_data=b''):
                 if init_value >= (1 << 96):
                     raise InvalidInputException('IV should be 96-bit')
@@ -187,27 +231,13 @@ class CryptUtils:
                     raise InvalidInputException('IV must not be reused!')
                 self.prev_init_value = init_value
 
-                len_plaintext = len(plaintext)
-                # len_auth_data = len(auth_data)
-
-                if len_plaintext > 0:
-                    counter = Counter.new(
-                        nbits=32,
-                        prefix=long_to_bytes(init_value, 12),
-                        initial_value=2,  # notice this
-                        allow_wraparound=False)
-                    aes_ctr = AES.new(self.__master_key, AES.MODE_CTR, counter=counter)
-
-                    if 0 != len_plaintext % 16:
-                        padded_plaintext = plaintext + \
-                                           b'\x00' * (16 - len_plaintext % 16)
-                    else:
-                        padded_plaintext = plaintext
-                    ciphertext = aes_ctr.encrypt(padded_plaintext)[:len_plaintext]
-
-                else:
-                    ciphertext = b''
+                if self.native:
+                    cipher = AES.new(self.__master_key, AES.MODE_GCM, nonce=long_to_bytes(init_value, 12))
+                    cipher.update(auth_data)
+                    ciphertext, auth_tag = cipher.encrypt_and_digest(plaintext)
+                    return ciphertext, bytes_to_long(auth_tag)
 
+                ciphertext = self.__ctr(init_value, plaintext)
                 auth_tag = self.__ghash(auth_data, ciphertext)
                 # print 'GHASH\t', hex(auth_tag)
                 auth_tag ^= bytes_to_long(self.__aes_ecb.encrypt(
@@ -223,31 +253,20 @@ class CryptUtils:
                 # if auth_tag >= (1 << 128):
                 #    raise InvalidInputException('Tag should be 128-bit')
 
+                if self.native:
+                    cipher = AES.new(self.__master_key, AES.MODE_GCM, nonce=long_to_bytes(init_value, 12))
+                    cipher.update(auth_data)
+                    try:
+                        return cipher.decrypt_and_verify(ciphertext, long_to_bytes(auth_tag, 16))
+                    except ValueError:
+                        raise InvalidTagException
+
                 if auth_tag != self.__ghash(auth_data, ciphertext) ^ \
                         bytes_to_long(self.__aes_ecb.encrypt(
                             long_to_bytes((init_value << 32) | 1, 16))):
                     raise InvalidTagException
 
-                len_ciphertext = len(ciphertext)
-                if len_ciphertext > 0:
-                    counter = Counter.new(
-                        nbits=32,
-                        prefix=long_to_bytes(init_value, 12),
-                        initial_value=2,
-                        allow_wraparound=True)
-                    aes_ctr = AES.new(self.__master_key, AES.MODE_CTR, counter=counter)
-
-                    if 0 != len_ciphertext % 16:
-                        padded_ciphertext = ciphertext + \
-                                            b'\x00' * (16 - len_ciphertext % 16)
-                    else:
-                        padded_ciphertext = ciphertext
-                    plaintext = aes_ctr.decrypt(padded_ciphertext)[:len_ciphertext]
-
-                else:
-                    plaintext = b''
-
-                return plaintext
+                return self.__ctr(init_value, ciphertext)
 
         @staticmethod
         def aes_gcm(indata, nounce, aes_key, hdr, tag_auth, decrypt=True):
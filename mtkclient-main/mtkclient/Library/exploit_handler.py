@@ -5,6 +5,7 @@ import logging
 import time
 from struct import pack, unpack
 
+from mtkclient.Library.DA.daconfig import DAIndexEntry
 from mtkclient.Library.Hardware.hwcrypto import HwCrypto, CryptoSetup
 from mtkclient.Library.utils import LogBase, logsetup
 from mtkclient.config.payloads import PathConfig
@@ -96,6 +97,8 @@ class Exploitation(metaclass=LogBase):
             payloadaddr = 0x200000
             if self.chipconfig.dacode in self.mtk.daloader.daconfig.dasetup:
                 entry = self.mtk.daloader.daconfig.dasetup[self.chipconfig.dacode][0]
+                if isinstance(entry, DAIndexEntry):
+                    entry = entry.load()
                 payloadaddr = entry.region[1].m_start_addr
             payload = self.fix_payload(payload, True)
             if self.mtk.preloader.send_da(payloadaddr, len(payload) - 0x100, 0x100, payload):
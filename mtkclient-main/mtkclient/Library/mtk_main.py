@@ -49,6 +49,20 @@ class ArgHandler(metaclass=LogBase):
         except AttributeError:
             pass
 
+        config.skipzero = False
+        try:
+            if args.skipzero is not None:
+                config.skipzero = args.skipzero
+        except AttributeError:
+            pass
+
+        config.verifyread = False
+        try:
+            if args.verifyread is not None:
+                config.verifyread = args.verifyread
+        except AttributeError:
+            pass
+
         config.reconnect = True
         try:
             if args.noreconnect is not None:
@@ -76,6 +90,16 @@ class ArgHandler(metaclass=LogBase):
                 config.loader = args.loader
         except AttributeError:
             pass
+        try:
+            if args.record is not None:
+                config.record = args.record
+        except AttributeError:
+            pass
+        try:
+            if args.replay is not None:
+                config.replay = args.replay
+        except AttributeError:
+            pass
         try:
             if args.da_address is not None:
                 config.chipconfig.da_payload_addr = getint(args.da_address)
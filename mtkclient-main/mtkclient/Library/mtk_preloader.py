@@ -3,7 +3,6 @@
 # (c) B.Kerler 2018-2024 GPLv3 License
 import os
 import logging
-import time
 from enum import Enum
 from struct import unpack, pack
 from binascii import hexlify
@@ -14,6 +13,7 @@ from mtkclient.Library.Auth.sla import generate_brom_sla_challenge
 from mtkclient.Library.settings import HwParam
 from mtkclient.Library.utils import LogBase, logsetup
 from mtkclient.Library.error import ErrorHandler
+from mtkclient.Library.checksum import sum32, xor16
 from mtkclient.config.brom_config import DAmodes
 
 USBDL_BIT_EN = 0x00000001  # 1: download bit enabled
@@ -25,11 +25,8 @@ MISC_LOCK_KEY_MAGIC = 0xAD98
 
 
 def calc_xflash_checksum(data):
-    checksum = 0
-    pos = 0
-    for i in range(0, len(data) // 4):
-        checksum += unpack("<I", data[i * 4:(i * 4) + 4])[0]
-        pos += 4
+    checksum = sum32(data)
+    pos = len(data) & ~3
     if len(data) % 4 != 0:
         for i in range(4 - (len(data) % 4)):
             checksum += data[pos]
@@ -138,6 +135,7 @@ class Preloader(metaclass=LogBase):
         self.usbread = self.mtk.port.usbread
         self.usbwrite = self.mtk.port.usbwrite
         self.echo = self.mtk.port.echo
+        self.echo_bulk = self.mtk.port.echo_bulk
         self.sendcmd = self.mtk.port.mtk_cmd
 
     def init(self, maxtries=None, display=True):
@@ -305,9 +303,7 @@ class Preloader(metaclass=LogBase):
                     self.error(f"Error on da_write{length}, addr {hex(addr)}, {self.eh.status(status)}")
                     return False
                 if ack and status <= 3:
-                    for val in values:
-                        if not self.echo(pack(packfmt, val)):
-                            break
+                    self.echo_bulk(pack(f"{packfmt[0]}{len(values)}{packfmt[1]}", *values))
                     status2 = self.rword()
                     if status2 <= 0xFF:
                         return True
@@ -325,12 +321,15 @@ class Preloader(metaclass=LogBase):
     def write32(self, addr, dwords) -> bool:
         return self.write(addr, dwords, 32)
 
-    def writemem(self, addr, data):
-        for i in range(0, len(data), 4):
-            value = data[i:i + 4]
-            while len(value) < 4:
-                value += b"\x00"
-            self.write32(addr + i, unpack("<I", value))
+    def writemem(self, addr, data, maxdwords=0x400) -> bool:
+        """ Writes data with as few WRITE32 commands as possible, maxdwords values per command """
+        if len(data) % 4:
+            data = bytes(data) + b"\x00" * (4 - len(data) % 4)
+        dwords = unpack(f"<{len(data) // 4}I", data)
+        for pos in range(0, len(dwords), maxdwords):
+            if not self.write32(addr + pos * 4, dwords[pos:pos + maxdwords]):
+                return False
+        return True
 
     def reset_to_brom(self, en=True, timeout=0):
         usbdlreg = 0
@@ -638,17 +637,8 @@ class Preloader(metaclass=LogBase):
             self.config.set_gui_status(self.config.tr("Uploading data."))
             status = self.rword()
             if status < 0xFF:
-                bytestowrite = len(data)
-                pos = 0
-                while bytestowrite > 0:
-                    size = min(bytestowrite, 64)
-                    self.usbwrite(data[pos:pos + size])
-                    bytestowrite -= size
-                    pos += size
-                self.usbwrite(b"")
-                time.sleep(0.035)
-                crc = self.rword()
-                status = self.rword()
+                self.mtk.port.send_payload(data)
+                crc, status = unpack(">HH", self.mtk.port.read_response(4).ljust(4, b"\xFF"))
                 if 0x0 <= status <= 0xFF:
                     return True
             if status == 0x1D0C:
@@ -825,25 +815,17 @@ class Preloader(metaclass=LogBase):
         data = (data[:maxsize] + sigdata)
         if len(data + sigdata) % 2 != 0:
             data += b"\x00"
-        for x in range(0, len(data), 2):
-            gen_chksum ^= unpack("<H", data[x:x + 2])[0]  # 3CDC
+        gen_chksum ^= xor16(data)  # 3CDC
         if len(data) & 1 != 0:
-            gen_chksum ^= data[-1:]
+            gen_chksum ^= data[-1]
         return gen_chksum, data
 
     def upload_data(self, data, gen_chksum):
         self.config.set_gui_status(self.config.tr("Uploading data."))
-        bytestowrite = len(data)
-        pos = 0
-        while bytestowrite > 0:
-            _sz = min(bytestowrite, 64)
-            self.usbwrite(data[pos:pos + _sz])
-            bytestowrite -= _sz
-            pos += _sz
-        self.usbwrite(b"")
-        time.sleep(0.035)
+        self.mtk.port.send_payload(data)
         try:
-            res = self.rword(2)
+            res = self.mtk.port.read_response(4)
+            res = list(unpack(">HH", res)) if len(res) == 4 else []
             if isinstance(res, list) and res == []:
                 self.error("No reply from da loader.")
                 return False
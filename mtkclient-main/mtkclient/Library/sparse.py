@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+import os
+from struct import unpack
+
+SPARSE_HEADER_MAGIC = 0xED26FF3A
+CHUNK_TYPE_RAW = 0xCAC1
+CHUNK_TYPE_FILL = 0xCAC2
+CHUNK_TYPE_DONT_CARE = 0xCAC3
+CHUNK_TYPE_CRC32 = 0xCAC4
+
+
+class SparseChunk:
+    def __init__(self, chunktype, offset, length, file_offset=0, fill=b""):
+        self.type = chunktype
+        # Byte offset and size of the chunk in the expanded image
+        self.offset = offset
+        self.length = length
+        # Position of the raw data in the sparse file
+        self.file_offset = file_offset
+        self.fill = fill
+
+
+class SparseImage:
+    def __init__(self, filename):
+        self.filename = filename
+        self.blk_sz = 0
+        self.total_blks = 0
+        self.total_chunks = 0
+        self.chunks = []
+        with open(filename, "rb") as rf:
+            self.parse(rf)
+
+    @staticmethod
+    def is_sparse(filename):
+        if filename is None or filename == "" or not os.path.exists(filename):
+            return False
+        with open(filename, "rb") as rf:
+            data = rf.read(4)
+        return len(data) == 4 and unpack("<I", data)[0] == SPARSE_HEADER_MAGIC
+
+    @property
+    def size(self):
+        return self.blk_sz * self.total_blks
+
+    def parse(self, rf):
+        header = rf.read(28)
+        if len(header) < 28:
+            raise ValueError("Sparse header truncated")
+        (magic, major_version, minor_version, file_hdr_sz, chunk_hdr_sz, self.blk_sz, self.total_blks,
+         self.total_chunks, image_checksum) = unpack("<IHHHHIIII", header)
+        if magic != SPARSE_HEADER_MAGIC or major_version != 1:
+            raise ValueError("Not a supported sparse image")
+        rf.seek(file_hdr_sz)
+        pos = 0
+        for _ in range(self.total_chunks):
+            chunkheader = rf.read(chunk_hdr_sz)
+            if len(chunkheader) < 12:
+                raise ValueError("Sparse chunk header truncated")
+            chunktype, reserved, chunk_sz, total_sz = unpack("<HHII", chunkheader[:12])
+            datalen = total_sz - chunk_hdr_sz
+            length = chunk_sz * self.blk_sz
+            if chunktype == CHUNK_TYPE_RAW:
+                if datalen != length:
+                    raise ValueError(f"Invalid raw chunk at block {pos // self.blk_sz}")
+                self.chunks.append(SparseChunk(chunktype, pos, length, file_offset=rf.tell()))
+                rf.seek(datalen, 1)
+            elif chunktype == CHUNK_TYPE_FILL:
+                self.chunks.append(SparseChunk(chunktype, pos, length, fill=rf.read(4)))
+                rf.seek(datalen - 4, 1)
+            elif chunktype == CHUNK_TYPE_DONT_CARE:
+                self.chunks.append(SparseChunk(chunktype, pos, length))
+            elif chunktype == CHUNK_TYPE_CRC32:
+                rf.seek(datalen, 1)
+                continue
+            else:
+                raise ValueError(f"Unknown sparse chunk type {hex(chunktype)}")
+            pos += length
+
+
+def find_zero_runs(filename, offset, length, blocksize=0x100000):
+    """
+    Splits a raw image into (pos, length, is_zero) ranges in blocksize steps, so that empty areas
+    can be erased instead of written.
+    """
+    ranges = []
+    zero = bytes(blocksize)
+    with open(filename, "rb") as rf:
+        rf.seek(offset)
+        pos = 0
+        while pos < length:
+            data = rf.read(min(blocksize, length - pos))
+            if not data:
+                break
+            is_zero = data == zero[:len(data)]
+            if ranges and ranges[-1][2] == is_zero:
+                ranges[-1][1] += len(data)
+            else:
+                ranges.append([pos, len(data), is_zero])
+            pos += len(data)
+    return [(pos, size, is_zero) for pos, size, is_zero in ranges]
+
+
+def write_sparse(writeflash, formatflash, progress, addr, length, filename, parttype=None,
+                 skipzero=False, display=True):
+    """
+    Writes an android sparse image: raw chunks are streamed from the sparse file, fill chunks are
+    expanded and don't care chunks are skipped. With skipzero, zero filled chunks are erased.
+    """
+    image = SparseImage(filename)
+    if image.size > length:
+        raise ValueError(f"Sparse image expands to {hex(image.size)} bytes, but target is only {hex(length)} bytes")
+    total = sum(chunk.length for chunk in image.chunks if chunk.type != CHUNK_TYPE_DONT_CARE)
+    written = 0
+    progress.show_progress("Write", 0, total, display)
+    for chunk in image.chunks:
+        if chunk.type == CHUNK_TYPE_DONT_CARE:
+            continue
+        if chunk.type == CHUNK_TYPE_RAW:
+            if not writeflash(addr=addr + chunk.offset, length=chunk.length, filename=filename,
+                              offset=chunk.file_offset, parttype=parttype, display=False):
+                return False
+        elif chunk.fill == b"\x00\x00\x00\x00" and skipzero:
+            if not formatflash(addr=addr + chunk.offset, length=chunk.length, parttype=parttype, display=False):
+                return False
+        else:
+            # Expand fill patterns in bounded pieces instead of building the whole chunk in memory
+            piece = min(chunk.length, 0x1000000)
+            data = chunk.fill * (piece // 4)
+            for pos in range(0, chunk.length, piece):
+                size = min(piece, chunk.length - pos)
+                if not writeflash(addr=addr + chunk.offset + pos, length=size, filename="",
+                                  parttype=parttype, wdata=data[:size], display=False):
+                    return False
+        written += chunk.length
+        progress.show_progress("Write", written, total, display)
+    return True
+
+
+def write_skipzero(writeflash, formatflash, progress, addr, length, filename, offset=0, parttype=None,
+                   display=True):
+    """
+    Writes a raw image, but erases runs of all zero blocks instead of sending them.
+    """
+    fsize = os.stat(filename).st_size - offset
+    length = min(length, fsize)
+    written = 0
+    progress.show_progress("Write", 0, length, display)
+    for pos, size, is_zero in find_zero_runs(filename, offset, length):
+        if is_zero and size % 0x200 == 0:
+            if not formatflash(addr=addr + pos, length=size, parttype=parttype, display=False):
+                return False
+        elif not writeflash(addr=addr + pos, length=size, filename=filename, offset=offset + pos,
+                            parttype=parttype, display=False):
+            return False
+        written += size
+        progress.show_progress("Write", written, length, display)
+    return True
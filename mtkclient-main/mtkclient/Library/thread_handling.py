@@ -1,10 +1,241 @@
-def writedata(filename, rq):
-    pos = 0
-    with open(filename, "wb") as wf:
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+# (c) B.Kerler 2018-2024 GPLv3 License
+from queue import Queue
+from threading import Thread
+
+
+class BufferRing:
+    """
+    Fixed set of preallocated buffers shared between the usb reader and the file writer.
+    The reader blocks on acquire() once all slots are waiting on disk, so memory stays flat.
+    """
+
+    def __init__(self, slotsize, slots=8):
+        self.slots = [bytearray(slotsize) for _ in range(slots)]
+        self.free = Queue(maxsize=slots)
+        self.filled = Queue(maxsize=slots + 1)
+        for idx in range(slots):
+            self.free.put(idx)
+        self.error = None
+
+    def acquire(self, length):
+        idx = self.free.get()
+        if len(self.slots[idx]) < length:
+            self.slots[idx] = bytearray(length)
+        return idx, memoryview(self.slots[idx])[:length]
+
+    def commit(self, idx, length):
+        self.filled.put((idx, length))
+
+    def put(self, data):
+        length = len(data)
+        idx, view = self.acquire(length)
+        view[:] = data
+        self.commit(idx, length)
+
+    def close(self):
+        self.filled.put(None)
+
+    def get(self):
+        item = self.filled.get()
+        if item is None:
+            return None
+        idx, length = item
+        return idx, memoryview(self.slots[idx])[:length]
+
+    def release(self, idx):
+        self.free.put(idx)
+
+    def abort(self):
+        # Unblock the producer side and throw away everything it already queued
+        if self.error is None:
+            self.error = "aborted"
+        while True:
+            item = self.filled.get()
+            if item is None:
+                break
+            self.release(item[0])
+
+
+class AsyncSender:
+    """
+    Performs usb writes from a helper thread, so a short ack can be queued on the out endpoint
+    while the caller is still draining the in endpoint.
+    """
+
+    def __init__(self, send, retries=3):
+        self.send = send
+        self.retries = retries
+        self.queue = Queue()
+        self.error = False
+        self.worker = Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def put(self, data):
+        self.queue.put(data)
+
+    def run(self):
         while True:
-            data = rq.get()
+            data = self.queue.get()
             if data is None:
                 break
-            pos += len(data)
-            wf.write(data)
-            rq.task_done()
+            if self.error:
+                continue
+            for _ in range(self.retries):
+                if self.send(data):
+                    break
+            else:
+                self.error = True
+
+    def close(self, timeout=60):
+        self.queue.put(None)
+        self.worker.join(timeout)
+
+
+class SplitWriter:
+    """
+    File-like target for writedata, which splits one contiguous read into several files.
+    targets is a list of (filename, offset, length) relative to the start of the read, the bytes
+    between and after the targets are discarded.
+    """
+
+    def __init__(self, targets):
+        self.targets = sorted(targets, key=lambda target: target[1])
+        self.index = 0
+        self.pos = 0
+        self.wf = None
+
+    def write(self, data):
+        view = memoryview(data).cast('B')
+        while self.index < len(self.targets):
+            filename, offset, length = self.targets[self.index]
+            if self.pos < offset:
+                skip = min(offset - self.pos, len(view))
+                if not skip:
+                    break
+                view = view[skip:]
+                self.pos += skip
+                continue
+            if self.wf is None:
+                self.wf = open(filename, "wb")
+            count = min(offset + length - self.pos, len(view))
+            self.wf.write(view[:count])
+            view = view[count:]
+            self.pos += count
+            if self.pos < offset + length:
+                break
+            self.wf.close()
+            self.wf = None
+            self.index += 1
+        self.pos += len(view)
+        return len(data)
+
+    @property
+    def complete(self) -> bool:
+        return self.index == len(self.targets)
+
+    def close(self):
+        if self.wf is not None:
+            self.wf.close()
+            self.wf = None
+
+    def __str__(self):
+        return ", ".join(target[0] for target in self.targets)
+
+
+def writedata(filename, ring, progress=None):
+    """
+    Writes the ring to filename, which can also be a file-like object (SplitWriter)
+    """
+    wf = None
+    pos = 0
+    try:
+        wf = filename if hasattr(filename, "write") else open(filename, "wb")
+    except OSError as err:
+        ring.error = err
+    while True:
+        item = ring.get()
+        if item is None:
+            break
+        idx, data = item
+        if ring.error is None:
+            try:
+                wf.write(data)
+            except OSError as err:
+                ring.error = err
+        pos += len(data)
+        ring.release(idx)
+        if progress is not None:
+            progress(pos)
+    if wf is not None:
+        wf.close()
+
+
+def readdata(fh, ring, length, packetsize):
+    pos = 0
+    while pos < length:
+        size = min(packetsize, length - pos)
+        idx, view = ring.acquire(size)
+        if ring.error is not None:
+            ring.release(idx)
+            break
+        rlen = 0
+        try:
+            while rlen < size:
+                count = fh.readinto(view[rlen:])
+                if not count:
+                    break
+                rlen += count
+        except OSError as err:
+            ring.error = err
+            ring.release(idx)
+            break
+        if rlen < size:
+            # Pad the image up to the requested (sector aligned) length
+            view[rlen:] = bytes(size - rlen)
+        ring.commit(idx, size)
+        pos += size
+    ring.close()
+
+
+def iter_chunks(data, length, packetsize, slots=4):
+    """
+    Yields length bytes from data in packetsize chunks without copying them.
+    data can be a bytes-like object, a file object (read ahead by a helper thread) or an
+    iterable of bytes-like chunks.
+    """
+    if hasattr(data, "readinto"):
+        ring = BufferRing(packetsize, slots)
+        reader = Thread(target=readdata, args=(data, ring, length, packetsize), daemon=True)
+        reader.start()
+        item = None
+        idx = None
+        try:
+            while True:
+                item = ring.get()
+                if item is None:
+                    break
+                idx, view = item
+                yield view
+                ring.release(idx)
+                idx = None
+        finally:
+            if idx is not None:
+                ring.release(idx)
+            if item is not None:
+                ring.abort()
+            reader.join(60)
+    elif isinstance(data, (bytes, bytearray, memoryview)):
+        view = memoryview(data)
+        for pos in range(0, length, packetsize):
+            yield view[pos:pos + packetsize]
+    else:
+        pending = bytearray()
+        for chunk in data:
+            pending += chunk
+            while len(pending) >= packetsize:
+                yield bytes(pending[:packetsize])
+                del pending[:packetsize]
+        if pending:
+            yield bytes(pending)
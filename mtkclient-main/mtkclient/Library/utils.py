@@ -12,23 +12,19 @@ import shutil
 import stat
 import struct
 import sys
+import threading
 import time
 from io import BytesIO
 from struct import unpack, pack
 
 import colorama
 
-try:
-    from capstone import Cs, CS_ARCH_ARM64, CS_MODE_LITTLE_ENDIAN
-except ImportError:
-    pass
-try:
-    from keystone import Ks, KS_ARCH_ARM64, KS_MODE_LITTLE_ENDIAN, KsError
-except ImportError:
-    pass
-
-sys.stdout = io.TextIOWrapper(sys.stdout.detach(), encoding='utf-8')
-sys.stderr = io.TextIOWrapper(sys.stderr.detach(), encoding='utf-8')
+if hasattr(sys.stdout, "reconfigure"):
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+else:
+    sys.stdout = io.TextIOWrapper(sys.stdout.detach(), encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.detach(), encoding='utf-8')
 
 
 class MTKTee:
@@ -144,16 +140,30 @@ def find_binary(data, strf, pos=0):
 
 
 class Progress:
-    def __init__(self, pagesize, guiprogress=None):
-        self.progtime = 0
-        self.prog = 0
-        self.progpos = 0
-        self.start = time.time()
+    """
+    Progress reporting for read/write loops. show_progress only stores the position, a ticker thread
+    renders the cli bar and the gui update at a fixed rate with an EWMA throughput and ETA.
+    """
+    interval = 0.25
+    idle_timeout = 5.0
+    alpha = 0.3
+
+    def __init__(self, pagesize, guiprogress=None, interval=None):
         self.pagesize = pagesize
         if guiprogress is not None:
             self.guiprogress = guiprogress.emit
         else:
             self.guiprogress = None
+        if interval is not None:
+            self.interval = interval
+        self.lock = threading.Lock()
+        self.ticker = None
+        self.stopped = None
+        self.prefix = ""
+        self.pos = 0
+        self.total = 0
+        self.display = True
+        self.clear()
 
     @staticmethod
     def calcProcessTime(starttime, cur_iter, max_iter):
@@ -170,64 +180,87 @@ class Progress:
     def clear(self):
         self.prog = 0
         self.start = time.time()
-        self.progtime = time.time()
+        self.progtime = self.start
         self.progpos = 0
+        self.throughput = 0.0
 
     def show_progress(self, prefix, pos, total, display=True):
-        if pos != 0.0:
-            prog = round(float(pos) / float(total) * float(100), 2)
-        else:
-            prog = 0.0
-        if prog == 0.0:
-            self.prog = 0.0
-            self.start = time.time()
-            self.progtime = time.time()
+        # Hot path: plain attribute stores, rendering happens in the ticker
+        self.prefix = prefix
+        self.total = total
+        self.display = display
+        self.pos = pos
+        if pos == 0:
+            self.clear()
+            self.render()
+        elif pos >= total:
+            self.stop()
+            self.render()
+        elif self.ticker is None:
+            self.start_ticker()
+
+    def start_ticker(self):
+        self.stopped = threading.Event()
+        self.ticker = threading.Thread(target=self.tick, args=(self.stopped,), daemon=True)
+        self.ticker.start()
+
+    def stop(self):
+        if self.ticker is not None:
+            self.stopped.set()
+            self.ticker = None
+
+    def tick(self, stopped):
+        lastchange = time.time()
+        while not stopped.wait(self.interval):
+            if self.pos != self.progpos:
+                self.render(stopped)
+                lastchange = time.time()
+            elif time.time() - lastchange > self.idle_timeout:
+                # The loop stopped updating without finishing, the next update starts a new ticker
+                if self.stopped is stopped:
+                    self.ticker = None
+                break
+
+    def render(self, stopped=None):
+        with self.lock:
+            if stopped is not None and stopped.is_set():
+                # finished while waiting for the lock, the final state was already rendered
+                return
+            t0 = time.time()
+            pos = self.pos
+            total = max(self.total, 1)
+            tdiff = t0 - self.progtime
+            if tdiff > 0 and pos > self.progpos:
+                rate = (pos - self.progpos) / tdiff
+                if self.throughput == 0:
+                    self.throughput = rate
+                else:
+                    self.throughput = self.alpha * rate + (1 - self.alpha) * self.throughput
+            self.progtime = t0
             self.progpos = pos
             if self.guiprogress is not None:
                 self.guiprogress(pos // self.pagesize)
-            print_progress(prog, 100, prefix='Done',
-                           suffix=prefix + ' (0x%X/0x%X) %0.2f MB/s' % (pos // self.pagesize,
-                                                                                  total // self.pagesize,
-                                                                                  0), bar_length=10)
-
-        if prog > self.prog:
-            if self.guiprogress is not None:
-                self.guiprogress(pos // self.pagesize)
-            if display:
-                t0 = time.time()
-                tdiff = t0 - self.progtime
-                datasize = (pos - self.progpos) / 1024 / 1024
-                if datasize != 0 and tdiff != 0:
-                    try:
-                        throughput = datasize / tdiff
-                    except Exception:
-                        throughput = 0
-                else:
-                    throughput = 0
-                telapsed, lefttime, finishtime = self.calcProcessTime(self.start, prog, 100)
-                hinfo = ""
-                if lefttime > 0:
-                    sec = lefttime
-                    if sec > 60:
-                        minutes = sec // 60
-                        sec = sec % 60
-                        if minutes > 60:
-                            h = minutes // 24
-                            minutes = minutes % 24
-                            hinfo = "%02dh:%02dm:%02ds left" % (h, minutes, sec)
-                        else:
-                            hinfo = "%02dm:%02ds left" % (minutes, sec)
+            if not self.display:
+                return
+            prog = round(min(pos, total) / total * 100, 2)
+            self.prog = prog
+            hinfo = ""
+            if self.throughput > 0 and pos < total:
+                sec = int((total - pos) / self.throughput)
+                if sec > 60:
+                    minutes = sec // 60
+                    sec = sec % 60
+                    if minutes > 60:
+                        hinfo = "%02dh:%02dm:%02ds left" % (minutes // 60, minutes % 60, sec)
                     else:
-                        hinfo = "%02ds left" % sec
-
-                print_progress(prog, 100, prefix='Progress:',
-                               suffix=prefix + f' (0x%X/0x%X, {hinfo}) %0.2f MB/s' % (pos // self.pagesize,
-                                                                                                total // self.pagesize,
-                                                                                                throughput),
-                               bar_length=10)
-                self.prog = prog
-                self.progpos = pos
-                self.progtime = t0
+                        hinfo = "%02dm:%02ds left" % (minutes, sec)
+                else:
+                    hinfo = "%02ds left" % sec
+            print_progress(prog, 100, prefix='Progress:',
+                           suffix=self.prefix + f' (0x%X/0x%X, {hinfo}) %0.2f MB/s' % (pos // self.pagesize,
+                                                                                       self.total // self.pagesize,
+                                                                                       self.throughput / 1024 / 1024),
+                           bar_length=10)
 
 
 class Structhelper:
@@ -683,12 +716,15 @@ class Patchtools:
 
     @staticmethod
     def disasm(code, size):
+        # capstone and keystone are optional and slow to import, so load them on first use
+        from capstone import Cs, CS_ARCH_ARM64, CS_MODE_LITTLE_ENDIAN
         cs = Cs(CS_ARCH_ARM64, CS_MODE_LITTLE_ENDIAN)
         instr = [f"{i.mnemonic}\t{i.op_str}" for i in cs.disasm(code, size)]
         # print("0x%x:\t%s\t%s" % (i.address, i.mnemonic, i.op_str))
         return instr
 
     def assembler(self, code):
+        from keystone import Ks, KS_ARCH_ARM64, KS_MODE_LITTLE_ENDIAN, KsError
         ks = Ks(KS_ARCH_ARM64, KS_MODE_LITTLE_ENDIAN)
         if self.bDebug:
             try:
@@ -40,6 +40,8 @@ class MtkConfig(metaclass=LogBase):
         self.loader = None
         self.iot = False
         self.gpt_file = None
+        self.skipzero = False
+        self.verifyread = False
         self.tr = QObject().tr
         self.ptype = "kamakiri2"
         self.generatekeys = None
@@ -70,6 +72,9 @@ class MtkConfig(metaclass=LogBase):
         self.dram = None
         self.otp = None
         self.stock = False
+        self.record = None
+        self.replay = None
+        self.simulator = None
         if loglevel == logging.DEBUG:
             logfilename = os.path.join("logs", "log.txt")
             fh = logging.FileHandler(logfilename)
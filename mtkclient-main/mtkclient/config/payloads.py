@@ -10,6 +10,9 @@ class PathConfig:
     def get_loader_path(self):
         return os.path.abspath(os.path.join(self.scriptpath, "..", "Loader"))
 
+    def get_loader_index_path(self):
+        return os.path.join(self.get_loader_path(), ".da_index.json")
+
     def get_payloads_path(self):
         return os.path.abspath(os.path.join(self.scriptpath, "..", "payloads"))
 
@@ -74,3 +74,23 @@ int32_t HACC_V3_Run(volatile uint32_t *p_src, uint32_t src_len, volatile uint32_
     }
     return 0;
 }
+
+int32_t HACC_V3_RunBlocks(uint32_t base, uint32_t start, volatile uint32_t *p_src, uint32_t src_len, volatile uint32_t *p_dst){
+    hacc_base = base;
+    for (uint32_t i = 0; i < src_len / 4; i += 4) {
+        for (int32_t x = 0; x < 4; x++) {
+            OUTREG32(HACC_ASRC0 + (4 * x), p_src[x+i]);
+        }
+        OUTREG32(HACC_ACON2, start);
+        const uint32_t clockvalue = get_world_clock_value();
+        while ((INREG32(HACC_ACON2) & HACC_AES_RDY) == 0) {
+            if (check_timeout(clockvalue, 200)) {
+                return 0x4006;
+            }
+        }
+        for (int32_t x = 0; x < 4; x++) {
+            p_dst[x+i]= INREG32(HACC_AOUT0 + ((4*x)));
+        }
+    }
+    return 0;
+}
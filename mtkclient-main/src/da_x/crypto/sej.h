@@ -149,6 +149,8 @@ struct SymKey {
     uint8_t iv_len;
 };
 
+int32_t HACC_V3_RunBlocks(uint32_t base, uint32_t start, volatile uint32_t *p_src, uint32_t src_len, volatile uint32_t *p_dst);
+
 #define READ_REGISTER_UINT32(reg) \
 	(*(volatile unsigned int * const)(reg))
 
@@ -165,6 +165,86 @@ int cmd_set_storage(com_channel_struct *channel)
     return 0;
 }
 
+int cmd_sej_run(com_channel_struct *channel)
+{
+    /* Runs the SEJ block loop on the device: hacc base, ACON2 start value, length, data -> status, data */
+    uint32_t buffer[0x10000/4]={0};
+    uint32_t base=0;
+    uint32_t start=0;
+    uint32_t length=0;
+    uint32_t cmdlen=4;
+    channel->read((uint8_t*)&base,&cmdlen);
+    cmdlen=4;
+    channel->read((uint8_t*)&start,&cmdlen);
+    cmdlen=4;
+    channel->read((uint8_t*)&length,&cmdlen);
+    if (length>sizeof(buffer)) length=sizeof(buffer);
+    length&=~0xF;
+    cmdlen=length;
+    channel->read((uint8_t*)buffer,&cmdlen);
+    uint32_t res=HACC_V3_RunBlocks(base, start, buffer, length, buffer);
+    channel->write((uint8_t*)&res,4);
+    return channel->write((uint8_t*)buffer,length);
+}
+
+#define REG_OP_WRITE        0
+#define REG_OP_READ         1
+#define REG_OP_POLL         2
+#define REG_OP_POLL_ANY     3
+#define REG_OP_MODIFY       4
+#define REG_OPS_MAX         0x800
+#define REG_OPS_POLL_LIMIT  0x100000
+
+typedef struct
+{
+    uint32_t type;
+    uint32_t addr;
+    uint32_t mask;
+    uint32_t value;
+} reg_op;
+
+int cmd_reg_ops(com_channel_struct *channel)
+{
+    /* Runs a list of register ops: count, count*{type, addr, mask, value} -> status, one dword per read/poll */
+    reg_op ops[REG_OPS_MAX];
+    uint32_t result[REG_OPS_MAX+1]={0};
+    uint32_t count=0;
+    uint32_t pos=1;
+    uint32_t cmdlen=4;
+    channel->read((uint8_t*)&count,&cmdlen);
+    if (count>REG_OPS_MAX) count=REG_OPS_MAX;
+    cmdlen=count*sizeof(reg_op);
+    channel->read((uint8_t*)ops,&cmdlen);
+    for (uint32_t i=0;i<count;i++){
+        reg_op* op=&ops[i];
+        uint32_t dword=0;
+        switch (op->type){
+            case REG_OP_WRITE:
+                WRAP_WR32(op->addr,op->value);
+                break;
+            case REG_OP_READ:
+                result[pos++]=WRAP_RD32(op->addr);
+                break;
+            case REG_OP_POLL:
+            case REG_OP_POLL_ANY:
+                /* A poll which doesn't finish still returns the last value, the host checks it */
+                for (uint32_t retry=0;retry<REG_OPS_POLL_LIMIT;retry++){
+                    dword=WRAP_RD32(op->addr);
+                    if (op->type==REG_OP_POLL?(dword&op->mask)==op->value:(dword&op->mask)!=0) break;
+                }
+                result[pos++]=dword;
+                break;
+            case REG_OP_MODIFY:
+                WRAP_WR32(op->addr,(WRAP_RD32(op->addr)&op->mask)|op->value);
+                break;
+            default:
+                result[0]=1;
+                return channel->write((uint8_t*)result,4);
+        }
+    }
+    return channel->write((uint8_t*)result,pos*4);
+}
+
 __attribute__ ((section(".text.main"))) int main() {
     cache_init(3);
     register_major_command(0xF0000,(void*)cmd_ack);
@@ -177,6 +257,8 @@ __attribute__ ((section(".text.main"))) int main() {
     register_major_command(0xF0008,(void*)cmd_rpmb_init);
     register_major_command(0xF0009,(void*)cmd_rpmb_read);
     register_major_command(0xF000A,(void*)cmd_rpmb_write);
+    register_major_command(0xF000B,(void*)cmd_sej_run);
+    register_major_command(0xF000C,(void*)cmd_reg_ops);
     cache_close(1);
     return 0;
 }
\ No newline at end of file
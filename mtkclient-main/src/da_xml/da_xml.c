@@ -889,6 +889,63 @@ int cmd_ack(com_channel_struct *channel, const char* /*xml*/){
     return channel->write_packet_with_profile((uint8_t *)&ack,4);
 }
 
+#define REG_OP_WRITE        0
+#define REG_OP_READ         1
+#define REG_OP_POLL         2
+#define REG_OP_POLL_ANY     3
+#define REG_OP_MODIFY       4
+#define REG_OPS_MAX         0x800
+#define REG_OPS_POLL_LIMIT  0x100000
+
+typedef struct
+{
+    uint32_t type;
+    uint32_t addr;
+    uint32_t mask;
+    uint32_t value;
+} reg_op;
+
+int cmd_reg_ops(com_channel_struct *channel, const char* /*xml*/){
+    /* Runs a list of register ops: count, count*{type, addr, mask, value} -> status, one dword per read/poll */
+    reg_op ops[REG_OPS_MAX];
+    uint32_t result[REG_OPS_MAX+1]={0};
+    uint32_t count=0;
+    uint32_t pos=1;
+    uint32_t cmdlen=4;
+    channel->read_packet_with_profile((uint8_t*)&count,&cmdlen);
+    if (count>REG_OPS_MAX) count=REG_OPS_MAX;
+    cmdlen=count*sizeof(reg_op);
+    channel->read_packet_with_profile((uint8_t*)ops,&cmdlen);
+    for (uint32_t i=0;i<count;i++){
+        reg_op* op=&ops[i];
+        uint32_t dword=0;
+        switch (op->type){
+            case REG_OP_WRITE:
+                *(volatile uint32_t*)op->addr=op->value;
+                break;
+            case REG_OP_READ:
+                result[pos++]=*(volatile uint32_t*)op->addr;
+                break;
+            case REG_OP_POLL:
+            case REG_OP_POLL_ANY:
+                /* A poll which doesn't finish still returns the last value, the host checks it */
+                for (uint32_t retry=0;retry<REG_OPS_POLL_LIMIT;retry++){
+                    dword=*(volatile uint32_t*)op->addr;
+                    if (op->type==REG_OP_POLL?(dword&op->mask)==op->value:(dword&op->mask)!=0) break;
+                }
+                result[pos++]=dword;
+                break;
+            case REG_OP_MODIFY:
+                *(volatile uint32_t*)op->addr=(*(volatile uint32_t*)op->addr&op->mask)|op->value;
+                break;
+            default:
+                result[0]=1;
+                return channel->write_packet_with_profile((uint8_t*)result,4);
+        }
+    }
+    return channel->write_packet_with_profile((uint8_t*)result,pos*4);
+}
+
 /*int register_rw(com_channel_struct* channel, const char* xml){
     volatile uint32_t addr=0;
     volatile uint32_t dword=0;
@@ -1015,21 +1072,10 @@ int rpmb_key_generate(com_channel_struct *channel, uint8_t* rpmb_frame)
     return res;
 }
 
-int cmd_ufs_read_rpmb(com_channel_struct *channel, const char* /*xml*/)
+static uint16_t ufs_read_rpmb_frame(uint32_t tag, uint16_t address, uint8_t* data)
 {
   uint16_t buffer[0x100];
   struct ufs_aio_scsi_cmd cmd;
-  uint32_t tag;
-  uint32_t res;
-  uint32_t size = 4;
-  uint32_t address = 0;
-  channel->read_packet_with_profile((uint8_t*)&address, &size);
-  if (!ufshcd_get_free_tag((struct ufs_hba *)g_ufs_hba, &tag))
-  {
-    res=-1;
-    channel->write_packet_with_profile((uint8_t*)&res, 2);
-    return 0;
-  }
   cmd.data_buf = buffer;
   memset(buffer, 0, sizeof(buffer));
   buffer[RPMB_ADDR_BEG/2] = __builtin_bswap16(address);
@@ -1040,25 +1086,15 @@ int cmd_ufs_read_rpmb(com_channel_struct *channel, const char* /*xml*/)
   memset(buffer, 0, sizeof(buffer));
   read_from_device(&cmd, 0x200, tag);
   ufshcd_queuecommand((struct ufs_hba *)g_ufs_hba, &cmd);
-  res = __builtin_bswap16(buffer[RPMB_RES_BEG/2]);
-  channel->write_packet_with_profile((uint8_t*)&res, 2);
   if ( !buffer[RPMB_RES_BEG/2] )
-    channel->write_packet_with_profile((uint8_t*)&buffer[RPMB_DATA_BEG/2], 0x100);
-  ufshcd_put_tag((struct ufs_hba *)g_ufs_hba, tag);
-  return 0;
+    memcpy(data, &buffer[RPMB_DATA_BEG/2], 0x100);
+  return __builtin_bswap16(buffer[RPMB_RES_BEG/2]);
 }
 
-int cmd_ufs_write_rpmb(com_channel_struct *channel, const char* /*xml*/)
+static uint16_t ufs_write_rpmb_frame(uint32_t tag, uint16_t address, uint8_t* data)
 {
-  uint16_t status;
   uint16_t buffer[256];
   struct ufs_aio_scsi_cmd cmd;
-  uint32_t tag;
-
-  uint32_t size = 4;
-  uint32_t address = 0;
-  channel->read_packet_with_profile((uint8_t*)&address, &size);
-  ufshcd_get_free_tag((struct ufs_hba *)g_ufs_hba, &tag);
   cmd.data_buf = buffer;
   memset(buffer, 0, sizeof(buffer));
   buffer[RPMB_TYPE_BEG/2] = 0x200;
@@ -1067,8 +1103,7 @@ int cmd_ufs_write_rpmb(com_channel_struct *channel, const char* /*xml*/)
   memset(buffer, 0, sizeof(buffer));
   read_from_device(&cmd, 0x200, tag);
   ufshcd_queuecommand((struct ufs_hba *)g_ufs_hba, &cmd);
-  size = 0x100;
-  channel->read_packet_with_profile((uint8_t*)&buffer[RPMB_DATA_BEG/2], &size);
+  memcpy(&buffer[RPMB_DATA_BEG/2], data, 0x100);
   buffer[RPMB_ADDR_BEG/2] = __builtin_bswap16(address);
   buffer[RPMB_BLKS_BEG/2] = 0x100;
   buffer[RPMB_RES_BEG/2] = 0;
@@ -1083,12 +1118,102 @@ int cmd_ufs_write_rpmb(com_channel_struct *channel, const char* /*xml*/)
   memset(buffer, 0, sizeof(buffer));
   read_from_device(&cmd, 0x200, tag);
   ufshcd_queuecommand((struct ufs_hba *)g_ufs_hba, &cmd);
-  status = __builtin_bswap16(buffer[RPMB_RES_BEG/2]);
+  return __builtin_bswap16(buffer[RPMB_RES_BEG/2]);
+}
+
+int cmd_ufs_read_rpmb(com_channel_struct *channel, const char* /*xml*/)
+{
+  uint8_t data[0x100];
+  uint32_t tag;
+  uint32_t res;
+  uint32_t size = 4;
+  uint32_t address = 0;
+  channel->read_packet_with_profile((uint8_t*)&address, &size);
+  if (!ufshcd_get_free_tag((struct ufs_hba *)g_ufs_hba, &tag))
+  {
+    res=-1;
+    channel->write_packet_with_profile((uint8_t*)&res, 2);
+    return 0;
+  }
+  res = ufs_read_rpmb_frame(tag, address, data);
+  channel->write_packet_with_profile((uint8_t*)&res, 2);
+  if ( !res )
+    channel->write_packet_with_profile(data, 0x100);
+  ufshcd_put_tag((struct ufs_hba *)g_ufs_hba, tag);
+  return 0;
+}
+
+int cmd_ufs_write_rpmb(com_channel_struct *channel, const char* /*xml*/)
+{
+  uint16_t status;
+  uint8_t data[0x100];
+  uint32_t tag;
+
+  uint32_t size = 4;
+  uint32_t address = 0;
+  channel->read_packet_with_profile((uint8_t*)&address, &size);
+  ufshcd_get_free_tag((struct ufs_hba *)g_ufs_hba, &tag);
+  size = 0x100;
+  channel->read_packet_with_profile(data, &size);
+  status = ufs_write_rpmb_frame(tag, address, data);
   channel->write_packet_with_profile((uint8_t*)&status, 2);
   ufshcd_put_tag((struct ufs_hba *)g_ufs_hba, tag);
   return 0;
 }
 
+/* Multi frame variants: address and frame count, then a status and the data (read) per frame, stops at the first error */
+int cmd_ufs_read_rpmb_multi(com_channel_struct *channel, const char* /*xml*/)
+{
+  uint8_t data[0x100];
+  uint32_t tag;
+  uint32_t res;
+  uint32_t size = 4;
+  uint32_t address = 0;
+  uint32_t count = 0;
+  channel->read_packet_with_profile((uint8_t*)&address, &size);
+  size = 4;
+  channel->read_packet_with_profile((uint8_t*)&count, &size);
+  if (!ufshcd_get_free_tag((struct ufs_hba *)g_ufs_hba, &tag))
+  {
+    res=-1;
+    channel->write_packet_with_profile((uint8_t*)&res, 2);
+    return 0;
+  }
+  for (uint32_t pos = 0; pos < count; pos++) {
+    res = ufs_read_rpmb_frame(tag, address + pos, data);
+    channel->write_packet_with_profile((uint8_t*)&res, 2);
+    if (res)
+      break;
+    channel->write_packet_with_profile(data, 0x100);
+  }
+  ufshcd_put_tag((struct ufs_hba *)g_ufs_hba, tag);
+  return 0;
+}
+
+int cmd_ufs_write_rpmb_multi(com_channel_struct *channel, const char* /*xml*/)
+{
+  uint16_t status;
+  uint8_t data[0x100];
+  uint32_t tag;
+  uint32_t size = 4;
+  uint32_t address = 0;
+  uint32_t count = 0;
+  channel->read_packet_with_profile((uint8_t*)&address, &size);
+  size = 4;
+  channel->read_packet_with_profile((uint8_t*)&count, &size);
+  ufshcd_get_free_tag((struct ufs_hba *)g_ufs_hba, &tag);
+  for (uint32_t pos = 0; pos < count; pos++) {
+    size = 0x100;
+    channel->read_packet_with_profile(data, &size);
+    status = ufs_write_rpmb_frame(tag, address + pos, data);
+    channel->write_packet_with_profile((uint8_t*)&status, 2);
+    if (status)
+      break;
+  }
+  ufshcd_put_tag((struct ufs_hba *)g_ufs_hba, tag);
+  return 0;
+}
+
 int cmd_ufs_init(com_channel_struct *channel, const char* /*xml*/)
 {
   uint16_t buffer[0x200]={0};
@@ -1115,42 +1240,25 @@ int cmd_set_rpmbkey(com_channel_struct *channel, const char* /*xml*/)
   return 0;
 }
 
-int cmd_mmc_read_rpmb(com_channel_struct *channel, const char* /*xml*/)
+static uint16_t mmc_read_rpmb_frame(struct mmc_card* card, uint16_t address, uint8_t* data)
 {
   uint8_t rpmb_frame[0x200]={0};
-  struct mmc_card* card = (struct mmc_card*)mmc_get_card(0);
-  mmc_set_part_config(card, (card->raw_ext_csd[EXT_CSD_PART_CFG] & 0xF8) | 3);
-  uint32_t size = 4;
-  uint32_t address = 0;
-  channel->read_packet_with_profile((uint8_t*)&address, &size);
-  memset(rpmb_frame, 0, sizeof(rpmb_frame));
-  *(uint16_t*)(rpmb_frame + RPMB_ADDR_BEG) = __builtin_bswap16((uint16_t)address&0xFFFF);
+  *(uint16_t*)(rpmb_frame + RPMB_ADDR_BEG) = __builtin_bswap16(address);
   *(uint16_t*)(rpmb_frame + RPMB_TYPE_BEG) = __builtin_bswap16(RPMB_READ_DATA);
-
   mmc_rpmb_send_command((struct mmc_card *)card->host, rpmb_frame, 1, RPMB_READ_DATA, RPMB_REQ);
   mmc_rpmb_send_command((struct mmc_card *)card->host, rpmb_frame, 1, RPMB_READ_DATA, RPMB_RESP);
-  uint16_t res = __builtin_bswap16(*(uint16_t*)(rpmb_frame + RPMB_RES_BEG));
-  channel->write_packet_with_profile((uint8_t *)&res, 2);
   if (!*(uint16_t*)(rpmb_frame + RPMB_RES_BEG))
-    channel->write_packet_with_profile(rpmb_frame + RPMB_DATA_BEG, 0x100);
-  mmc_set_part_config(card, card->raw_ext_csd[EXT_CSD_PART_CFG] & 0xF8);
-  return 0;
+    memcpy(data, rpmb_frame + RPMB_DATA_BEG, 0x100);
+  return __builtin_bswap16(*(uint16_t*)(rpmb_frame + RPMB_RES_BEG));
 }
 
-int cmd_mmc_write_rpmb(com_channel_struct *channel, const char* /*xml*/)
+static uint16_t mmc_write_rpmb_frame(struct mmc_card* card, uint16_t address, uint8_t* data)
 {
   uint8_t rpmb_frame[0x200]={0};
-  struct mmc_card* card = (struct mmc_card*)mmc_get_card(0);
-  mmc_set_part_config(card, (card->raw_ext_csd[EXT_CSD_PART_CFG] & 0xF8) | 3);
-  memset(rpmb_frame, 0, sizeof(rpmb_frame));
   *(uint16_t*)(rpmb_frame + RPMB_TYPE_BEG) = __builtin_bswap16(RPMB_GET_WRITE_COUNTER);
   mmc_rpmb_send_command((struct mmc_card *)card->host, rpmb_frame, 1, RPMB_GET_WRITE_COUNTER, RPMB_REQ);
   mmc_rpmb_send_command((struct mmc_card *)card->host, rpmb_frame, 1, RPMB_GET_WRITE_COUNTER, RPMB_RESP);
-  uint32_t size = 4;
-  uint16_t address = 0;
-  channel->read_packet_with_profile((uint8_t*)&address, &size);
-  size = 0x100;
-  channel->read_packet_with_profile(rpmb_frame + RPMB_DATA_BEG, &size);
+  memcpy(rpmb_frame + RPMB_DATA_BEG, data, 0x100);
   *(uint16_t*)(rpmb_frame +RPMB_ADDR_BEG) = __builtin_bswap16(address);
   *(uint16_t*)(rpmb_frame +RPMB_BLKS_BEG) = 0x100;
   *(uint16_t*)(rpmb_frame +RPMB_RES_BEG) = 0;
@@ -1161,12 +1269,86 @@ int cmd_mmc_write_rpmb(com_channel_struct *channel, const char* /*xml*/)
   *(uint16_t*)(rpmb_frame +RPMB_TYPE_BEG) = __builtin_bswap16(RPMB_RESULT_READ);
   mmc_rpmb_send_command((struct mmc_card *)card->host, rpmb_frame, 1, RPMB_RESULT_READ, RPMB_REQ);
   mmc_rpmb_send_command((struct mmc_card *)card->host, rpmb_frame, 1, RPMB_RESULT_READ, RPMB_RESP);
-  uint16_t res = __builtin_bswap16(*(uint16_t*)(rpmb_frame + RPMB_RES_BEG));
+  return __builtin_bswap16(*(uint16_t*)(rpmb_frame + RPMB_RES_BEG));
+}
+
+int cmd_mmc_read_rpmb(com_channel_struct *channel, const char* /*xml*/)
+{
+  uint8_t data[0x100]={0};
+  struct mmc_card* card = (struct mmc_card*)mmc_get_card(0);
+  mmc_set_part_config(card, (card->raw_ext_csd[EXT_CSD_PART_CFG] & 0xF8) | 3);
+  uint32_t size = 4;
+  uint32_t address = 0;
+  channel->read_packet_with_profile((uint8_t*)&address, &size);
+  uint16_t res = mmc_read_rpmb_frame(card, (uint16_t)address&0xFFFF, data);
+  channel->write_packet_with_profile((uint8_t *)&res, 2);
+  if (!res)
+    channel->write_packet_with_profile(data, 0x100);
+  mmc_set_part_config(card, card->raw_ext_csd[EXT_CSD_PART_CFG] & 0xF8);
+  return 0;
+}
+
+int cmd_mmc_write_rpmb(com_channel_struct *channel, const char* /*xml*/)
+{
+  uint8_t data[0x100]={0};
+  struct mmc_card* card = (struct mmc_card*)mmc_get_card(0);
+  mmc_set_part_config(card, (card->raw_ext_csd[EXT_CSD_PART_CFG] & 0xF8) | 3);
+  uint32_t size = 4;
+  uint16_t address = 0;
+  channel->read_packet_with_profile((uint8_t*)&address, &size);
+  size = 0x100;
+  channel->read_packet_with_profile(data, &size);
+  uint16_t res = mmc_write_rpmb_frame(card, address, data);
   channel->write_packet_with_profile((uint8_t *)&res, 2);
   mmc_set_part_config(card, card->raw_ext_csd[EXT_CSD_PART_CFG] & 0xF8);
   return 0;
 }
 
+int cmd_mmc_read_rpmb_multi(com_channel_struct *channel, const char* /*xml*/)
+{
+  uint8_t data[0x100]={0};
+  struct mmc_card* card = (struct mmc_card*)mmc_get_card(0);
+  mmc_set_part_config(card, (card->raw_ext_csd[EXT_CSD_PART_CFG] & 0xF8) | 3);
+  uint32_t size = 4;
+  uint32_t address = 0;
+  uint32_t count = 0;
+  channel->read_packet_with_profile((uint8_t*)&address, &size);
+  size = 4;
+  channel->read_packet_with_profile((uint8_t*)&count, &size);
+  for (uint32_t pos = 0; pos < count; pos++) {
+    uint16_t res = mmc_read_rpmb_frame(card, (uint16_t)(address + pos)&0xFFFF, data);
+    channel->write_packet_with_profile((uint8_t *)&res, 2);
+    if (res)
+      break;
+    channel->write_packet_with_profile(data, 0x100);
+  }
+  mmc_set_part_config(card, card->raw_ext_csd[EXT_CSD_PART_CFG] & 0xF8);
+  return 0;
+}
+
+int cmd_mmc_write_rpmb_multi(com_channel_struct *channel, const char* /*xml*/)
+{
+  uint8_t data[0x100]={0};
+  struct mmc_card* card = (struct mmc_card*)mmc_get_card(0);
+  mmc_set_part_config(card, (card->raw_ext_csd[EXT_CSD_PART_CFG] & 0xF8) | 3);
+  uint32_t size = 4;
+  uint32_t address = 0;
+  uint32_t count = 0;
+  channel->read_packet_with_profile((uint8_t*)&address, &size);
+  size = 4;
+  channel->read_packet_with_profile((uint8_t*)&count, &size);
+  for (uint32_t pos = 0; pos < count; pos++) {
+    size = 0x100;
+    channel->read_packet_with_profile(data, &size);
+    uint16_t res = mmc_write_rpmb_frame(card, (uint16_t)(address + pos)&0xFFFF, data);
+    channel->write_packet_with_profile((uint8_t *)&res, 2);
+    if (res)
+      break;
+  }
+  mmc_set_part_config(card, card->raw_ext_csd[EXT_CSD_PART_CFG] & 0xF8);
+  return 0;
+}
+
 int cmd_mmc_init(com_channel_struct *channel, const char* /*xml*/)
 {
   uint8_t rpmb_frame[0x200]={0};
@@ -1193,7 +1375,12 @@ __attribute__ ((section(".text.main"))) int main() {
     register_xml_cmd("CMD:CUSTOMUFSINIT","1",(void*)cmd_ufs_init);
     register_xml_cmd("CMD:CUSTOMURPMBR","1",(void*)cmd_ufs_read_rpmb);
     register_xml_cmd("CMD:CUSTOMURPMBW","1",(void*)cmd_ufs_write_rpmb);
+    register_xml_cmd("CMD:CUSTOMRPMBRM","1",(void*)cmd_mmc_read_rpmb_multi);
+    register_xml_cmd("CMD:CUSTOMRPMBWM","1",(void*)cmd_mmc_write_rpmb_multi);
+    register_xml_cmd("CMD:CUSTOMURPMBRM","1",(void*)cmd_ufs_read_rpmb_multi);
+    register_xml_cmd("CMD:CUSTOMURPMBWM","1",(void*)cmd_ufs_write_rpmb_multi);
     register_xml_cmd("CMD:CUSTOMRPMBKEY","1",(void*)cmd_set_rpmbkey);
+    register_xml_cmd("CMD:CUSTOMREGOPS","1",(void*)cmd_reg_ops);
     //register_xml_cmd("CUSTOM","1",(void*)register_rw);
     cache_close(1);
     return 0;
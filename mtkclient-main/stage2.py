@@ -131,12 +131,15 @@ class Stage2(metaclass=LogBase):
         if self.cdc.connected:
             self.cdc.close()
 
-    def readflash(self, type_: int, start, length, display=False, filename: str = None):
+    def readinto(self, view) -> bool:
+        """ Reads len(view) bytes with as few bulk transfers as possible """
+        return self.cdc.usbreadinto(view, w_max_packet_size=len(view)) == len(view)
+
+    def readflash(self, type_: int, start, length, display=False, filename: str = None, batchsectors=0x100):
         if not self.emmc_inited:
             self.init_emmc()
         wf = None
         pg = Progress(pagesize=0x200)
-        buffer = bytearray()
         if filename is not None:
             wf = open(filename, "wb")
         sectors = (length // 0x200)
@@ -151,9 +154,6 @@ class Stage2(metaclass=LogBase):
         # self.usbwrite(pack(">I", 0xf00dd00d))
         # self.usbwrite(pack(">I", 0x3001))
 
-        bytestoread = length
-        bytesread = 0
-        old = 0
         # emmc_read(0)
         self.usbwrite(pack(">I", 0xf00dd00d))
         self.usbwrite(pack(">I", 0x1000))
@@ -161,24 +161,33 @@ class Stage2(metaclass=LogBase):
         self.usbwrite(pack(">I", sectors))
 
         if display:
-            pg.show_progress(prefix="Progress:", pos=0, total=sectors)
+            pg.show_progress(prefix="Progress:", pos=0, total=sectors * 0x200)
 
-        for sector in range(sectors):
-            tmp = self.usbread(0x200)
-            if not tmp or len(tmp) != 0x200:
+        # The payload sends all sectors back to back, so they are read in large batches, either into the
+        # preallocated result or into a reusable buffer which is written to the file.
+        if wf is None:
+            buffer = bytearray(sectors * 0x200)
+        else:
+            buffer = bytearray(min(sectors, batchsectors) * 0x200)
+        view = memoryview(buffer)
+        bytestoread = length
+        for sector in range(0, sectors, batchsectors):
+            count = min(batchsectors, sectors - sector)
+            if wf is None:
+                chunk = view[sector * 0x200:(sector + count) * 0x200]
+            else:
+                chunk = view[:count * 0x200]
+            if not self.readinto(chunk):
                 self.error("Error on getting data")
+                if wf is not None:
+                    wf.close()
                 return
-            if display:
-                pg.show_progress(prefix="Progress:", pos=sector, total=sectors)
-            bytesread += len(tmp)
-            size = min(bytestoread, len(tmp))
             if wf is not None:
-                wf.write(tmp[:size])
-            else:
-                buffer.extend(tmp)
-            bytestoread -= size
-        if display:
-            pg.show_progress(prefix="Progress:", pos=sectors, total=sectors)
+                size = min(bytestoread, len(chunk))
+                wf.write(chunk[:size])
+                bytestoread -= size
+            if display:
+                pg.show_progress(prefix="Progress:", pos=(sector + count) * 0x200, total=sectors * 0x200)
         if wf is not None:
             wf.close()
         else:
@@ -250,32 +259,40 @@ class Stage2(metaclass=LogBase):
                 self.readflash(type_=1, start=start, length=length, display=True, filename=filename)
             print("Done")
 
-    def memread(self, start, length, filename=None):
-        bytestoread = length
-        addr = start
-        data = b""
-        pos = 0
+    def memread(self, start, length, filename=None, blocksize=0x10000):
         wf = None
         if filename is not None:
             wf = open(filename, "wb")
-        while bytestoread > 0:
-            size = min(bytestoread, 0x100)
+            data = bytearray(min(length, blocksize))
+        else:
+            data = bytearray(length)
+        view = memoryview(data)
+        pos = 0
+        while pos < length:
+            size = min(length - pos, blocksize)
             self.usbwrite(pack(">I", 0xf00dd00d))
             self.usbwrite(pack(">I", 0x4002))
-            self.usbwrite(pack(">I", addr + pos))
+            self.usbwrite(pack(">I", start + pos))
             self.usbwrite(pack(">I", size))
             if filename is None:
-                data += self.usbread(size)
+                chunk = view[pos:pos + size]
             else:
-                wf.write(self.usbread(size))
-            bytestoread -= size
+                chunk = view[:size]
+            if not self.readinto(chunk):
+                self.error(f"Error on reading memory at {hex(start + pos)}")
+                break
+            if filename is not None:
+                wf.write(chunk)
             pos += size
-        self.info(f"{hex(start)}: {hexlify(data).decode('utf-8')}")
         if filename is not None:
             wf.close()
+            return b""
+        data = bytes(data[:pos])
+        self.info(f"{hex(start)}: {hexlify(data).decode('utf-8')}")
         return data
 
-    def memwrite(self, start, data, filename=None):
+    def memwrite(self, start, data, filename=None, blocksize=0x200):
+        # The payload receives a write into a 0x200 byte buffer and acknowledges every write
         rf = None
         if filename is not None:
             rf = open(filename, "rb")
@@ -288,26 +305,29 @@ class Stage2(metaclass=LogBase):
             bytestowrite = len(data)
         addr = start
         pos = 0
+        res = True
         while bytestowrite > 0:
-            size = min(bytestowrite, 0x100)
+            size = min(bytestowrite, blocksize)
+            if filename is None:
+                wdata = bytes(data[pos:pos + size])
+            else:
+                wdata = rf.read(size)
+            if len(wdata) % 4:
+                wdata += b"\x00" * (4 - len(wdata) % 4)
             self.usbwrite(pack(">I", 0xf00dd00d))
             self.usbwrite(pack(">I", 0x4000))
             self.usbwrite(pack(">I", addr + pos))
             self.usbwrite(pack(">I", size))
-            if filename is None:
-                wdata = data[pos:pos + size]
-            else:
-                wdata = rf.read(size)
+            self.usbwrite(wdata)
+            if self.usbread(4) != b"\xD0\xD0\xD0\xD0":
+                res = False
+                break
             bytestowrite -= size
             pos += size
-            while len(wdata) % 4 != 0:
-                wdata += b"\x00"
-            self.usbwrite(wdata)
 
         if filename is not None:
             rf.close()
-        ack = self.usbread(4)
-        return ack == b"\xD0\xD0\xD0\xD0"
+        return res
 
     def rpmb(self, start, length, filename, reverse=False):
         pg = Progress(pagesize=0x100)